@@ -0,0 +1,457 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+from cache import TranscriptCache
+from instrument import NULL_RECORDER, Recorder
+from logpump import BackgroundFileWriter
+from manifest import JobManifest
+from progress import ProgressTracker, format_eta
+from scheduler import (
+    DEFAULT_THREADS_PER_WORKER,
+    WorkerPool,
+    order_by_duration,
+    plan_workers,
+    run_parallel,
+)
+from settings import (
+    APP_DIR,
+    CACHE_DIR,
+    LOG_DIR,
+    build_env,
+    build_worker_command,
+    ensure_dirs,
+    is_media_file,
+    list_media_files,
+    load_config,
+    model_file,
+    model_paths,
+    resolve_path,
+    script_path,
+)
+from subtitles import CueStore, postprocess_cues
+from worker_client import WorkerError
+from writers import parse_formats, write_outputs
+
+
+def collect_files(cfg, input_file="", input_dir=""):
+    """
+    根据单文件或文件夹收集待处理媒体文件
+    输入无效时抛出 ValueError（消息可直接展示给用户）
+    """
+    exts = cfg.get("media_extensions", [])
+    if input_file:
+        if os.path.isfile(input_file) and is_media_file(input_file, exts):
+            return [input_file]
+        raise ValueError("选择的文件不是支持的媒体格式。")
+    if input_dir:
+        if not os.path.isdir(input_dir):
+            raise ValueError("输入文件夹不存在。")
+        files = list_media_files(input_dir, exts)
+        if not files:
+            raise ValueError("文件夹内没有可用媒体文件。")
+        return files
+    raise ValueError("请先选择文件或输入文件夹。")
+
+
+class BatchRunner:
+    """
+    批量识别（不依赖 Tk）：调度常驻识别进程、缓存、后处理与任务清单
+    图形界面和命令行共用
+
+    on_log(msg)：文本日志
+    on_event(event)：结构化事件 dict，event 字段为
+        plan / start / progress / done / failed / batch / finish
+        progress 含文件与整批的进度和预计剩余时间（见 progress.ProgressTracker）
+        batch 在每个文件结束后发送，只含整批进度
+
+    config.json 的 trace_enabled 打开后，每次运行把各阶段耗时写到 logs/trace-<时间>.json
+    （Chrome trace，含识别进程的 read/vad/asr/decode 区间；trace_format 为 json 时只写汇总）；
+    profile_mode 为 cprofile / sample 时对每个文件采样，结果写到 logs/profile/
+    """
+
+    def __init__(self, cfg=None, model_dir="", output_dir="", on_log=None, on_event=None, formats=None):
+        self.cfg = cfg if cfg is not None else load_config()
+        self.model_dir = model_dir
+        self.output_dir = output_dir
+        # 输出格式：参数优先，其次 config.json 的 output_formats
+        self.formats = parse_formats(formats or self.cfg.get("output_formats"))
+        self.on_log = on_log
+        self.on_event = on_event
+        self.workers = WorkerPool()
+        self.cache = None
+        self.progress = None
+        self.recorder = NULL_RECORDER
+        self.stop_flag = threading.Event()
+        self.summary_lock = threading.Lock()
+        # 预热与批量运行共用：运行开始前等待进行中的预热结束（其进程留在空闲池中复用），
+        # 运行开始后不再预热，两者不会同时启动识别进程
+        self.warm_lock = threading.Lock()
+        self.running = False
+
+        ensure_dirs()
+        if self.cfg.get("cache_enabled", True):
+            max_mb = self.cfg.get("cache_max_mb", 512)
+            self.cache = TranscriptCache(os.path.join(CACHE_DIR, "transcripts"), max_mb * 1024 * 1024)
+        self.manifest = JobManifest(os.path.join(CACHE_DIR, "manifest.db"))
+        self.run_log = BackgroundFileWriter(
+            os.path.join(LOG_DIR, "run.log"),
+            max_bytes=self.cfg.get("log_max_mb", 10) * 1024 * 1024,
+            backups=self.cfg.get("log_backups", 3),
+        )
+
+    def log(self, msg):
+        if self.on_log:
+            self.on_log(msg)
+
+    def emit(self, event, **fields):
+        if self.on_event:
+            self.on_event(dict(event=event, **fields))
+
+    def _model_dir(self):
+        return resolve_path(self.model_dir, self.cfg.get("default_model_dir"))
+
+    def check_requirements(self):
+        """返回缺失文件列表"""
+        missing = []
+
+        _, model_files = model_paths(self.cfg, self.model_dir)
+        for path in model_files:
+            if not os.path.isfile(path):
+                missing.append(path)
+
+        ffmpeg_dir = os.path.join(APP_DIR, "tools", "ffmpeg")
+        for name in self.cfg.get("required_ffmpeg_files", []):
+            if not os.path.isfile(os.path.join(ffmpeg_dir, name)):
+                missing.append(os.path.join(ffmpeg_dir, name))
+
+        path = script_path(self.cfg)
+        if not os.path.isfile(path):
+            missing.append(path)
+
+        return missing
+
+    def _source_srt(self, input_media):
+        """字幕写在媒体文件旁（与原脚本一致），其他格式与它同名"""
+        return os.path.splitext(input_media)[0] + ".srt"
+
+    def _write_run_log(self, lines):
+        """整块交给后台写入 run.log，多个进程并行时同一文件的日志不会被打散"""
+        self.run_log.write("\n".join(lines) + "\n")
+
+    def _cache_key(self, input_media, media_digest=None):
+        """计算缓存键；缓存关闭或文件读取失败时返回 None"""
+        if not self.cache:
+            return None
+        _, model_files = model_paths(self.cfg, self.model_dir)
+        # 线程数不影响识别结果，模板本身（含 {num_threads} 占位符）参与计算即可
+        params = [item for item in self.cfg.get("script_args_template", []) if "{input_media}" not in item]
+        try:
+            return self.cache.make_key(
+                input_media, model_files + [script_path(self.cfg)], params, media_digest=media_digest
+            )
+        except OSError:
+            return None
+
+    def _run_config(self):
+        """识别配置指纹：模型、脚本参数或输出格式变化后，已完成的文件需要重新处理"""
+        return json.dumps(
+            [self._model_dir(), model_file(self.cfg), self.cfg.get("script_args_template", []), self.formats],
+            ensure_ascii=False,
+        )
+
+    def transcribe(
+        self,
+        input_media,
+        srt_path,
+        num_threads=None,
+        num_shards=1,
+        on_progress=None,
+        on_log=None,
+        duration=0.0,
+        media_digest=None,
+    ):
+        """
+        识别 input_media，识别进程边识别边把原始字幕（未后处理）写到 srt_path，
+        用于查看进度和中断后续跑；命中缓存时不启动识别，也不写文件
+        on_progress(msg) 收到识别进程的进度 dict；duration 为已知时长（0 表示未知）
+        media_digest 为已知的媒体文件 SHA-256（如服务端上传时已算出），不再读取文件计算
+        返回 (segments, rtf)，命中缓存时 rtf 为 None
+        识别失败抛出 WorkerError
+        """
+        recorder = self.recorder
+        with recorder.span("cache.lookup"):
+            key = self._cache_key(input_media, media_digest)
+            segments = self.cache.get(key) if key else None
+        if segments is not None:
+            recorder.count("cache.hits")
+            return segments, None
+
+        cmd = build_worker_command(self.cfg, self._model_dir(), num_threads)
+        profile = self.cfg.get("profile_mode", "")
+        profile_output = ""
+        if profile:
+            suffix = ".prof" if profile == "cprofile" else ".folded"
+            name = os.path.splitext(os.path.basename(input_media))[0]
+            profile_output = os.path.join(LOG_DIR, "profile", name + time.strftime("-%Y%m%d-%H%M%S") + suffix)
+        worker = None
+        try:
+            with recorder.span("worker.acquire"):
+                worker = self.workers.acquire(cmd, env=build_env(), on_log=on_log)
+            with recorder.span("transcribe", file=os.path.basename(input_media)):
+                base = recorder.now() if recorder.enabled else 0.0
+                result = worker.transcribe(
+                    input_media,
+                    srt_path,
+                    on_progress=on_progress,
+                    num_shards=num_shards,
+                    duration=duration,
+                    trace=recorder.enabled,
+                    profile=profile,
+                    profile_output=profile_output,
+                )
+        except WorkerError:
+            if worker:
+                self.workers.discard(worker)
+            raise
+        self.workers.release(worker)
+        if "trace" in result:
+            recorder.add_spans(result["trace"]["spans"], base, pid=worker.proc.pid)
+        if profile_output and on_log:
+            on_log(f"[性能] 采样结果 {profile_output}")
+
+        if key:
+            self.cache.put(key, result["segments"])
+        return result["segments"], result["rtf"]
+
+    def run_file(self, input_media, num_threads=None, num_shards=1, duration=0.0):
+        """处理单个文件，返回 True 表示成功"""
+        source_srt = self._source_srt(input_media)
+        name = os.path.basename(input_media)
+        run_config = self._run_config()
+        self.log(f"[运行] {input_media}")
+        self.emit("start", file=input_media, duration=duration)
+        self.manifest.mark_running(input_media, run_config)
+
+        tracker = self.progress or ProgressTracker([(input_media, duration)])
+
+        def on_progress(msg):
+            snapshot = tracker.update(input_media, msg)
+            if snapshot["duration"] > 0:
+                self.log(
+                    f"[进度] {name} {snapshot['fraction']:.0%}（{snapshot['processed']:.0f}/"
+                    f"{snapshot['duration']:.0f} 秒），剩余 {format_eta(snapshot['eta'])}；"
+                    f"整批 {snapshot['batch_fraction']:.0%}，剩余 {format_eta(snapshot['batch_eta'])}"
+                )
+            else:
+                self.log(f"[进度] {name} 已处理 {snapshot['processed']:.1f} 秒")
+            self.emit("progress", **snapshot)
+
+        # 当前文件的进程输出单独缓存，结束后整块输出
+        file_log = [f"[日志] {input_media}"]
+        # 识别进程的原始输出（含断点文件）写在旁边，完成后由后处理结果一次性替换
+        raw_srt = source_srt + ".partial"
+        try:
+            segments, rtf = self.transcribe(
+                input_media,
+                raw_srt,
+                num_threads,
+                num_shards,
+                on_progress=on_progress,
+                on_log=file_log.append,
+                duration=duration,
+            )
+        except WorkerError as exc:
+            file_log.append(f"[失败] 生成字幕失败，请检查缺失文件或日志。({exc})")
+            self._write_run_log(file_log)
+            if self.stop_flag.is_set():
+                self.manifest.mark_pending(input_media, run_config)
+            else:
+                self.manifest.mark_failed(input_media, run_config, exc)
+                self.log("\n".join(file_log))
+                self.emit("failed", file=input_media, error=str(exc))
+            return False
+
+        if rtf is None:
+            file_log.append(f"[缓存] 命中，跳过识别（共 {len(segments)} 段）")
+        else:
+            file_log.append(f"[识别] 共 {len(segments)} 段，RTF = {rtf:.3f}")
+
+        # 识别结果直接在内存中后处理（使用常量中的默认参数），一次渲染所有输出格式
+        try:
+            cues = postprocess_cues(CueStore.from_segments(segments), recorder=self.recorder)
+            with self.recorder.span("write_outputs"):
+                outputs = write_outputs(cues, os.path.splitext(source_srt)[0], self.formats)
+            ok = True
+        except Exception as exc:
+            # 识别输出异常或写入失败都只影响这一个文件，标记失败后继续处理其余文件
+            ok = False
+            reason = "无法写入字幕文件" if isinstance(exc, OSError) else "字幕后处理失败"
+            file_log.append(f"[失败] {reason}: {exc}")
+            self.manifest.mark_failed(input_media, run_config, exc)
+            self.emit("failed", file=input_media, error=str(exc))
+        if ok:
+            try:
+                os.remove(raw_srt)
+            except OSError:
+                pass
+            file_log.append(f"[完成] 生成 {', '.join(outputs)}")
+            self.manifest.mark_done(input_media, run_config, outputs[0], rtf)
+            self.emit(
+                "done",
+                file=input_media,
+                output=outputs[0],
+                outputs=outputs,
+                segments=len(segments),
+                rtf=rtf,
+            )
+        self._write_run_log(file_log)
+        self.log("\n".join(file_log))
+        return ok
+
+    def _plan_workers(self, num_files):
+        return plan_workers(
+            num_files,
+            self.cfg.get("max_workers", 0),
+            self.cfg.get("threads_per_worker", 0),
+            preferred_threads=self.cfg.get("tuned_threads", 0),
+        )
+
+    def run(self, files, resume=False):
+        """
+        处理一批文件（阻塞直到完成或取消）
+        resume 为 True 时按清单跳过已完成的文件
+        返回统计 dict：total, done, failed, skipped, cancelled
+        """
+        with self.warm_lock:
+            self.running = True
+        try:
+            return self._run(files, resume)
+        finally:
+            self.running = False
+
+    def _run(self, files, resume):
+        self.stop_flag.clear()
+        summary = {"total": len(files), "done": 0, "failed": 0, "skipped": 0, "cancelled": False}
+
+        if resume:
+            files, stats = self.manifest.plan(files, self._run_config())
+            summary["skipped"] = stats["done"]
+            summary["failed"] = stats["missing"]
+            self.log(
+                f"[清单] 已完成跳过 {stats['done']}，新增 {stats['new']}，"
+                f"已修改 {stats['changed']}，重试 {stats['retry']}"
+                + (f"，文件不存在 {stats['missing']}" if stats["missing"] else "")
+            )
+            if not files:
+                self.log("[完成] 所有文件均已处理，无需重新运行。")
+                self.emit("finish", **summary)
+                return summary
+
+        env = build_env()
+        ffprobe = shutil.which("ffprobe", path=env["PATH"]) or "ffprobe"
+        jobs = order_by_duration(files, ffprobe)
+
+        num_workers, num_threads = self._plan_workers(len(jobs))
+        total = sum(duration for _, duration in jobs)
+        self.progress = ProgressTracker(jobs)
+        if self.cfg.get("trace_enabled", False):
+            self.recorder = Recorder()
+        self.log(
+            f"[调度] {len(jobs)} 个文件，总时长 {total:.0f} 秒，"
+            f"{num_workers} 个识别进程 × {num_threads} 线程"
+        )
+        self.emit(
+            "plan",
+            files=[path for path, _ in jobs],
+            duration=total,
+            skipped=summary["skipped"],
+            workers=num_workers,
+            threads=num_threads,
+        )
+
+        # 只有一个长文件时，切成多个时间分片并行识别
+        num_shards = 1
+        if (
+            len(jobs) == 1
+            and self.cfg.get("shard_long_files", True)
+            and jobs[0][1] >= self.cfg.get("shard_min_seconds", 1200)
+        ):
+            # 每个分片是一个识别进程，按调优得到（或默认）的每进程线程数切分
+            shard_threads = self.cfg.get("tuned_threads") or DEFAULT_THREADS_PER_WORKER
+            num_shards = max(1, num_threads // shard_threads)
+            if num_shards > 1:
+                self.log(f"[调度] 长文件切分为最多 {num_shards} 个分片并行识别")
+
+        def handle(job):
+            try:
+                ok = self.run_file(job[0], num_threads, num_shards, job[1])
+            except Exception as exc:
+                # 意外错误不能让工作线程退出，否则该文件既不计入结果也不会结束
+                ok = False
+                self.log(f"[错误] {job[0]} 处理失败: {exc}")
+                self.manifest.mark_failed(job[0], self._run_config(), exc)
+                self.emit("failed", file=job[0], error=str(exc))
+            with self.summary_lock:
+                if ok:
+                    summary["done"] += 1
+                elif not self.stop_flag.is_set():
+                    summary["failed"] += 1
+            self.emit("batch", **self.progress.finish(job[0]))
+
+        run_parallel(jobs, num_workers, handle, self.stop_flag)
+        if self.cache:
+            self.log(f"[缓存] {self.cache.stats_line()}")
+        if self.recorder.enabled:
+            self._dump_trace()
+        if self.stop_flag.is_set():
+            summary["cancelled"] = True
+            self.log("[取消] 用户取消运行。")
+        else:
+            self.log("[完成] 全部任务结束。")
+        self.emit("finish", **summary)
+        return summary
+
+    def prewarm(self):
+        """
+        预先启动一个识别进程并加载模型，放入空闲池，第一个任务不必等待模型加载
+        线程数按单个文件规划（与单文件处理、环境自检一致）；批量任务的线程数不同时，
+        该进程会在领取时被替换
+        """
+        with self.warm_lock:
+            if self.running:
+                return False
+            _, num_threads = self._plan_workers(1)
+            cmd = build_worker_command(self.cfg, self._model_dir(), num_threads)
+            try:
+                worker = self.workers.acquire(cmd, env=build_env())
+            except (WorkerError, OSError) as exc:
+                self.log(f"[预热] 识别进程启动失败: {exc}")
+                return False
+            self.workers.release(worker)
+        self.log("[预热] 模型已加载。")
+        return True
+
+    def _dump_trace(self):
+        recorder, self.recorder = self.recorder, NULL_RECORDER
+        path = os.path.join(LOG_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        try:
+            recorder.dump(path, self.cfg.get("trace_format", "chrome"))
+        except OSError as exc:
+            self.log(f"[性能] 无法写入 {path}: {exc}")
+            return
+        self.log(f"[性能] {recorder.stats_line()}")
+        self.log(f"[性能] 已写入 {path}")
+
+    def cancel(self):
+        self.stop_flag.set()
+        # 终止常驻进程以中断当前文件，下次运行时会重新加载模型
+        self.workers.terminate_all()
+
+    def close(self):
+        """结束所有识别进程，关闭清单并写完日志"""
+        self.workers.terminate_all()
+        self.manifest.close()
+        self.run_log.close()
@@ -0,0 +1,423 @@
+"""
+性能基准：不依赖 Tk，直接驱动常驻识别进程
+
+在固定语料（samples/sample.wav + 合成长音频）上遍历 --num-threads、
+批大小和 VAD 参数组合，记录端到端 RTF、各阶段耗时（读取/VAD/识别/后处理）
+与峰值内存，结果写成 JSON，可与上一版本的结果对比发现性能回退
+
+    python bench.py --threads 1,2,4 --batch-sizes 1,8
+    python bench.py --compare logs/bench-20240101-120000.json
+    python bench.py --postprocess-cues 10000     # 只测后处理，不需要模型
+    python bench.py --startup --repeat 5         # 只测界面启动耗时
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+from settings import (
+    LOG_DIR,
+    SAMPLES_DIR,
+    build_env,
+    build_worker_command,
+    load_config,
+    model_paths,
+)
+from subtitles import CueStore, format_timecode, postprocess_cues, postprocess_srt
+from worker_client import RecognizerWorker, WorkerError
+
+
+SYNTHETIC_GAP = 0.6       # 合成音频中两段语音之间的静音(秒)
+
+# 合成字幕用的文本片段（中英混合，含标点、停顿词与保护词）
+SYNTHETIC_PHRASES = [
+    "首先我们需要打开浏览器", "然后登录你的账号", "注意保护隐私和密码安全",
+    "这个功能可以帮助你处理视频文件", "所以建议定期检查系统设置，",
+    "如果下载失败的话请重新安装软件。", "今天的内容就是这些了",
+    "Open the settings page", "and check the network configuration.",
+    "This step is optional,", "but we recommend it!",
+]
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def parse_vad(value):
+    """"0.2:0.25,0.5:0.5" -> [(threshold, min_silence), ...]"""
+    result = []
+    for item in value.split(","):
+        threshold, _, min_silence = item.partition(":")
+        result.append((float(threshold), float(min_silence or 0.25)))
+    return result
+
+
+def make_synthetic(source, path, seconds):
+    """把 source 重复拼接（中间插入静音）成约 seconds 秒的长音频"""
+    with wave.open(source, "rb") as src:
+        params = src.getparams()
+        frames = src.readframes(params.nframes)
+
+    gap = b"\x00" * int(params.framerate * SYNTHETIC_GAP) * params.sampwidth * params.nchannels
+    chunk_seconds = params.nframes / params.framerate + SYNTHETIC_GAP
+    repeats = max(1, int(seconds / chunk_seconds))
+
+    with wave.open(path, "wb") as dst:
+        dst.setparams(params)
+        for _ in range(repeats):
+            dst.writeframes(frames)
+            dst.writeframes(gap)
+    return path
+
+
+def wav_duration(path):
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    except (OSError, wave.Error, EOFError):
+        return 0.0
+
+
+def build_corpus(files, synthetic_minutes, work_dir):
+    corpus = list(files)
+    sample = os.path.join(SAMPLES_DIR, "sample.wav")
+    if not corpus and os.path.isfile(sample):
+        corpus.append(sample)
+    if synthetic_minutes > 0 and os.path.isfile(sample):
+        path = os.path.join(work_dir, f"synthetic-{synthetic_minutes:g}min.wav")
+        corpus.append(make_synthetic(sample, path, synthetic_minutes * 60))
+    return corpus
+
+
+def run_case(cfg, model_dir, corpus, case, work_dir, repeat, on_log):
+    """启动一个识别进程跑完整个语料，返回该参数组合的结果"""
+    extra = [
+        "--max-batch-size", str(case["batch_size"]),
+        "--vad-threshold", str(case["vad_threshold"]),
+        "--vad-min-silence-duration", str(case["vad_min_silence"]),
+    ]
+    cmd = build_worker_command(cfg, model_dir, case["threads"], extra)
+    worker = RecognizerWorker(cmd, env=build_env(), on_log=on_log)
+
+    start_t = time.perf_counter()
+    worker.start()
+    startup = time.perf_counter() - start_t
+
+    files = []
+    peak_rss = 0.0
+    try:
+        for media in corpus:
+            output = os.path.join(work_dir, os.path.splitext(os.path.basename(media))[0] + ".srt")
+            best = None
+            for _ in range(repeat):
+                result = worker.transcribe(media, output, resume=False)
+
+                post_t = time.perf_counter()
+                postprocess_cues(CueStore.from_segments(result["segments"])).write_srt(output)
+                postprocess = time.perf_counter() - post_t
+
+                if best is None or result["elapsed"] < best["elapsed"]:
+                    best = dict(result, postprocess=postprocess)
+
+            timings = dict(best.get("timings", {}))
+            timings["postprocess"] = best["postprocess"]
+            peak_rss = max(peak_rss, best.get("peak_rss_mb", 0.0))
+            files.append(
+                {
+                    "file": os.path.basename(media),
+                    "duration": best["duration"],
+                    "elapsed": best["elapsed"],
+                    "rtf": best["rtf"],
+                    "segments": len(best["segments"]),
+                    "timings": timings,
+                }
+            )
+    finally:
+        worker.close()
+
+    duration = sum(item["duration"] for item in files)
+    elapsed = sum(item["elapsed"] for item in files)
+    return {
+        "case": case,
+        "startup": startup,
+        "duration": duration,
+        "elapsed": elapsed,
+        "rtf": elapsed / duration if duration > 0 else 0.0,
+        "peak_rss_mb": peak_rss,
+        "files": files,
+    }
+
+
+def make_synthetic_srt(path, num_cues, seed=0):
+    """生成 num_cues 条随机字幕（时长与间隔也随机），用于后处理基准"""
+    rng = random.Random(seed)
+    blocks = []
+    t = 0.0
+    for idx in range(1, num_cues + 1):
+        text = "".join(rng.choice(SYNTHETIC_PHRASES) for _ in range(rng.randint(1, 4)))
+        duration = rng.uniform(0.3, 6.0)
+        blocks.append(f"{idx}\n{format_timecode(t)} --> {format_timecode(t + duration)}\n{text}")
+        t += duration + rng.uniform(0.0, 0.5)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(blocks))
+
+
+def bench_postprocess(num_cues, repeat, work_dir):
+    """对合成字幕文件计时 postprocess_srt，取最快一次"""
+    source = os.path.join(work_dir, "source.srt")
+    target = os.path.join(work_dir, "target.srt")
+    make_synthetic_srt(source, num_cues)
+    with open(source, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    best = None
+    for _ in range(repeat):
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(content)
+        start_t = time.perf_counter()
+        postprocess_srt(target)
+        elapsed = time.perf_counter() - start_t
+        best = elapsed if best is None else min(best, elapsed)
+    return {"cues": num_cues, "repeat": repeat, "elapsed": best, "per_cue_us": best / num_cues * 1e6}
+
+
+# 在新进程中运行：导入界面模块、创建窗口并处理完首批事件、等待后台初始化完成
+# 没有图形环境时（TclError）只记录导入耗时
+STARTUP_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import main
+result = {"import": time.perf_counter() - t0}
+try:
+    app = main.SubtitleMakerApp()
+except Exception as exc:
+    result["error"] = str(exc)
+else:
+    app.update()
+    result["window"] = time.perf_counter() - t0
+    app.runner_ready.wait(60)
+    result["ready"] = time.perf_counter() - t0
+    app.cfg["prewarm_worker"] = False
+    app._on_close()
+print(json.dumps(result))
+"""
+
+
+def slowest_imports(top=8):
+    """python -X importtime 导入 main 时累计耗时最多的模块 [(模块, 秒), ...]"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    items = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        items.append((name.strip(), int(cumulative) / 1e6))
+    items.sort(key=lambda item: -item[1])
+    return items[:top]
+
+
+def bench_startup(repeat):
+    """在新进程中计时界面启动，各项取最快一次；process 为含解释器启动的总耗时"""
+    best = {}
+    error = ""
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", STARTUP_SNIPPET],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        process = time.perf_counter() - start_t
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"启动失败，返回码 {proc.returncode}")
+        result = json.loads(lines[-1])
+        error = result.pop("error", error)
+        result["process"] = process
+        for name, seconds in result.items():
+            best[name] = min(seconds, best.get(name, seconds))
+    return {"repeat": repeat, "seconds": best, "no_display": error, "imports": slowest_imports()}
+
+
+def compare_startup(result, baseline, tolerance):
+    """与基线逐项对比启动耗时，返回回退项列表"""
+    regressions = []
+    base = baseline.get("startup", {}).get("seconds", {})
+    for name, seconds in result["seconds"].items():
+        ref = base.get(name)
+        if not ref:
+            continue
+        change = seconds / ref - 1
+        line = f"startup {name}: {ref * 1000:.0f} -> {seconds * 1000:.0f} ms ({change:+.1%})"
+        print(line)
+        if change > tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def case_name(case):
+    return (
+        f"threads={case['threads']} batch={case['batch_size']} "
+        f"vad={case['vad_threshold']}:{case['vad_min_silence']}"
+    )
+
+
+def compare(report, baseline, tolerance):
+    """与基线逐项对比 RTF，返回回退项列表"""
+    base_runs = {case_name(run["case"]): run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        name = case_name(run["case"])
+        base = base_runs.get(name)
+        if base is None:
+            continue
+        base_files = {item["file"]: item for item in base["files"]}
+        for item in run["files"]:
+            ref = base_files.get(item["file"])
+            if ref is None or ref["rtf"] <= 0:
+                continue
+            change = item["rtf"] / ref["rtf"] - 1
+            line = f"{name} {item['file']}: RTF {ref['rtf']:.4f} -> {item['rtf']:.4f} ({change:+.1%})"
+            print(line)
+            if change > tolerance:
+                regressions.append(line)
+    return regressions
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="字幕识别性能基准")
+    parser.add_argument("files", nargs="*", help="语料文件，默认使用 samples/sample.wav")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--threads", default="1,2,4", help="--num-threads 取值，逗号分隔")
+    parser.add_argument("--batch-sizes", default="1,8", help="--max-batch-size 取值，逗号分隔")
+    parser.add_argument(
+        "--vad",
+        default="0.2:0.25",
+        help="VAD 参数组合 threshold:min_silence，逗号分隔",
+    )
+    parser.add_argument("--synthetic-minutes", type=float, default=10, help="合成长音频时长(分钟)，0 表示不生成")
+    parser.add_argument("--repeat", type=int, default=1, help="每个文件重复次数，取最快一次")
+    parser.add_argument("--output", default="", help="结果 JSON 路径，默认 logs/bench-<时间>.json")
+    parser.add_argument("--compare", default="", help="基线 JSON，RTF 变慢超过 --tolerance 时返回 1")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的 RTF 回退比例")
+    parser.add_argument("--verbose", action="store_true", help="输出识别进程日志")
+    parser.add_argument(
+        "--postprocess-cues",
+        type=int,
+        default=0,
+        help="只对该条数的合成字幕测后处理耗时（不启动识别进程）",
+    )
+    parser.add_argument("--startup", action="store_true", help="只测界面启动耗时（不启动识别进程）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+    if args.startup:
+        try:
+            result = bench_startup(max(1, args.repeat))
+        except RuntimeError as exc:
+            print(exc, file=sys.stderr)
+            return 2
+        if result["no_display"]:
+            print(f"没有图形环境，只测导入耗时（{result['no_display']}）")
+        for name, seconds in result["seconds"].items():
+            print(f"{name}: {seconds * 1000:.0f} ms")
+        print("导入最慢的模块：" + "，".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in result["imports"]))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"startup": result}, f, ensure_ascii=False, indent=2)
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            regressions = compare_startup(result, baseline, args.tolerance)
+            if regressions:
+                print(f"启动变慢 {len(regressions)} 项（容差 {args.tolerance:.0%}）")
+                return 1
+            print("未发现启动变慢")
+        return 0
+
+    if args.postprocess_cues > 0:
+        with tempfile.TemporaryDirectory(prefix="srt-bench-") as work_dir:
+            result = bench_postprocess(args.postprocess_cues, max(1, args.repeat), work_dir)
+        print(f"后处理 {result['cues']} 条：{result['elapsed']:.3f} 秒（{result['per_cue_us']:.1f} 微秒/条）")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"postprocess": result}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    cfg = load_config()
+    model_dir, _ = model_paths(cfg, args.model_dir)
+    on_log = (lambda line: print(line, file=sys.stderr)) if args.verbose else None
+
+    cases = [
+        {"threads": threads, "batch_size": batch_size, "vad_threshold": threshold, "vad_min_silence": min_silence}
+        for threads in parse_list(args.threads, int)
+        for batch_size in parse_list(args.batch_sizes, int)
+        for threshold, min_silence in parse_vad(args.vad)
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="srt-bench-") as work_dir:
+        corpus = build_corpus(args.files, args.synthetic_minutes, work_dir)
+        if not corpus:
+            print("没有可用的语料文件", file=sys.stderr)
+            return 2
+
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "model_dir": model_dir,
+            "corpus": [{"file": os.path.basename(path), "duration": wav_duration(path)} for path in corpus],
+            "runs": [],
+        }
+
+        for case in cases:
+            print(f"[{case_name(case)}]", flush=True)
+            try:
+                run = run_case(cfg, model_dir, corpus, case, work_dir, max(1, args.repeat), on_log)
+            except WorkerError as exc:
+                print(f"  失败: {exc}", file=sys.stderr)
+                return 2
+            report["runs"].append(run)
+            for item in run["files"]:
+                stages = " ".join(f"{name}={seconds:.3f}s" for name, seconds in item["timings"].items())
+                print(f"  {item['file']}: RTF {item['rtf']:.4f} ({stages})")
+            print(f"  启动 {run['startup']:.2f}s，总 RTF {run['rtf']:.4f}，峰值内存 {run['peak_rss_mb']:.0f} MB")
+
+    output = args.output
+    if not output:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        output = os.path.join(LOG_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"性能回退 {len(regressions)} 项（容差 {args.tolerance:.0%}）")
+            return 1
+        print("未发现性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+
+
+HASH_CHUNK = 1024 * 1024
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TranscriptCache:
+    """
+    识别结果缓存（内容寻址）
+    键：媒体文件哈希 + 模型文件哈希 + 识别/VAD 参数
+    值：后处理之前的原始分段 [[start, duration, text(, tokens)], ...]
+    超过容量时按最近使用时间（文件 mtime）淘汰
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+
+        # 文件哈希按 (大小, 修改时间) 记忆，避免每次重新读取大文件
+        self._digest_path = os.path.join(root, "digests.json")
+        try:
+            with open(self._digest_path, "r", encoding="utf-8") as f:
+                self._digests = json.load(f)
+        except (OSError, ValueError):
+            self._digests = {}
+
+    def file_digest(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            memo = self._digests.get(path)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime:
+            return memo[2]
+
+        digest = sha256_file(path)
+        with self.lock:
+            self._digests[path] = [st.st_size, st.st_mtime, digest]
+            tmp = self._digest_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._digests, f)
+            os.replace(tmp, self._digest_path)
+        return digest
+
+    def make_key(self, media_path, model_files, params, media_digest=None):
+        """media_digest 为已知的媒体文件哈希时直接使用，不读取、也不记忆该路径"""
+        h = hashlib.sha256()
+        h.update((media_digest or self.file_digest(media_path)).encode())
+        for path in model_files:
+            h.update(self.file_digest(path).encode())
+        h.update(json.dumps(params, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                segments = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        # 更新 mtime 作为最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return segments
+
+    def put(self, key, segments):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(segments, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            sub = os.path.join(self.root, name)
+            if len(name) != 2 or not os.path.isdir(sub):
+                continue
+            for entry in os.listdir(sub):
+                if not entry.endswith(".json"):
+                    continue
+                path = os.path.join(sub, entry)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """删除最久未使用的条目，直到总大小不超过上限"""
+        with self.lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+
+    def stats_line(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        return (
+            f"命中 {self.hits} / 未命中 {self.misses} / 淘汰 {self.evictions}，"
+            f"{len(entries)} 条，占用 {total / 1024 / 1024:.1f} MB"
+            f" / {self.max_bytes / 1024 / 1024:.0f} MB"
+        )
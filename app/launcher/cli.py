@@ -0,0 +1,168 @@
+"""
+命令行入口（无图形界面），适合在服务器或任务调度器中批量生成字幕
+
+    python cli.py 视频目录/ --json
+    python cli.py a.mp4 b.mp4 --output-dir ./SRT_OUT
+    python cli.py a.mp4 --formats srt,vtt,json
+    python cli.py a.mp4 --trace --profile sample    # 性能分析，结果写到 logs/
+
+--json 时 stdout 每行一个 JSON 事件（plan/start/progress/done/failed/batch/finish），
+文本日志写到 stderr；stderr 是终端时在底部显示当前文件与整批的进度条和预计剩余时间
+
+返回码：
+    0  全部成功
+    1  部分文件失败
+    2  参数错误或缺少模型/依赖文件
+    130  被中断（Ctrl+C）
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成字幕（命令行）")
+    parser.add_argument("inputs", nargs="+", help="媒体文件或文件夹")
+    parser.add_argument("--config", default="", help="配置文件，默认使用 launcher/config.json")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--output-dir", default="", help="输出目录，默认取 config.json")
+    parser.add_argument("--formats", default="", help="输出格式 srt,vtt,ass,json，默认取 config.json")
+    parser.add_argument("--force", action="store_true", help="忽略任务清单，重新处理已完成的文件")
+    parser.add_argument("--json", action="store_true", help="在 stdout 输出 JSON lines 事件")
+    parser.add_argument("--quiet", action="store_true", help="不输出文本日志")
+    parser.add_argument("--no-progress", action="store_true", help="不显示进度条")
+    parser.add_argument("--trace", action="store_true", help="记录各阶段耗时，写到 logs/trace-<时间>.json")
+    parser.add_argument(
+        "--profile",
+        default="",
+        choices=["", "cprofile", "sample"],
+        help="对每个文件做 cProfile 或全线程栈采样，写到 logs/profile/",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+
+    # 参数解析之后再导入，--help 等情况下启动更快
+    from batch import BatchRunner, collect_files
+    from progress import format_eta, render_bar
+    from settings import load_config
+
+    out_lock = threading.Lock()
+    show_bar = sys.stderr.isatty() and not args.no_progress
+    bar = {"line": ""}
+
+    def draw_bar():
+        if bar["line"]:
+            sys.stderr.write("\r\033[K" + bar["line"])
+            sys.stderr.flush()
+
+    def on_log(msg):
+        if args.quiet or (show_bar and msg.startswith("[进度]")):
+            return
+        with out_lock:
+            if bar["line"]:
+                sys.stderr.write("\r\033[K")
+            print(msg, file=sys.stderr, flush=True)
+            draw_bar()
+
+    def update_bar(event):
+        line = (
+            f"整批 {render_bar(event['batch_fraction'], 20)} {event['batch_fraction']:.0%} "
+            f"{event['files_done']}/{event['files_total']} 个文件，剩余 {format_eta(event['batch_eta'])}"
+        )
+        if event["event"] == "progress":
+            name = os.path.basename(event["file"])
+            line += (
+                f" | {name} {render_bar(event['fraction'], 12)} {event['fraction']:.0%}"
+                f" 剩余 {format_eta(event['eta'])}"
+            )
+        bar["line"] = line
+        draw_bar()
+
+    def on_event(event):
+        with out_lock:
+            if show_bar and event["event"] in ("progress", "batch"):
+                update_bar(event)
+            elif show_bar and event["event"] == "finish" and bar["line"]:
+                sys.stderr.write("\n")
+                bar["line"] = ""
+            if args.json:
+                sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+
+    cfg = load_config(args.config)
+    if args.trace:
+        cfg["trace_enabled"] = True
+    if args.profile:
+        cfg["profile_mode"] = args.profile
+    try:
+        runner = BatchRunner(
+            cfg,
+            model_dir=args.model_dir,
+            output_dir=args.output_dir,
+            on_log=on_log,
+            on_event=on_event if (args.json or show_bar) else None,
+            formats=args.formats,
+        )
+    except ValueError as exc:
+        on_log(f"[错误] {exc}")
+        if args.json:
+            on_event({"event": "error", "error": str(exc)})
+        return EXIT_USAGE
+    try:
+        missing = runner.check_requirements()
+        if missing:
+            on_log("缺少以下文件：\n" + "\n".join(missing))
+            if args.json:
+                on_event({"event": "error", "error": "missing", "files": missing})
+            return EXIT_USAGE
+
+        files = []
+        for path in args.inputs:
+            try:
+                if os.path.isdir(path):
+                    files.extend(collect_files(runner.cfg, input_dir=path))
+                else:
+                    files.extend(collect_files(runner.cfg, input_file=path))
+            except ValueError as exc:
+                on_log(f"[错误] {path}: {exc}")
+                if args.json:
+                    on_event({"event": "error", "error": str(exc), "file": path})
+                return EXIT_USAGE
+
+        result = {}
+        thread = threading.Thread(
+            target=lambda: result.update(runner.run(files, resume=not args.force)),
+            daemon=True,
+        )
+        thread.start()
+        try:
+            # 主线程保持可中断，Ctrl+C 时终止识别进程
+            while thread.is_alive():
+                thread.join(0.2)
+        except KeyboardInterrupt:
+            runner.cancel()
+            thread.join()
+            return EXIT_INTERRUPTED
+
+        if not result:
+            return EXIT_FAILED
+        if result["cancelled"]:
+            return EXIT_INTERRUPTED
+        return EXIT_FAILED if result["failed"] else EXIT_OK
+    finally:
+        runner.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+"""
+模型下载（不依赖 Tk）：分段并行、断点续传、SHA-256 校验、压缩包流式解压
+
+普通文件：服务器支持 Range 时按 segments 段并行下载到 <目标>.part，进度记录在
+<目标>.part.json，中断后再次运行从各段已下载的位置继续；校验通过后才改名为目标文件
+压缩包（.tar.bz2 / .tar.gz / .tar.xz）：边下载边解压，只取出配置中列出的文件，
+不在磁盘上保存整个压缩包；没有配置 sha256 时取齐所需文件即停止下载。
+流式解压无法从中途继续，中断后只跳过已经取出的文件、重新下载压缩包
+
+config.json 的 download_sources：
+    "github": {
+        "paraformer": {
+            "url": "https://.../sherpa-onnx-paraformer-trilingual-zh-cantonese-en.tar.bz2",
+            "sha256": "",
+            "files": {"tokens.txt": "tokens.txt", "{model_file}": "{model_file}"}
+        },
+        "silero_vad": {"url": "https://.../silero_vad.onnx", "sha256": "", "file": "silero_vad.onnx"}
+    }
+files 为 {目标文件名: 压缩包内文件名（按文件名匹配，不含目录）}；旧格式的 "名称": "URL" 仍可使用
+
+    python downloader.py --source github
+    python downloader.py --source github --model-dir D:/models --config test.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib import request
+from urllib.error import URLError
+
+from settings import load_config, model_file, resolve_path
+
+
+ARCHIVE_SUFFIXES = (".tar.bz2", ".tbz2", ".tar.gz", ".tgz", ".tar.xz", ".txz")
+USER_AGENT = "SubtitleMaker-Downloader"
+
+# 旧格式 "名称": "URL" 对应的目标文件
+LEGACY_TARGETS = {"tokens": "tokens.txt", "paraformer": "{model_file}", "silero_vad": "silero_vad.onnx"}
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadItem:
+    """
+    一个下载来源：url 为普通文件时 files 只有一项；为压缩包时 files 为
+    {目标路径: 压缩包内文件名}
+    """
+
+    def __init__(self, name, url, files, sha256="", archive=None):
+        self.name = name
+        self.url = url
+        self.files = files
+        self.sha256 = (sha256 or "").lower()
+        self.archive = is_archive(url) if archive is None else archive
+
+    def missing(self):
+        return [path for path in self.files if not os.path.isfile(path)]
+
+
+def is_archive(url):
+    path = url.split("?", 1)[0].lower()
+    return path.endswith(ARCHIVE_SUFFIXES)
+
+
+def plan_downloads(cfg, source, model_dir, only_missing=True):
+    """按 download_sources[source] 生成下载列表；同一 URL 的多个条目合并为一项"""
+    entries = cfg.get("download_sources", {}).get(source, {})
+    names = {"model_file": model_file(cfg)}
+    items = {}
+    for name, entry in entries.items():
+        if isinstance(entry, str):
+            target = LEGACY_TARGETS.get(name, name).format(**names)
+            entry = {"url": entry, "files": {target: target}}
+        url = entry.get("url", "")
+        if not url:
+            continue
+        files = entry.get("files") or {entry.get("file") or os.path.basename(url.split("?", 1)[0]): ""}
+        item = items.get(url)
+        if item is None:
+            item = items[url] = DownloadItem(name, url, {}, entry.get("sha256", ""), entry.get("archive"))
+        for target, member in files.items():
+            # 目标文件只取文件名，压缩包里的路径不会影响写入位置
+            target = os.path.basename(target.format(**names))
+            item.files[os.path.join(model_dir, target)] = os.path.basename((member or target).format(**names))
+    plan = list(items.values())
+    if only_missing:
+        plan = [item for item in plan if item.missing()]
+    return plan
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _HashingReader:
+    """包装 HTTP 响应：读取时累计 SHA-256 与进度，供 tarfile 流式读取"""
+
+    def __init__(self, raw, on_bytes):
+        self.raw = raw
+        self.on_bytes = on_bytes
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if data:
+            self.digest.update(data)
+            self.on_bytes(len(data))
+        return data
+
+
+class Downloader:
+    """
+    on_progress(name, done, total)：已下载字节数，total 未知时为 0；在下载线程中调用
+    stop_event 置位后尽快停止（已下载部分保留，下次继续）
+    """
+
+    def __init__(
+        self,
+        segments=4,
+        chunk_size=256 * 1024,
+        retries=3,
+        timeout=30,
+        on_progress=None,
+        on_log=None,
+        stop_event=None,
+    ):
+        self.segments = max(1, segments)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.on_log = on_log
+        self.stop_event = stop_event or threading.Event()
+
+    def log(self, msg):
+        if self.on_log:
+            self.on_log(msg)
+
+    def _open(self, url, start=None, end=None):
+        headers = {"User-Agent": USER_AGENT}
+        if start is not None:
+            headers["Range"] = f"bytes={start}-" + ("" if end is None else str(end))
+        return request.urlopen(request.Request(url, headers=headers), timeout=self.timeout)
+
+    def _check_stop(self):
+        if self.stop_event.is_set():
+            raise DownloadError("下载已取消")
+
+    # ---- 普通文件 ----
+
+    def probe(self, url):
+        """返回 (总字节数, 是否支持 Range, 版本标识)；总字节数未知时为 0"""
+        with self._open(url, 0, 0) as resp:
+            etag = resp.headers.get("ETag") or resp.headers.get("Last-Modified") or ""
+            if resp.status == 206:
+                total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit():
+                    return int(total), True, etag
+            return int(resp.headers.get("Content-Length") or 0), False, etag
+
+    def download_file(self, url, dest, sha256="", name=""):
+        """下载到 dest（先写 dest.part，校验通过后改名）"""
+        name = name or os.path.basename(dest)
+        part = dest + ".part"
+        state_path = part + ".json"
+        total, ranges, etag = self.probe(url)
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+
+        state = None
+        if ranges and total and os.path.isfile(part) and os.path.isfile(state_path):
+            state = self._load_state(state_path, url, total, etag)
+        if state:
+            done = sum(seg[2] for seg in state["segments"])
+            self.log(f"[下载] {name} 从 {done / 1048576:.1f} MB 处继续")
+        elif ranges and total:
+            state = {"url": url, "size": total, "etag": etag, "segments": self._split(total)}
+            with open(part, "wb") as f:
+                f.truncate(total)
+
+        if state:
+            self._download_segments(url, part, state, state_path, name)
+        else:
+            self._download_stream(url, part, total, name)
+
+        self._check_stop()
+        if sha256:
+            actual = file_sha256(part)
+            if actual != sha256.lower():
+                self._remove(part, state_path)
+                raise DownloadError(f"{name} SHA-256 不匹配（期望 {sha256}，实际 {actual}）")
+        os.replace(part, dest)
+        self._remove(state_path)
+        return dest
+
+    @staticmethod
+    def _load_state(state_path, url, total, etag):
+        """读取续传状态；文件损坏、结构不对或与服务器上的文件不符时返回 None（当作没有）"""
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict):
+            return None
+        if state.get("url") != url or state.get("size") != total or state.get("etag") != etag:
+            return None
+        segments = state.get("segments")
+        if not isinstance(segments, list) or not segments:
+            return None
+        for seg in segments:
+            if not (isinstance(seg, list) and len(seg) == 3 and all(type(v) is int for v in seg)):
+                return None
+            start, end, done = seg
+            if not (0 <= start <= end < total and 0 <= done <= end + 1 - start):
+                return None
+        return state
+
+    def _split(self, total):
+        """[[start, end(含), 已下载字节数], ...]；小文件不切分"""
+        count = max(1, min(self.segments, total // (4 * self.chunk_size) or 1))
+        size = -(-total // count)
+        return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+    def _download_segments(self, url, part, state, state_path, name):
+        lock = threading.Lock()
+        total = state["size"]
+        progress = {"done": sum(seg[2] for seg in state["segments"]), "saved": time.monotonic()}
+
+        def save_state(force=False):
+            # 调用方持有 lock
+            now = time.monotonic()
+            if force or now - progress["saved"] >= 1.0:
+                progress["saved"] = now
+                with open(state_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+
+        def fetch(seg):
+            for attempt in range(self.retries + 1):
+                start = seg[0] + seg[2]
+                if start > seg[1]:
+                    return
+                try:
+                    with self._open(url, start, seg[1]) as resp, open(part, "r+b") as f:
+                        if resp.status != 206:
+                            raise DownloadError("服务器不再支持分段下载")
+                        f.seek(start)
+                        while True:
+                            self._check_stop()
+                            data = resp.read(min(self.chunk_size, seg[1] + 1 - seg[0] - seg[2]))
+                            if not data:
+                                break
+                            f.write(data)
+                            f.flush()
+                            with lock:
+                                seg[2] += len(data)
+                                progress["done"] += len(data)
+                                done = progress["done"]
+                                save_state()
+                            self._progress(name, done, total)
+                    if seg[0] + seg[2] > seg[1]:
+                        return
+                except (URLError, OSError) as exc:
+                    if attempt >= self.retries:
+                        raise DownloadError(f"{name} 下载失败: {exc}")
+                    self.stop_event.wait(min(2 ** attempt, 10))
+                    self._check_stop()
+            raise DownloadError(f"{name} 下载不完整（连接多次提前断开）")
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(state["segments"])) as pool:
+                for future in [pool.submit(fetch, seg) for seg in state["segments"]]:
+                    future.result()
+        finally:
+            with lock:
+                save_state(force=True)
+
+    def _download_stream(self, url, part, total, name):
+        """服务器不支持 Range：单连接从头下载"""
+        done = 0
+        with self._open(url) as resp, open(part, "wb") as f:
+            while True:
+                self._check_stop()
+                data = resp.read(self.chunk_size)
+                if not data:
+                    break
+                f.write(data)
+                done += len(data)
+                self._progress(name, done, total)
+        if total and done != total:
+            raise DownloadError(f"{name} 下载不完整（{done}/{total} 字节）")
+
+    # ---- 压缩包 ----
+
+    def download_archive(self, url, members, sha256="", name=""):
+        """
+        边下载边解压：members 为 {压缩包内文件名: 目标路径}，按文件名匹配
+        已存在的目标文件跳过；全部取出且不需要校验时提前结束下载
+        """
+        name = name or os.path.basename(url.split("?", 1)[0])
+        wanted = {member: dest for member, dest in members.items() if not os.path.isfile(dest)}
+        if not wanted:
+            return []
+        extracted = {}
+        done = [0]
+
+        def on_bytes(n):
+            done[0] += n
+            self._progress(name, done[0], total)
+
+        try:
+            with self._open(url) as resp:
+                total = int(resp.headers.get("Content-Length") or 0)
+                reader = _HashingReader(resp, on_bytes)
+                with tarfile.open(fileobj=reader, mode="r|*") as tar:
+                    for member in tar:
+                        self._check_stop()
+                        dest = wanted.get(os.path.basename(member.name))
+                        if dest is None or not member.isfile() or dest in extracted.values():
+                            continue
+                        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+                        src = tar.extractfile(member)
+                        with open(dest + ".part", "wb") as f:
+                            for block in iter(lambda: src.read(self.chunk_size), b""):
+                                self._check_stop()
+                                f.write(block)
+                        extracted[member.name] = dest
+                        self.log(f"[下载] {name}：已取出 {os.path.basename(dest)}")
+                        if len(extracted) == len(wanted) and not sha256:
+                            break
+                if sha256:
+                    # 读完剩余部分，校验整个压缩包
+                    while reader.read(self.chunk_size):
+                        self._check_stop()
+        except (tarfile.TarError, EOFError, URLError, OSError) as exc:
+            self._remove(*(dest + ".part" for dest in extracted.values()))
+            raise DownloadError(f"{name} 下载或解压失败: {exc}")
+        except DownloadError:
+            self._remove(*(dest + ".part" for dest in extracted.values()))
+            raise
+
+        missing = sorted(set(wanted) - {os.path.basename(path) for path in extracted})
+        if sha256 and reader.digest.hexdigest() != sha256.lower():
+            self._remove(*(dest + ".part" for dest in extracted.values()))
+            raise DownloadError(f"{name} SHA-256 不匹配（实际 {reader.digest.hexdigest()}）")
+        for dest in extracted.values():
+            os.replace(dest + ".part", dest)
+        if missing:
+            raise DownloadError(f"{name} 中没有找到: {', '.join(missing)}")
+        return list(extracted.values())
+
+    # ---- 批量 ----
+
+    def fetch(self, item):
+        if item.archive:
+            members = {member: path for path, member in item.files.items()}
+            return self.download_archive(item.url, members, item.sha256, item.name)
+        dest = next(iter(item.files))
+        return [self.download_file(item.url, dest, item.sha256, item.name)]
+
+    def run(self, items, max_parallel=3):
+        """并行下载多项，返回 (成功的目标文件列表, [(item, 错误), ...])"""
+        done, failed = [], []
+        if not items:
+            return done, failed
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(items)))) as pool:
+            futures = [(item, pool.submit(self.fetch, item)) for item in items]
+            for item, future in futures:
+                try:
+                    done.extend(future.result())
+                except Exception as exc:
+                    failed.append((item, exc))
+        return done, failed
+
+    def _progress(self, name, done, total):
+        if self.on_progress:
+            self.on_progress(name, done, total)
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="下载缺失的模型文件")
+    parser.add_argument("--config", default="", help="配置文件，默认使用 launcher/config.json")
+    parser.add_argument("--source", default="github", help="download_sources 中的来源名")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--segments", type=int, default=4, help="单个文件的并行分段数")
+    parser.add_argument("--all", action="store_true", help="已存在的文件也重新下载")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+    cfg = load_config(args.config)
+    model_dir = resolve_path(args.model_dir, cfg.get("default_model_dir"))
+    items = plan_downloads(cfg, args.source, model_dir, only_missing=not args.all)
+    if not items:
+        print("没有需要下载的文件")
+        return 0
+
+    last = {}
+
+    def on_progress(name, done, total):
+        now = time.monotonic()
+        if now - last.get(name, 0) >= 1.0 or done == total:
+            last[name] = now
+            size = f"{done / 1048576:.1f}/{total / 1048576:.1f} MB" if total else f"{done / 1048576:.1f} MB"
+            print(f"[下载] {name} {size}", file=sys.stderr, flush=True)
+
+    downloader = Downloader(args.segments, on_progress=on_progress, on_log=lambda msg: print(msg, file=sys.stderr))
+    if args.all:
+        for item in items:
+            for path in item.files:
+                Downloader._remove(path)
+    done, failed = downloader.run(items)
+    for path in done:
+        print(f"[完成] {path}")
+    for item, exc in failed:
+        print(f"[失败] {item.name}: {exc}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+性能埋点（可选）：各阶段计时与计数，导出为 JSON 汇总或 Chrome trace
+（chrome://tracing、https://ui.perfetto.dev 可直接打开）
+
+关闭时使用 NULL_RECORDER：span() 返回同一个空上下文，count() 直接返回，
+热路径上只多一次方法调用
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+TRACE_FORMATS = ("chrome", "json")
+
+
+def percentile(values, q):
+    """values 的 q 分位数（0~1，取最近的样本）；为空时返回 0"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class NullRecorder:
+    """关闭埋点时的占位实现"""
+
+    enabled = False
+    _span = contextlib.nullcontext()
+
+    def span(self, name, **args):
+        return self._span
+
+    def count(self, name, value=1):
+        pass
+
+    def add_spans(self, spans, base, pid=None, cat="worker"):
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.recorder.clock()
+        return self
+
+    def __exit__(self, *exc):
+        recorder = self.recorder
+        recorder.add(self.name, self.start - recorder.origin, recorder.clock() - self.start, args=self.args)
+
+
+class Recorder:
+    """
+    记录各阶段的耗时区间（span）与计数，可在多个线程中使用
+    时间以创建时刻为原点（秒）；识别进程的区间用 add_spans() 按任务开始时刻平移后并入
+    """
+
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = []          # (name, cat, start, dur, pid, tid, args)
+        self.totals = {}          # name -> [秒数, 次数]
+        self.counters = {}
+        self.process_names = {self.pid: "launcher"}
+
+    def now(self):
+        """相对原点的当前时间（秒）"""
+        return self.clock() - self.origin
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def add(self, name, start, dur, cat="launcher", pid=None, tid=None, args=None):
+        event = (name, cat, start, dur, pid or self.pid, tid or threading.get_ident(), args)
+        with self.lock:
+            self.events.append(event)
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += dur
+            total[1] += 1
+
+    def add_spans(self, spans, base, pid=None, cat="worker"):
+        """识别进程返回的 [[stage, start, dur, tid], ...]，start 相对任务开始；base 为任务开始时的 now()"""
+        if pid is not None:
+            self.process_names.setdefault(pid, f"worker {pid}")
+        for name, start, dur, tid in spans:
+            self.add(name, base + start, dur, cat=cat, pid=pid, tid=tid)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        with self.lock:
+            stages = {
+                name: {"seconds": round(seconds, 6), "calls": calls}
+                for name, (seconds, calls) in sorted(self.totals.items(), key=lambda item: -item[1][0])
+            }
+            return {"elapsed": round(self.now(), 6), "stages": stages, "counters": dict(self.counters)}
+
+    def chrome_trace(self):
+        """Chrome trace 事件格式（时间单位为微秒），汇总放在 otherData"""
+        with self.lock:
+            events = list(self.events)
+            names = dict(self.process_names)
+        trace = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+            for pid, name in names.items()
+        ]
+        for name, cat, start, dur, pid, tid, args in events:
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(start * 1e6, 1),
+                "dur": round(dur * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def dump(self, path, fmt="chrome"):
+        """写出 trace（chrome）或只写汇总（json），返回路径"""
+        data = self.chrome_trace() if fmt == "chrome" else self.summary()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        return path
+
+    def stats_line(self, top=6):
+        stages = self.summary()["stages"]
+        return "，".join(
+            f"{name} {item['seconds']:.3f}s×{item['calls']}" for name, item in list(stages.items())[:top]
+        )
@@ -0,0 +1,132 @@
+"""
+实时字幕：对直播流/采集设备/管道的音频边识别边输出字幕
+
+    ffmpeg -i rtmp://... -f s16le -ac 1 -ar 16000 - | python live.py -
+    python live.py rtmp://example/live --output live.srt
+    python live.py /tmp/audio.fifo --json
+
+"-" 表示从 stdin 读取 16kHz 单声道 s16le PCM，其他输入交给 ffmpeg 解码
+每个 VAD 分段结束后立即识别，经低延迟后处理（LiveCueFilter）后输出；
+结束时报告端到端延迟（最后一个采样到达 → 字幕输出）
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from instrument import percentile
+from scheduler import DEFAULT_THREADS_PER_WORKER
+from settings import build_env, build_script_command, load_config, model_paths
+from subtitles import LiveCueFilter, format_timecode
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="实时字幕")
+    parser.add_argument("source", nargs="?", default="-", help="音频来源，- 为 stdin PCM")
+    parser.add_argument("--config", default="", help="配置文件，默认使用 launcher/config.json")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--threads", type=int, default=0, help="推理线程数，0 为自动")
+    parser.add_argument("--output", default="", help="同时把字幕逐条写入该 SRT 文件")
+    parser.add_argument("--json", action="store_true", help="stdout 输出 JSON lines（partial/cue/stats）")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="每次读取的音频长度(毫秒)")
+    parser.add_argument("--partial-interval", type=float, default=1.0, help="中间结果间隔(秒)，0 关闭")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+    cfg = load_config(args.config)
+    model_dir, _ = model_paths(cfg, args.model_dir)
+    threads = args.threads or min(DEFAULT_THREADS_PER_WORKER, os.cpu_count() or 1)
+
+    cmd = build_script_command(
+        cfg,
+        model_dir,
+        threads,
+        [
+            "--live",
+            "--live-chunk-ms", str(args.chunk_ms),
+            "--partial-interval", str(args.partial_interval),
+            args.source,
+        ],
+    )
+    # stdin 直接交给识别进程，"-" 时由它读取 PCM
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        env=build_env(),
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        bufsize=1,
+    )
+
+    def emit(msg):
+        sys.stdout.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    cue_filter = LiveCueFilter()
+    srt = open(args.output, "w", encoding="utf-8") if args.output else None
+    count = 0
+    latencies = []
+    try:
+        for line in proc.stdout:
+            received = time.perf_counter()
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+
+            kind = msg.get("type")
+            if kind == "partial":
+                if args.json:
+                    emit(msg)
+                else:
+                    print(f"[部分] {msg['text']}", file=sys.stderr, flush=True)
+            elif kind == "cue":
+                start = msg["start"]
+                for cue_start, cue_end, text in cue_filter.process(start, start + msg["duration"], msg["text"]):
+                    count += 1
+                    block = f"{count}\n{format_timecode(cue_start)} --> {format_timecode(cue_end)}\n{text}\n\n"
+                    if srt:
+                        srt.write(block)
+                        srt.flush()
+                    latency = msg["latency"] + time.perf_counter() - received
+                    latencies.append(latency)
+                    if args.json:
+                        emit({"type": "cue", "index": count, "start": cue_start, "end": cue_end,
+                              "text": text, "latency": latency})
+                    else:
+                        sys.stdout.write(block)
+                        sys.stdout.flush()
+            elif kind == "stats" and args.json:
+                emit(msg)
+    except KeyboardInterrupt:
+        proc.terminate()
+    finally:
+        if srt:
+            srt.close()
+        proc.wait()
+
+    if latencies:
+        summary = {
+            "cues": len(latencies),
+            "mean": sum(latencies) / len(latencies),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": max(latencies),
+        }
+        print(
+            f"[延迟] 共 {summary['cues']} 条，平均 {summary['mean']:.3f} 秒，"
+            f"P50 {summary['p50']:.3f} 秒，P95 {summary['p95']:.3f} 秒，最大 {summary['max']:.3f} 秒",
+            file=sys.stderr,
+        )
+        if args.json:
+            emit({"type": "latency", **summary})
+    return proc.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
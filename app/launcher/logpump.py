@@ -0,0 +1,132 @@
+"""
+日志管道（不依赖 Tk）：严重级别、批量取出的日志队列、带轮转的后台文件写入
+界面每个刷新周期取出全部新日志一次性插入；写文件在后台线程中缓冲进行
+"""
+import collections
+import os
+import threading
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "全部", INFO: "信息", WARNING: "警告", ERROR: "错误"}
+
+# 日志以 [标签] 开头，按标签判断级别；未列出的标签为 INFO
+TAG_LEVELS = {
+    "进度": DEBUG,
+    "日志": DEBUG,
+    "跳过": WARNING,
+    "取消": WARNING,
+    "失败": ERROR,
+    "错误": ERROR,
+}
+
+
+def level_of(msg):
+    """多行消息（如单个文件的日志块）取其中最高的级别"""
+    level = None
+    for line in msg.split("\n"):
+        if line.startswith("["):
+            end = line.find("]", 1, 8)
+            if end > 0:
+                tag_level = TAG_LEVELS.get(line[1:end], INFO)
+                level = tag_level if level is None else max(level, tag_level)
+    return INFO if level is None else level
+
+
+class LogQueue:
+    """多个线程写入、界面线程按批取出；deque 的 append/popleft 本身是线程安全的"""
+
+    def __init__(self):
+        self._items = collections.deque()
+
+    def put(self, msg):
+        self._items.append(msg)
+
+    def drain(self):
+        items = []
+        popleft = self._items.popleft
+        try:
+            while True:
+                items.append(popleft())
+        except IndexError:
+            pass
+        return items
+
+
+class BackgroundFileWriter:
+    """
+    后台线程缓冲写文件：write() 只入队，不做磁盘 IO
+    每 flush_interval 秒（或 close() 时）整批写入；超过 max_bytes 时轮转为
+    path.1 ... path.<backups>
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=3, flush_interval=0.5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._queue = LogQueue()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        self._queue.put(text)
+
+    def flush(self):
+        """请求尽快写盘（不等待完成）"""
+        self._wake.set()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closed = self._closed
+            self._write(self._queue.drain())
+            if closed:
+                break
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, items):
+        if not items:
+            return
+        try:
+            for text in items:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(text)
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            if self._file:
+                self._file.flush()
+        except OSError:
+            # 日志写不进去不能影响识别任务
+            pass
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -1,557 +1,19 @@
-import json
+import collections
 import os
-import queue
-import re
-import subprocess
-import sys
 import threading
 import tkinter as tk
-import webbrowser
 from tkinter import filedialog, messagebox, ttk
-from urllib import request
 
+# 识别、缓存、下载相关模块（batch、urllib 等）在窗口显示后才导入，见 _background_init
+from logpump import DEBUG, LEVEL_NAMES, LogQueue, level_of
+from progress import format_eta
+from settings import APP_DIR, SAMPLES_DIR, load_config, resolve_path
 
-if getattr(sys, "frozen", False):
-    APP_DIR = os.path.dirname(sys.executable)
-    CONFIG_PATH = os.path.join(APP_DIR, "launcher", "config.json")
-else:
-    APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
 
-LOG_DIR = os.path.join(APP_DIR, "logs")
-SAMPLES_DIR = os.path.join(APP_DIR, "samples")
-
-# ========== 字幕处理常量 ==========
-# 字符限制
-MAX_CN_CHARS = 20         # 中文单行最大字符
-MAX_EN_CHARS = 42         # 英文单行最大字符
-
-# 时长限制
-MIN_DURATION = 0.8        # 最小时长(秒)
-MAX_DURATION = 4.2        # 最大时长(秒)
-
-# 阅读速度限制（字符/秒）
-MAX_CPS_CN = 7.5          # 中文最大阅读速度
-MAX_CPS_EN = 17.0         # 英文最大阅读速度
-
-# 时间轴间隙
-MIN_GAP = 0.05            # 最小间隙(秒)
-MAX_GAP = 0.12            # 最大间隙(秒)
-
-
-def resolve_path(value, default_value):
-    path = value or default_value
-    if not path:
-        return ""
-    if os.path.isabs(path):
-        return path
-    return os.path.abspath(os.path.join(APP_DIR, path))
-
-
-def load_config():
-    if os.path.isfile(CONFIG_PATH):
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {
-        "default_model_dir": "./models",
-        "default_output_dir": "./SRT_OUT",
-        "default_input_dir": "",
-        "media_extensions": [".mp4", ".mov", ".m4a", ".mp3", ".wav"],
-        "required_model_files": ["tokens.txt", "model.onnx", "silero_vad.onnx"],
-        "required_ffmpeg_files": ["ffmpeg.exe", "ffprobe.exe"],
-        "script_rel_path": "./vendor/sherpa-onnx/python-api-examples/generate-subtitles.py",
-        "script_args_template": [
-            "--tokens",
-            "{model_dir}/tokens.txt",
-            "--paraformer",
-            "{model_dir}/model.onnx",
-            "--silero-vad-model",
-            "{model_dir}/silero_vad.onnx",
-            "--num-threads",
-            "4",
-            "--decoding-method",
-            "greedy_search",
-            "{input_media}",
-        ],
-        "download_sources": {"github": {}, "hf_mirror": {}},
-    }
-
-
-def ensure_dirs():
-    for name in ("SRT_OUT", "CACHE", "logs"):
-        os.makedirs(os.path.join(APP_DIR, name), exist_ok=True)
-
-
-def is_media_file(path, exts):
-    _, ext = os.path.splitext(path)
-    return ext.lower() in exts
-
-
-def list_media_files(folder, exts):
-    files = []
-    for root, _, names in os.walk(folder):
-        for name in names:
-            full = os.path.join(root, name)
-            if is_media_file(full, exts):
-                files.append(full)
-    return files
-
-
-def strip_punctuation(text):
-    """移除所有标点符号（保留空格）"""
-    return re.sub(r"[，,。.!！?？；;：:、\"""'''()（）\[\]{}<>《》]+", "", text)
-
-
-def split_by_punctuation(text):
-    """按标点符号分割文本（保留标点用于断句）"""
-    # 按句末标点分割
-    parts = re.split(r"([。.!！?？；;]+)", text)
-    result = []
-    current = ""
-    for i, part in enumerate(parts):
-        if i % 2 == 0:  # 文本部分
-            current += part
-        else:  # 标点部分
-            current += part
-            if current.strip():
-                result.append(current.strip())
-            current = ""
-    if current.strip():
-        result.append(current.strip())
-    return result
-
-
-def is_chinese_text(text):
-    """判断文本是否主要是中文"""
-    cjk_count = len(re.findall(r"[\u4e00-\u9fff]", text))
-    return cjk_count > len(text) / 3
-
-
-def calculate_char_count(text):
-    """计算字符数（中文按字数，英文按字符数）"""
-    clean = strip_punctuation(text)
-    if is_chinese_text(clean):
-        # 中文：计算汉字数量
-        return len(re.findall(r"[\u4e00-\u9fff]", clean))
-    else:
-        # 英文：计算字符数（不含空格）
-        return len(clean.replace(" ", ""))
-
-
-def calculate_reading_speed(text, duration):
-    """计算阅读速度（字符/秒）"""
-    if duration <= 0:
-        return float('inf')
-    char_count = calculate_char_count(text)
-    return char_count / duration
-
-
-def get_max_cps(text):
-    """获取文本的最大阅读速度限制"""
-    return MAX_CPS_CN if is_chinese_text(text) else MAX_CPS_EN
-
-
-def get_max_chars(text):
-    """获取文本的最大字符限制"""
-    return MAX_CN_CHARS if is_chinese_text(text) else MAX_EN_CHARS
-
-
-# ========== 中文断句辅助 ==========
-# 常见的句子边界词（在这些词后面断开是安全的）
-BREAK_AFTER_WORDS = {
-    # 语气词/助词
-    "的", "了", "吧", "呢", "啊", "哦", "嘛", "呀", "哈", "吗", "啦", "喽",
-    # 标点替代
-    "就是", "但是", "所以", "因为", "然后", "而且", "或者", "如果", "那么",
-    "不过", "可是", "虽然", "既然", "无论", "不管", "只要", "除非", "即使",
-    # 动词/连接
-    "可以", "需要", "应该", "必须", "能够", "不能", "不要", "一定", 
-    "建议", "推荐", "记住", "注意", "首先", "其次", "最后", "第一", "第二", "第三",
-}
-
-# 禁止在这些词中间断开
-PROTECTED_WORDS = {
-    "网络", "账号", "密码", "邮箱", "手机", "电脑", "浏览器", "服务器",
-    "平台", "软件", "工具", "视频", "音频", "文件", "目录", "路径",
-    "安全", "隐私", "环境", "设备", "系统", "功能", "内容", "信息",
-    "规则", "意识", "言论", "敏感", "高价值", "账户", "登录", "注册",
-    "下载", "安装", "配置", "设置", "运行", "使用", "操作", "处理",
-    "指纹", "身份", "证明", "验证", "授权", "权限", "风险", "问题",
-}
-
-
-def find_best_break_point(text, target_pos, window=5):
-    """
-    在目标位置附近寻找最佳断点
-    优先在停顿词后断开，避免拆分常见词组
-    """
-    if target_pos >= len(text):
-        return len(text)
-    
-    # 搜索范围：target_pos 前后 window 个字符
-    start = max(0, target_pos - window)
-    end = min(len(text), target_pos + window)
-    
-    best_pos = target_pos
-    best_score = -100
-    
-    for pos in range(start, end + 1):
-        if pos == 0 or pos >= len(text):
-            continue
-        
-        score = 0
-        
-        # 检查是否在保护词中间
-        for word in PROTECTED_WORDS:
-            word_len = len(word)
-            for i in range(max(0, pos - word_len + 1), min(pos + 1, len(text) - word_len + 1)):
-                if text[i:i + word_len] == word:
-                    # 如果断点在这个词中间，扣分
-                    if i < pos < i + word_len:
-                        score -= 50
-                    break
-        
-        # 检查前面是否是停顿词（在停顿词后断开加分）
-        for word in BREAK_AFTER_WORDS:
-            word_len = len(word)
-            if pos >= word_len and text[pos - word_len:pos] == word:
-                score += 20
-                break
-        
-        # 偏好接近目标位置
-        distance = abs(pos - target_pos)
-        score -= distance * 2
-        
-        if score > best_score:
-            best_score = score
-            best_pos = pos
-    
-    return best_pos
-
-
-def smart_split_chinese(text, max_len):
-    """智能分割中文文本，避免拆分词语"""
-    if not text or len(text) <= max_len:
-        return [text] if text else []
-    
-    lines = []
-    remaining = text
-    
-    while len(remaining) > max_len:
-        # 寻找最佳断点
-        break_pos = find_best_break_point(remaining, max_len)
-        
-        # 确保至少切出一些内容，避免死循环
-        if break_pos <= 0:
-            break_pos = max_len
-        
-        lines.append(remaining[:break_pos])
-        remaining = remaining[break_pos:]
-    
-    if remaining:
-        lines.append(remaining)
-    
-    return lines
-
-
-def wrap_text_by_punctuation(text, max_len):
-    """按标点和长度换行，优先在逗号等处断开"""
-    if not text:
-        return []
-    
-    clean = strip_punctuation(text)
-    if len(clean) <= max_len:
-        return [clean]
-    
-    # 先按逗号分割
-    segments = re.split(r"[，,、]+", text)
-    lines = []
-    current = ""
-    
-    for seg in segments:
-        seg_clean = strip_punctuation(seg)
-        if not seg_clean:
-            continue
-        
-        if not current:
-            current = seg_clean
-        elif len(strip_punctuation(current)) + len(seg_clean) <= max_len:
-            current = current + seg_clean
-        else:
-            if current:
-                lines.append(strip_punctuation(current))
-            current = seg_clean
-    
-    if current:
-        lines.append(strip_punctuation(current))
-    
-    # 检查是否有超长行，如果有则强制截断
-    final_lines = []
-    for line in lines:
-        if len(line) <= max_len:
-            final_lines.append(line)
-        else:
-            # 强制按长度截断（尽量避免）
-            if is_chinese_text(line):
-                # 中文使用智能断句，避免拆分词语
-                final_lines.extend(smart_split_chinese(line, max_len))
-            else:
-                # 英文按单词截
-                words = line.split()
-                curr = []
-                curr_len = 0
-                for w in words:
-                    if curr_len + len(w) + (1 if curr else 0) > max_len:
-                        if curr:
-                            final_lines.append(" ".join(curr))
-                        curr = [w]
-                        curr_len = len(w)
-                    else:
-                        curr.append(w)
-                        curr_len += len(w) + (1 if len(curr) > 1 else 0)
-                if curr:
-                    final_lines.append(" ".join(curr))
-    
-    return final_lines
-
-
-def split_subtitle_text(text, max_cn=None, max_en=None):
-    """分割字幕文本，按标点断句"""
-    if max_cn is None:
-        max_cn = MAX_CN_CHARS
-    if max_en is None:
-        max_en = MAX_EN_CHARS
-    
-    # 按句末标点分割
-    sentences = split_by_punctuation(text)
-    lines = []
-    
-    for sentence in sentences:
-        clean = strip_punctuation(sentence)
-        if not clean:
-            continue
-        
-        max_len = max_cn if is_chinese_text(clean) else max_en
-        
-        if len(clean) <= max_len:
-            lines.append(clean)
-        else:
-            # 超长句子按逗号等处断开
-            lines.extend(wrap_text_by_punctuation(sentence, max_len))
-    
-    return [line for line in lines if line]
-
-
-def clamp_duration(start, end, min_s, max_s):
-    duration = max(0.0, end - start)
-    if duration < min_s:
-        end = start + min_s
-    elif duration > max_s:
-        end = start + max_s
-    return start, end
-
-
-def parse_timecode(tc):
-    # Format: HH:MM:SS,mmm
-    hms, ms = tc.split(",")
-    h, m, s = hms.split(":")
-    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
-
-
-def format_timecode(seconds):
-    if seconds < 0:
-        seconds = 0
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    ms = int(round((seconds - int(seconds)) * 1000))
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-
-
-def split_times(start, end, count, min_s, max_s):
-    if count <= 0:
-        return []
-    total = max(0.0, end - start)
-    min_total = min_s * count
-    max_total = max_s * count
-    if total < min_total:
-        total = min_total
-    elif total > max_total:
-        total = max_total
-    duration = total / count
-    duration = max(min_s, min(max_s, duration))
-
-    times = []
-    current = start
-    for _ in range(count):
-        seg_start = current
-        seg_end = seg_start + duration
-        times.append((seg_start, seg_end))
-        current = seg_end
-    return times
-
-
-def postprocess_srt(path, max_cn=None, max_en=None, min_s=None, max_s=None):
-    """后处理 SRT 文件：文本分割、时长控制、阅读速度检查、时间轴校验"""
-    if max_cn is None:
-        max_cn = MAX_CN_CHARS
-    if max_en is None:
-        max_en = MAX_EN_CHARS
-    if min_s is None:
-        min_s = MIN_DURATION
-    if max_s is None:
-        max_s = MAX_DURATION
-    
-    if not os.path.isfile(path):
-        return
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        raw = f.read().strip()
-    if not raw:
-        return
-
-    blocks = raw.split("\n\n")
-    raw_subtitles = []  # [(start, end, text), ...]
-    
-    # 第一轮：解析原始字幕
-    for block in blocks:
-        lines = block.splitlines()
-        if len(lines) < 3:
-            continue
-        time_line = lines[1]
-        text = " ".join(lines[2:]).strip()
-        
-        if " --> " not in time_line:
-            continue
-        
-        start_tc, end_tc = time_line.split(" --> ")
-        start = parse_timecode(start_tc)
-        end = parse_timecode(end_tc)
-        
-        # 清理文本（去标点）
-        clean_text = strip_punctuation(text)
-        if clean_text:
-            raw_subtitles.append([start, end, clean_text])
-    
-    # 第二轮：合并相邻短句（关键步骤！）
-    # 如果两条字幕间隔很小（<200ms）且合并后不超过字符限制，就合并它们
-    MERGE_GAP_THRESHOLD = 0.2  # 200ms
-    merged_subtitles = []
-    
-    for start, end, text in raw_subtitles:
-        if not merged_subtitles:
-            merged_subtitles.append([start, end, text])
-            continue
-        
-        prev_start, prev_end, prev_text = merged_subtitles[-1]
-        gap = start - prev_end
-        combined_text = prev_text + text
-        max_chars = get_max_chars(combined_text)
-        
-        # 合并条件：间隔小、合并后不超限
-        if gap < MERGE_GAP_THRESHOLD and len(combined_text) <= max_chars:
-            # 合并
-            merged_subtitles[-1] = [prev_start, end, combined_text]
-        else:
-            merged_subtitles.append([start, end, text])
-    
-    # 第三轮：智能断句（对合并后仍超长的进行分割）
-    subtitles = []
-    for start, end, text in merged_subtitles:
-        max_chars = get_max_chars(text)
-        
-        if len(text) <= max_chars:
-            subtitles.append([start, end, text])
-        else:
-            # 需要分割
-            new_texts = smart_split_chinese(text, max_chars) if is_chinese_text(text) else [text]
-            if not new_texts:
-                new_texts = [text]
-            
-            # 分配时间
-            for (seg_start, seg_end), seg_text in zip(
-                split_times(start, end, len(new_texts), min_s, max_s),
-                new_texts,
-            ):
-                subtitles.append([seg_start, seg_end, seg_text])
-    
-    # 第二轮：检查阅读速度，必要时延长时间或拆分
-    adjusted_subtitles = []
-    for i, (start, end, text) in enumerate(subtitles):
-        duration = end - start
-        max_cps = get_max_cps(text)
-        cps = calculate_reading_speed(text, duration)
-        
-        if cps > max_cps:
-            # 阅读速度超限，计算需要的最小时长
-            char_count = calculate_char_count(text)
-            needed_duration = char_count / max_cps
-            
-            # 尝试延长 end（检查与下一条字幕的空隙）
-            next_start = subtitles[i + 1][0] if i + 1 < len(subtitles) else float('inf')
-            available_end = next_start - MIN_GAP
-            
-            if start + needed_duration <= available_end:
-                # 可以延长
-                end = start + needed_duration
-            elif start + needed_duration <= next_start:
-                # 可以延长但会压缩间隙
-                end = min(start + needed_duration, next_start - MIN_GAP)
-            
-            # 如果仍然超限，保持原样（已尽力）
-        
-        # 应用时长限制
-        start, end = clamp_duration(start, end, min_s, max_s)
-        adjusted_subtitles.append([start, end, text])
-    
-    # 第三轮：修复重叠和间隙
-    final_subtitles = fix_overlaps_and_gaps(adjusted_subtitles)
-    
-    # 输出
-    out_blocks = []
-    for idx, (start, end, text) in enumerate(final_subtitles, 1):
-        time_line = f"{format_timecode(start)} --> {format_timecode(end)}"
-        out_blocks.append("\n".join([str(idx), time_line, text]))
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.write("\n\n".join(out_blocks))
-
-
-def fix_overlaps_and_gaps(subtitles):
-    """修复字幕时间轴的重叠和间隙问题"""
-    if not subtitles:
-        return subtitles
-    
-    result = []
-    for i, (start, end, text) in enumerate(subtitles):
-        if i == 0:
-            result.append([start, end, text])
-            continue
-        
-        prev_end = result[-1][1]
-        
-        # 检查重叠
-        if start < prev_end:
-            # 有重叠，调整当前字幕的开始时间或前一条的结束时间
-            # 策略：缩短前一条的结束时间，确保有最小间隙
-            new_prev_end = start - MIN_GAP
-            if new_prev_end > result[-1][0] + MIN_DURATION:
-                result[-1][1] = new_prev_end
-            else:
-                # 无法调整前一条，调整当前开始
-                start = prev_end + MIN_GAP
-        
-        # 检查间隙
-        gap = start - result[-1][1]
-        if gap < MIN_GAP and gap >= 0:
-            # 间隙太小，微调
-            start = result[-1][1] + MIN_GAP
-        elif gap > MAX_GAP:
-            # 间隙太大，可以接受（不强制调整）
-            pass
-        
-        result.append([start, end, text])
-    
-    return result
+LOG_PUMP_MS = 100          # 日志刷新间隔(毫秒)
+LOG_VIEW_LINES = 2000      # 日志区最多保留的行数，超出后从头部裁掉
+BACKGROUND_INIT_MS = 100   # 窗口显示后多久开始后台初始化(毫秒)
+RUNNER_POLL_MS = 100       # 初始化未完成时检查的间隔(毫秒)
 
 
 class SubtitleMakerApp(tk.Tk):
@@ -571,14 +33,86 @@ class SubtitleMakerApp(tk.Tk):
             pass
 
         self.cfg = load_config()
-        self.log_queue = queue.Queue()
-        self.proc = None
-        self.stop_flag = threading.Event()
-
-        ensure_dirs()
+        self.log_queue = LogQueue()
+        # 最近的日志 (级别, 内容)，切换显示级别时据此重绘
+        self.log_lines = collections.deque(maxlen=LOG_VIEW_LINES)
+        self.log_level = DEBUG
+        self.batch_thread = None
+        self.download_thread = None
+        self.download_stop = threading.Event()
+        self.download_result = None   # 下载线程结束时写入提示文字，由界面线程弹窗
+        # 批量线程写入最新的进度事件，界面刷新时读取（只做引用赋值，无需加锁）
+        self.progress_event = None
+        # BatchRunner 在后台线程中创建，创建完成（或失败）后 runner_ready 置位
+        self.runner = None
+        self.runner_error = None
+        self.runner_ready = threading.Event()
+        self.deferred_action = None   # 初始化完成前点击的操作，完成后执行
         self._configure_style()
         self._build_ui()
         self._start_log_pump()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(BACKGROUND_INIT_MS, self._start_background_init)
+
+    def _on_close(self):
+        self.download_stop.set()
+        if self.runner:
+            self.runner.close()
+        self.destroy()
+
+    def _start_background_init(self):
+        threading.Thread(target=self._background_init, daemon=True).start()
+
+    def _background_init(self):
+        """
+        窗口显示之后：导入识别相关模块、创建 BatchRunner、检查模型与 ffmpeg，
+        依赖齐全时预先启动一个识别进程加载模型（prewarm_worker）
+        只通过日志队列与界面交互，不直接操作 Tk
+        """
+        try:
+            from batch import BatchRunner
+
+            self.runner = BatchRunner(self.cfg, on_log=self.log, on_event=self._on_event)
+        except Exception as exc:
+            self.runner_error = exc
+            self.log(f"[错误] 初始化失败: {exc}")
+            return
+        finally:
+            self.runner_ready.set()
+
+        missing = self.runner.check_requirements()
+        if missing:
+            self.log(f"[检查] 缺少 {len(missing)} 个文件，可使用下载或手动导入：\n" + "\n".join(missing))
+            return
+        self.log("[检查] 模型与 ffmpeg 已就绪。")
+        if self.cfg.get("prewarm_worker", True):
+            self.runner.prewarm()
+
+    def _defer_until_ready(self, action):
+        """
+        后台初始化未完成时返回 True，并在完成后执行 action（界面线程中用 after 轮询，不阻塞界面）
+        初始化期间多次点击只保留最后一次操作
+        """
+        if self.runner_ready.is_set():
+            return False
+        if self.deferred_action is None:
+            self.log("[提示] 正在初始化，完成后自动继续...")
+            self.after(RUNNER_POLL_MS, self._run_deferred)
+        self.deferred_action = action
+        return True
+
+    def _run_deferred(self):
+        if not self.runner_ready.is_set():
+            self.after(RUNNER_POLL_MS, self._run_deferred)
+            return
+        action, self.deferred_action = self.deferred_action, None
+        action()
+
+    def _get_runner(self):
+        """后台初始化完成后调用（见 _defer_until_ready）；失败时提示并返回 None"""
+        if self.runner is None:
+            messagebox.showerror("错误", f"初始化失败: {self.runner_error}")
+        return self.runner
 
     def _configure_style(self):
         style = ttk.Style(self)
@@ -705,11 +239,39 @@ class SubtitleMakerApp(tk.Tk):
         manual_dl.pack(side="left", padx=5)
         manual_dl.bind("<Button-1>", lambda e: self.open_model_dir())
 
-        # 4. Log Area
+        # 4. Progress
+        progress_frame = ttk.Frame(main_container)
+        progress_frame.pack(fill="x", pady=(10, 0))
+        progress_frame.columnconfigure(1, weight=1)
+        ttk.Label(progress_frame, text="当前文件").grid(row=0, column=0, sticky="w")
+        self.file_progress = ttk.Progressbar(progress_frame, maximum=1.0)
+        self.file_progress.grid(row=0, column=1, sticky="we", padx=(10, 0), pady=2)
+        ttk.Label(progress_frame, text="整批").grid(row=1, column=0, sticky="w")
+        self.batch_progress = ttk.Progressbar(progress_frame, maximum=1.0)
+        self.batch_progress.grid(row=1, column=1, sticky="we", padx=(10, 0), pady=2)
+        self.progress_text = tk.StringVar(value="")
+        ttk.Label(
+            progress_frame, textvariable=self.progress_text, font=("Segoe UI", 9), foreground="#86868b"
+        ).grid(row=2, column=0, columnspan=2, sticky="w", pady=(2, 0))
+
+        # 5. Log Area
         log_frame = ttk.Frame(main_container)
         log_frame.pack(fill="both", expand=True, pady=(10, 20))
         
-        ttk.Label(log_frame, text="运行状态", style="SubHeader.TLabel").pack(anchor="w", pady=(0, 5))
+        log_header = ttk.Frame(log_frame)
+        log_header.pack(fill="x", pady=(0, 5))
+        ttk.Label(log_header, text="运行状态", style="SubHeader.TLabel").pack(side="left")
+        self.log_level_var = tk.StringVar(value=LEVEL_NAMES[self.log_level])
+        level_box = ttk.Combobox(
+            log_header,
+            textvariable=self.log_level_var,
+            values=list(LEVEL_NAMES.values()),
+            state="readonly",
+            width=6,
+        )
+        level_box.pack(side="right")
+        level_box.bind("<<ComboboxSelected>>", self._on_log_level)
+        ttk.Label(log_header, text="显示级别：", font=("Segoe UI", 9), foreground="#86868b").pack(side="right")
         
         self.log_text = tk.Text(
             log_frame, 
@@ -724,7 +286,7 @@ class SubtitleMakerApp(tk.Tk):
         self.log_text.pack(fill="both", expand=True)
         self.log_text.configure(state="disabled")
         
-        # 5. Footer
+        # 6. Footer
         self.create_footer(main_container)
 
     def create_header(self, parent):
@@ -767,26 +329,86 @@ class SubtitleMakerApp(tk.Tk):
             lbl.bind("<Button-1>", lambda e, u=url: self.open_url(u))
             
     def open_url(self, url):
+        import webbrowser
+
         webbrowser.open(url)
 
     def log(self, msg):
         self.log_queue.put(msg)
 
+    def _on_event(self, event):
+        if event["event"] in ("plan", "progress", "batch", "finish"):
+            self.progress_event = event
+
     def _start_log_pump(self):
+        # 每个周期把积压的日志合并成一次插入，界面耗时与日志量无关
         def pump():
-            try:
-                while True:
-                    line = self.log_queue.get_nowait()
-                    self.log_text.configure(state="normal")
-                    self.log_text.insert("end", line + "\n")
-                    self.log_text.see("end")
-                    self.log_text.configure(state="disabled")
-            except queue.Empty:
-                pass
-            self.after(100, pump)
+            items = self.log_queue.drain()
+            if items:
+                entries = [(level_of(msg), msg) for msg in items[-LOG_VIEW_LINES:]]
+                self.log_lines.extend(entries)
+                self._append_log([msg for level, msg in entries if level >= self.log_level])
+            event, self.progress_event = self.progress_event, None
+            if event:
+                self._show_progress(event)
+            result, self.download_result = self.download_result, None
+            if result:
+                messagebox.showinfo("提示", result)
+            self.after(LOG_PUMP_MS, pump)
 
         pump()
 
+    def _append_log(self, messages):
+        if not messages:
+            return
+        self.log_text.configure(state="normal")
+        self.log_text.insert("end", "\n".join(messages) + "\n")
+        lines = int(self.log_text.index("end-1c").split(".")[0])
+        if lines > LOG_VIEW_LINES:
+            self.log_text.delete("1.0", f"{lines - LOG_VIEW_LINES}.0")
+        self.log_text.see("end")
+        self.log_text.configure(state="disabled")
+
+    def _show_progress(self, event):
+        kind = event["event"]
+        if kind == "download":
+            fraction = event["done"] / event["total"] if event["total"] else 0.0
+            self.file_progress["value"] = fraction
+            self.progress_text.set(
+                f"下载 {event['files']} 项 {fraction:.0%}（{event['done'] / 1048576:.1f}/"
+                f"{event['total'] / 1048576:.1f} MB）"
+            )
+            return
+        if kind == "plan":
+            self.file_progress["value"] = 0
+            self.batch_progress["value"] = 0
+            self.progress_text.set("")
+            return
+        if kind == "finish":
+            self.file_progress["value"] = 0
+            self.progress_text.set("已完成")
+            return
+        self.batch_progress["value"] = event["batch_fraction"]
+        text = (
+            f"整批 {event['batch_fraction']:.0%}（{event['files_done']}/{event['files_total']} 个文件），"
+            f"剩余 {format_eta(event['batch_eta'])}"
+        )
+        if kind == "progress":
+            self.file_progress["value"] = event["fraction"]
+            text = (
+                f"{os.path.basename(event['file'])} {event['fraction']:.0%}，剩余 {format_eta(event['eta'])}"
+                f"  ·  RTF {event['rtf'] or 0:.3f}  ·  内存 {event['peak_rss_mb'] or 0:.0f} MB  ·  " + text
+            )
+        self.progress_text.set(text)
+
+    def _on_log_level(self, event=None):
+        names = {name: level for level, name in LEVEL_NAMES.items()}
+        self.log_level = names.get(self.log_level_var.get(), DEBUG)
+        self.log_text.configure(state="normal")
+        self.log_text.delete("1.0", "end")
+        self.log_text.configure(state="disabled")
+        self._append_log([msg for level, msg in self.log_lines if level >= self.log_level])
+
     def select_file(self):
         path = filedialog.askopenfilename(
             title="选择媒体文件",
@@ -824,155 +446,57 @@ class SubtitleMakerApp(tk.Tk):
         else:
             messagebox.showwarning("提示", "模型目录不存在。")
 
-    def _check_requirements(self):
-        missing = []
-
-        model_dir = resolve_path(self.model_dir.get(), self.cfg.get("default_model_dir"))
-        for name in self.cfg.get("required_model_files", []):
-            if not os.path.isfile(os.path.join(model_dir, name)):
-                missing.append(os.path.join(model_dir, name))
-
-        ffmpeg_dir = os.path.join(APP_DIR, "tools", "ffmpeg")
-        for name in self.cfg.get("required_ffmpeg_files", []):
-            if not os.path.isfile(os.path.join(ffmpeg_dir, name)):
-                missing.append(os.path.join(ffmpeg_dir, name))
-
-        script_path = os.path.join(APP_DIR, self.cfg.get("script_rel_path", ""))
-        if not os.path.isfile(script_path):
-            missing.append(script_path)
-
-        return missing
-
-    def _build_command(self, input_media):
-        model_dir = resolve_path(self.model_dir.get(), self.cfg.get("default_model_dir"))
-        output_dir = resolve_path(self.output_dir.get(), self.cfg.get("default_output_dir"))
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # [修复] 尝试将路径转换为相对路径，以避免 sherpa-onnx 在中文绝对路径下加载失败
-        try:
-            cwd = os.getcwd()
-            model_dir = os.path.relpath(model_dir, cwd)
-            # 统一使用正斜杠，避免转义问题
-            model_dir = model_dir.replace(os.sep, "/")
-        except Exception:
-            pass
-
-        base = os.path.splitext(os.path.basename(input_media))[0]
-        output_srt = os.path.join(output_dir, base + ".srt")
-        source_srt = os.path.splitext(input_media)[0] + ".srt"
+    def _sync_runner(self):
+        """把界面上的目录设置同步到 BatchRunner；初始化失败时返回 None"""
+        runner = self._get_runner()
+        if runner:
+            runner.model_dir = self.model_dir.get()
+            runner.output_dir = self.output_dir.get()
+        return runner
 
-        script_path = os.path.join(APP_DIR, self.cfg.get("script_rel_path", ""))
-        args = []
-        for item in self.cfg.get("script_args_template", []):
-            args.append(
-                item.format(
-                    model_dir=model_dir,
-                    output_srt=output_srt,
-                    input_media=input_media,
-                )
-            )
-
-        cmd = [sys.executable, script_path] + args
-        return cmd, output_srt, source_srt
-
-    def _run_script_for_file(self, input_media):
-        cmd, output_srt, source_srt = self._build_command(input_media)
-        self.log(f"[运行] {input_media}")
-        self.log(f"[命令] {' '.join(cmd)}")
-
-        env = os.environ.copy()
-        ffmpeg_dir = os.path.join(APP_DIR, "tools", "ffmpeg")
-        env["PATH"] = ffmpeg_dir + os.pathsep + env.get("PATH", "")
-        env.setdefault("PYTHONIOENCODING", "utf-8")
-
-        log_path = os.path.join(LOG_DIR, "run.log")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            self.proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                env=env,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                bufsize=1,
-                universal_newlines=True,
-            )
-            for line in self.proc.stdout:
-                line = line.rstrip()
-                log_file.write(line + "\n")
-                self.log(line)
-                if self.stop_flag.is_set():
-                    self.proc.terminate()
-                    break
-            self.proc.wait()
-
-        if self.proc.returncode == 0:
-            if os.path.isfile(source_srt):
-                postprocess_srt(source_srt)  # 使用常量中的默认参数
-                self.log(f"[完成] 生成 {source_srt}")
-            else:
-                self.log("[失败] 未找到生成的 srt 文件，请检查日志。")
-        else:
-            self.log("[失败] 生成字幕失败，请检查缺失文件或日志。")
+    def _check_requirements(self):
+        runner = self._sync_runner()
+        if runner is None:
+            return None
+        return runner.check_requirements()
 
     def start_run(self):
-        if self.proc and self.proc.poll() is None:
+        if self.batch_thread and self.batch_thread.is_alive():
             messagebox.showinfo("提示", "正在运行，请先取消或等待完成。")
             return
+        if self._defer_until_ready(self.start_run):
+            return
 
         missing = self._check_requirements()
+        if missing is None:
+            return
         if missing:
             message = "缺少以下文件：\n" + "\n".join(missing)
             messagebox.showwarning("缺少依赖", message)
             self.log(message)
             return
 
+        from batch import collect_files
+
         input_file = self.input_file.get().strip()
         input_dir = self.input_dir.get().strip()
-        exts = self.cfg.get("media_extensions", [])
-
-        files = []
-        if input_file:
-            if os.path.isfile(input_file) and is_media_file(input_file, exts):
-                files = [input_file]
-            else:
-                messagebox.showwarning("提示", "选择的文件不是支持的媒体格式。")
-                return
-        elif input_dir:
-            if os.path.isdir(input_dir):
-                files = list_media_files(input_dir, exts)
-                if not files:
-                    messagebox.showwarning("提示", "文件夹内没有可用媒体文件。")
-                    return
-            else:
-                messagebox.showwarning("提示", "输入文件夹不存在。")
-                return
-        else:
-            messagebox.showwarning("提示", "请先选择文件或输入文件夹。")
+        try:
+            files = collect_files(self.cfg, input_file, input_dir)
+        except ValueError as exc:
+            messagebox.showwarning("提示", str(exc))
             return
 
-        self.stop_flag.clear()
-        thread = threading.Thread(target=self._run_batch, args=(files,), daemon=True)
-        thread.start()
-
-    def _run_batch(self, files):
-        for media in files:
-            if self.stop_flag.is_set():
-                break
-            self._run_script_for_file(media)
-        if self.stop_flag.is_set():
-            self.log("[取消] 用户取消运行。")
-        else:
-            self.log("[完成] 全部任务结束。")
+        # 批量目录按清单续跑；单文件（含自检）总是重新生成
+        resume = not input_file
+        self.batch_thread = threading.Thread(target=self.runner.run, args=(files, resume), daemon=True)
+        self.batch_thread.start()
 
     def cancel_run(self):
-        if self.proc and self.proc.poll() is None:
-            self.stop_flag.set()
-            try:
-                self.proc.terminate()
-            except Exception:
-                pass
+        if self.download_thread and self.download_thread.is_alive():
+            self.download_stop.set()
+            self.log("[取消] 正在停止下载，已下载的部分下次继续...")
+        elif self.batch_thread and self.batch_thread.is_alive():
+            self.runner.cancel()
             self.log("[取消] 正在停止...")
         else:
             self.log("[提示] 当前没有运行任务。")
@@ -988,37 +512,69 @@ class SubtitleMakerApp(tk.Tk):
         self.start_run()
 
     def download_missing(self, source):
+        if self.download_thread and self.download_thread.is_alive():
+            messagebox.showinfo("提示", "正在下载，请等待完成或点击停止。")
+            return
+        if self._defer_until_ready(lambda: self.download_missing(source)):
+            return
+
         missing = self._check_requirements()
+        if missing is None:
+            return
         if not missing:
             messagebox.showinfo("提示", "未检测到缺失文件。")
             return
 
-        src_cfg = self.cfg.get("download_sources", {}).get(source, {})
+        from downloader import plan_downloads
+
         model_dir = resolve_path(self.model_dir.get(), self.cfg.get("default_model_dir"))
-        os.makedirs(model_dir, exist_ok=True)
+        items = plan_downloads(self.cfg, source, model_dir)
+        if not items:
+            messagebox.showwarning("提示", "缺失的文件没有配置下载地址（config.json 的 download_sources）。")
+            return
+
+        self.log(f"[下载] 来源: {source}，共 {len(items)} 项")
+        self.download_stop.clear()
+        self.download_thread = threading.Thread(target=self._download, args=(items,), daemon=True)
+        self.download_thread.start()
 
-        to_download = {
-            "tokens.txt": src_cfg.get("tokens", ""),
-            "model.onnx": src_cfg.get("paraformer", ""),
-            "silero_vad.onnx": src_cfg.get("silero_vad", ""),
-        }
+    def _download(self, items):
+        """后台线程：并行下载；进度显示在"当前文件"进度条上，结束后由界面线程弹窗"""
+        from downloader import Downloader
 
-        self.log(f"[下载] 来源: {source}")
-        for filename, url in to_download.items():
-            dest = os.path.join(model_dir, filename)
-            if os.path.isfile(dest):
-                continue
-            if not url:
-                self.log(f"[跳过] {filename} 未配置下载地址。")
-                continue
-            try:
-                self.log(f"[下载] {filename} <- {url}")
-                request.urlretrieve(url, dest)
-                self.log(f"[完成] {dest}")
-            except Exception as exc:
-                self.log(f"[失败] {filename} 下载失败: {exc}")
+        sizes = {}
 
-        messagebox.showinfo("提示", "下载流程结束，请检查日志。")
+        def on_progress(name, done, total):
+            sizes[name] = (done, total)
+            self.progress_event = {
+                "event": "download",
+                "files": len(sizes),
+                "done": sum(item[0] for item in sizes.values()),
+                "total": sum(item[1] for item in sizes.values()),
+            }
+
+        try:
+            downloader = Downloader(on_progress=on_progress, on_log=self.log, stop_event=self.download_stop)
+            done, failed = downloader.run(items)
+        except Exception as exc:
+            # 线程里的异常没人接，必须写入结果，否则界面一直等不到下载结束
+            self.log(f"[失败] 下载出错: {exc}")
+            self.download_result = "下载失败，请检查日志。"
+            return
+        if not failed and sizes:
+            # 压缩包取齐所需文件后会提前结束，进度条直接置满
+            total = sum(item[1] for item in sizes.values())
+            self.progress_event = {"event": "download", "files": len(sizes), "done": total, "total": total}
+        for path in done:
+            self.log(f"[完成] {path}")
+        if failed and self.download_stop.is_set():
+            # 用户点击停止：未完成的项不算失败
+            self.log("[取消] 下载已停止，已下载的部分下次继续。")
+            self.download_result = "下载已取消。"
+            return
+        for item, exc in failed:
+            self.log(f"[失败] {item.name} 下载失败: {exc}")
+        self.download_result = "部分文件下载失败，请检查日志。" if failed else "下载完成。"
 
 
 if __name__ == "__main__":
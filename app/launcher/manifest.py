@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class JobManifest:
+    """
+    批量任务清单（SQLite）
+    记录每个文件的路径、大小、修改时间、状态、输出、RTF 与错误信息
+    再次运行时跳过已完成且未变化的文件，失败或中断的文件重新处理
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                config TEXT,
+                status TEXT,
+                output TEXT,
+                rtf REAL,
+                error TEXT,
+                updated REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _get(self, path):
+        return self.conn.execute(
+            "SELECT size, mtime, config, status, output FROM jobs WHERE path = ?",
+            (path,),
+        ).fetchone()
+
+    def plan(self, files, config):
+        """
+        对比清单，返回 (待处理文件, 统计)
+        统计：done（已完成跳过）、new、changed、retry（失败或中断）、
+        missing（已被删除或移走，记为失败，不再处理）
+        """
+        todo = []
+        missing = []
+        stats = {"done": 0, "new": 0, "changed": 0, "retry": 0, "missing": 0}
+        with self.lock:
+            for path in files:
+                path = os.path.abspath(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stats["missing"] += 1
+                    missing.append(path)
+                    continue
+                row = self._get(path)
+                if row is None:
+                    stats["new"] += 1
+                elif row[0] != st.st_size or row[1] != st.st_mtime or row[2] != config:
+                    stats["changed"] += 1
+                elif row[3] == STATUS_DONE and row[4] and os.path.isfile(row[4]):
+                    stats["done"] += 1
+                    continue
+                else:
+                    stats["retry"] += 1
+                todo.append(path)
+        for path in missing:
+            self.mark_failed(path, config, "文件不存在")
+        return todo, stats
+
+    def _update(self, path, config, **fields):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            # 处理过程中文件被删除或移走：不记录大小和时间，下次运行视为已变化
+            size = mtime = None
+        fields.update(size=size, mtime=mtime, config=config, updated=time.time())
+        with self.lock:
+            if self._get(path) is None:
+                self.conn.execute("INSERT INTO jobs (path) VALUES (?)", (path,))
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            self.conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE path = ?",
+                list(fields.values()) + [path],
+            )
+            self.conn.commit()
+
+    def mark_running(self, path, config):
+        self._update(path, config, status=STATUS_RUNNING, error=None)
+
+    def mark_done(self, path, config, output, rtf=None):
+        self._update(path, config, status=STATUS_DONE, output=output, rtf=rtf, error=None)
+
+    def mark_failed(self, path, config, error):
+        self._update(path, config, status=STATUS_FAILED, error=str(error))
+
+    def mark_pending(self, path, config):
+        """用户取消时将当前文件标记为待处理，下次运行继续"""
+        self._update(path, config, status=STATUS_PENDING)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
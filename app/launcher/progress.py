@@ -0,0 +1,102 @@
+"""
+批量进度与预计剩余时间（不依赖 Tk）
+
+单个文件：剩余时长 × 识别进程报告的当前 RTF
+整批：剩余音频时长 ÷ 本次运行以来实际识别的速度（音频秒/墙钟秒），
+多个识别进程并行时自然计入并行度；命中缓存、续跑跳过的部分不计入速度
+"""
+import threading
+import time
+
+
+def format_eta(seconds):
+    """秒 -> H:MM:SS；未知时返回 --:--"""
+    if seconds is None:
+        return "--:--"
+    seconds = max(0, int(round(seconds)))
+    h, seconds = divmod(seconds, 3600)
+    m, s = divmod(seconds, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def render_bar(fraction, width=24):
+    fraction = min(1.0, max(0.0, fraction or 0.0))
+    filled = int(round(fraction * width))
+    return "█" * filled + "░" * (width - filled)
+
+
+class ProgressTracker:
+    """
+    记录每个文件的已处理时长，给出文件级与批量级进度快照
+    update() 可在多个线程中调用
+    """
+
+    def __init__(self, jobs, clock=time.monotonic):
+        """jobs：[(path, duration), ...]，duration 未知时为 0"""
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.durations = dict(jobs)
+        self.processed = dict.fromkeys(self.durations, 0.0)
+        self.last = {}            # path -> 上一次报告的位置（续跑时不从 0 开始）
+        self.transcribed = 0.0    # 本次运行实际识别的音频秒数
+        self.files_total = len(self.durations)
+        self.files_done = 0
+        self.start_t = clock()
+
+    def _batch(self):
+        total = sum(self.durations.values())
+        processed = sum(
+            min(value, self.durations[path]) if self.durations[path] else value
+            for path, value in self.processed.items()
+        )
+        elapsed = self.clock() - self.start_t
+        eta = None
+        if total > 0 and self.transcribed > 0 and elapsed > 0:
+            eta = max(0.0, total - processed) / (self.transcribed / elapsed)
+        return {
+            "batch_processed": processed,
+            "batch_duration": total,
+            "batch_fraction": processed / total if total > 0 else 0.0,
+            "batch_eta": eta,
+            "batch_elapsed": elapsed,
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+        }
+
+    def update(self, path, msg):
+        """
+        msg：识别进程的进度 dict（processed, duration, segments, rtf, peak_rss_mb）
+        返回文件与整批的进度快照
+        """
+        with self.lock:
+            duration = self.durations.get(path) or msg.get("duration") or 0.0
+            self.durations[path] = duration
+            processed = msg.get("processed", 0.0)
+            self.processed[path] = processed
+            if path in self.last:
+                self.transcribed += max(0.0, processed - self.last[path])
+            self.last[path] = processed
+            rtf = msg.get("rtf")
+            eta = None
+            if duration > 0 and rtf:
+                eta = max(0.0, duration - processed) * rtf
+            snapshot = {
+                "file": path,
+                "processed": processed,
+                "duration": duration,
+                "fraction": min(1.0, processed / duration) if duration > 0 else 0.0,
+                "eta": eta,
+                "segments": msg.get("segments", 0),
+                "rtf": rtf,
+                "peak_rss_mb": msg.get("peak_rss_mb"),
+            }
+            snapshot.update(self._batch())
+            return snapshot
+
+    def finish(self, path):
+        """文件结束（成功、失败或命中缓存），返回整批快照"""
+        with self.lock:
+            if path in self.durations:
+                self.processed[path] = self.durations[path]
+                self.files_done += 1
+            return self._batch()
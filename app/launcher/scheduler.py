@@ -0,0 +1,140 @@
+import os
+import queue
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from worker_client import RecognizerWorker
+
+
+DEFAULT_THREADS_PER_WORKER = 4
+
+
+def probe_duration(path, ffprobe="ffprobe"):
+    """用 ffprobe 读取媒体时长（秒），失败时返回 0"""
+    cmd = [
+        ffprobe,
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path,
+    ]
+    try:
+        out = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=30,
+        ).stdout
+        return float(out.strip().splitlines()[0])
+    except Exception:
+        return 0.0
+
+
+def order_by_duration(files, ffprobe="ffprobe", max_probes=8):
+    """
+    按时长从长到短排序，长文件先开始，避免批次末尾只剩一个长文件在跑
+    返回 [(path, duration), ...]
+    """
+    with ThreadPoolExecutor(max_workers=max_probes) as pool:
+        durations = list(pool.map(lambda f: probe_duration(f, ffprobe), files))
+    jobs = list(zip(files, durations))
+    jobs.sort(key=lambda item: item[1], reverse=True)
+    return jobs
+
+
+def plan_workers(num_files, max_workers=0, threads_per_worker=0, cpu_count=None, preferred_threads=0):
+    """
+    在 N 个识别进程 × T 个推理线程之间分配 CPU 核心
+    max_workers / threads_per_worker 为 0 表示自动
+    preferred_threads 为本机调优得到的每进程线程数，只用来决定进程数，
+    文件数少于进程数时剩余核心仍分给已有进程
+    返回 (N, T)
+    """
+    cores = cpu_count or os.cpu_count() or 1
+    threads = threads_per_worker or min(preferred_threads or DEFAULT_THREADS_PER_WORKER, cores)
+    workers = max_workers or max(1, cores // threads)
+    workers = max(1, min(workers, num_files))
+
+    # 文件数少于可用进程数时，把剩余核心分给已有进程
+    if not threads_per_worker:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+class WorkerPool:
+    """按命令复用 RecognizerWorker，空闲进程保持模型常驻"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = []
+        self._all = []
+
+    def acquire(self, cmd, env=None, on_log=None):
+        with self._lock:
+            for worker in list(self._idle):
+                self._idle.remove(worker)
+                if worker.is_alive() and worker.cmd == cmd:
+                    worker.on_log = on_log
+                    return worker
+                # 参数已变化或进程已退出，丢弃
+                self._all.remove(worker)
+                worker.close()
+
+        worker = RecognizerWorker(cmd, env=env, on_log=on_log)
+        with self._lock:
+            self._all.append(worker)
+        try:
+            worker.start()
+        except Exception:
+            self.discard(worker)
+            raise
+        return worker
+
+    def release(self, worker):
+        with self._lock:
+            if worker in self._all and worker.is_alive():
+                worker.on_log = None
+                self._idle.append(worker)
+            elif worker in self._all:
+                self._all.remove(worker)
+
+    def discard(self, worker):
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+        worker.terminate()
+
+    def terminate_all(self):
+        """终止所有进程（包括正在处理任务的）"""
+        with self._lock:
+            workers = list(self._all)
+            self._all.clear()
+            self._idle.clear()
+        for worker in workers:
+            worker.terminate()
+
+
+def run_parallel(jobs, num_workers, handle, stop_flag):
+    """
+    用 num_workers 个线程按顺序领取任务并调用 handle(job)
+    jobs 应已按优先级排好序（长文件在前）
+    """
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+
+    def loop():
+        while not stop_flag.is_set():
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            handle(job)
+
+    threads = [threading.Thread(target=loop, daemon=True) for _ in range(num_workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
@@ -0,0 +1,585 @@
+"""
+本地 HTTP 字幕服务：多台工作站共用一组常驻（已加载模型）的识别进程
+
+    python server.py                      # 仅本机 127.0.0.1:8765
+    python server.py --host 0.0.0.0       # 局域网
+
+接口：
+    POST   /jobs?name=a.mp4        请求体为媒体文件内容，返回 {"id": ...}
+    POST   /jobs                   JSON {"path": "..."}，仅限本机请求，直接读取服务器上的文件
+                                   两种方式都可用 ?formats=srt,vtt（或 JSON 的 "formats"）指定输出格式
+    GET    /jobs/<id>              任务状态（已识别时长 processed、总时长 duration、预计剩余秒数 eta 等）
+    GET    /jobs/<id>/srt          后处理后的字幕（?wait=1 阻塞等待完成）
+    GET    /jobs/<id>/vtt|ass|json 其他输出格式（需在提交时指定）
+    GET    /jobs/<id>/live         识别过程中逐条推送原始字幕（chunked）
+    DELETE /jobs/<id>              取消排队中的任务
+    GET    /health                 服务状态
+
+客户端以 X-Client 请求头（缺省为来源 IP）区分，排队任务在客户端之间轮流调度
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from batch import BatchRunner
+from scheduler import plan_workers
+from settings import CACHE_DIR, build_env, build_worker_command, load_config, model_paths
+from subtitles import CueStore, postprocess_cues
+from worker_client import WorkerError
+from writers import WRITERS, output_path, parse_formats, write_outputs
+
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+COPY_CHUNK = 1024 * 1024
+LIVE_POLL = 0.2           # 推送原始字幕时检查文件增长的间隔(秒)
+
+
+class QueueFull(Exception):
+    """排队任务数超过上限"""
+
+
+class Job:
+    """一个识别任务；上传的文件与结果都放在 work_root/<id>/ 下"""
+
+    def __init__(self, client, name, work_root, input_media=None, formats=None):
+        self.id = uuid.uuid4().hex
+        self.client = client
+        self.name = name
+        self.work_dir = os.path.join(work_root, self.id)
+        self.upload = input_media is None
+        self.input = os.path.join(self.work_dir, name) if self.upload else input_media
+        self.status = STATUS_QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.processed = 0.0
+        self.duration = 0.0
+        self.eta = None
+        self.segments = 0
+        self.rtf = None
+        self.error = None
+        self.formats = formats
+        self.digest = None        # 上传内容的 SHA-256
+        self.raw_path = os.path.join(self.work_dir, "raw.srt")
+        self.result_base = os.path.join(self.work_dir, "result")
+        self.done = threading.Event()
+
+    def to_dict(self, position=None):
+        info = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "processed": self.processed,
+            "duration": self.duration,
+            "eta": self.eta,
+            "segments": self.segments,
+            "rtf": self.rtf,
+            "error": self.error,
+            "formats": self.formats,
+        }
+        if position is not None:
+            info["position"] = position
+        return info
+
+
+class FairQueue:
+    """
+    有界任务队列：每个客户端一个 FIFO，出队时在客户端之间轮流
+    单个客户端提交大量任务不会阻塞其他客户端
+    """
+
+    def __init__(self, max_jobs, max_per_client):
+        self.max_jobs = max_jobs
+        self.max_per_client = max_per_client
+        self.cond = threading.Condition()
+        self.queues = collections.OrderedDict()
+        self.size = 0
+        self.closed = False
+
+    def put(self, job):
+        with self.cond:
+            pending = self.queues.setdefault(job.client, collections.deque())
+            if self.size >= self.max_jobs or len(pending) >= self.max_per_client:
+                if not pending:
+                    del self.queues[job.client]
+                raise QueueFull()
+            pending.append(job)
+            self.size += 1
+            self.cond.notify()
+
+    def get(self):
+        """取下一个任务；队列关闭后返回 None"""
+        with self.cond:
+            while not self.size and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return None
+            client, pending = next(iter(self.queues.items()))
+            job = pending.popleft()
+            # 轮到的客户端移到末尾
+            del self.queues[client]
+            if pending:
+                self.queues[client] = pending
+            self.size -= 1
+            return job
+
+    def remove(self, job):
+        with self.cond:
+            pending = self.queues.get(job.client)
+            if not pending or job not in pending:
+                return False
+            pending.remove(job)
+            if not pending:
+                del self.queues[job.client]
+            self.size -= 1
+            return True
+
+    def position(self, job):
+        """按轮转顺序估算排队位置（从 1 开始）"""
+        with self.cond:
+            pending = self.queues.get(job.client)
+            if not pending or job not in pending:
+                return None
+            order = list(self.queues)
+            index = order.index(job.client)
+            rank = pending.index(job)
+            # 前 rank 轮每个客户端各出一个；第 rank 轮里排在前面的客户端再出一个
+            ahead = 0
+            for i, client in enumerate(order):
+                ahead += min(len(self.queues[client]), rank + 1 if i < index else rank)
+            return ahead + 1
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class TranscriptionService:
+    """任务表 + 公平队列 + 常驻识别进程池"""
+
+    def __init__(self, cfg, model_dir="", num_workers=0, threads_per_worker=0,
+                 max_jobs=64, max_per_client=16, keep_jobs=200, on_log=None):
+        self.runner = BatchRunner(cfg, model_dir=model_dir, on_log=on_log)
+        self.cfg = self.runner.cfg
+        self.on_log = on_log
+        self.queue = FairQueue(max_jobs, max_per_client)
+        self.jobs = collections.OrderedDict()
+        self.jobs_lock = threading.Lock()
+        self.keep_jobs = keep_jobs
+        self.work_root = os.path.join(CACHE_DIR, "server")
+        os.makedirs(self.work_root, exist_ok=True)
+
+        # 服务不知道会来多少文件，按核心数（或指定的进程数）规划
+        cores = os.cpu_count() or 1
+        max_workers = num_workers or self.cfg.get("max_workers", 0)
+        self.num_workers, self.num_threads = plan_workers(
+            max(cores, max_workers),
+            max_workers,
+            threads_per_worker or self.cfg.get("threads_per_worker", 0),
+            preferred_threads=self.cfg.get("tuned_threads", 0),
+        )
+        self.threads = []
+
+    def log(self, msg):
+        if self.on_log:
+            self.on_log(msg)
+
+    def start(self):
+        """预先启动全部识别进程（加载模型），再开始处理队列"""
+        model_dir, _ = model_paths(self.cfg, self.runner.model_dir)
+        cmd = build_worker_command(self.cfg, model_dir, self.num_threads)
+        warm = [self.runner.workers.acquire(cmd, env=build_env(), on_log=self.on_log)
+                for _ in range(self.num_workers)]
+        for worker in warm:
+            self.runner.workers.release(worker)
+        self.log(f"[服务] {self.num_workers} 个识别进程 × {self.num_threads} 线程已就绪")
+
+        for _ in range(self.num_workers):
+            t = threading.Thread(target=self._dispatch, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.queue.close()
+        self.runner.close()
+
+    def submit(self, client, input_media=None, name="", stream=None, length=0, formats=None):
+        """
+        提交任务：input_media 为服务器本地路径，或从 stream 读取 length 字节的上传内容
+        formats 为空时使用配置中的输出格式；包含未知格式时抛出 ValueError
+        """
+        formats = parse_formats(formats) if formats else self.runner.formats
+        name = os.path.basename(name or input_media or "upload")
+        if name in ("", ".", ".."):
+            raise ValueError("文件名无效")
+        job = Job(client, name, self.work_root, input_media, formats)
+
+        if job.upload:
+            # 上传内容边写边计算哈希，缓存直接用它，不按路径记忆（每个任务的目录都不同）
+            digest = hashlib.sha256()
+            remaining = length
+            try:
+                os.makedirs(job.work_dir)
+                with open(job.input, "wb") as f:
+                    while remaining > 0:
+                        chunk = stream.read(min(COPY_CHUNK, remaining))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        digest.update(chunk)
+                        remaining -= len(chunk)
+            except OSError as exc:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+                raise ValueError(f"无法保存上传内容: {exc}")
+            if remaining:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+                raise ValueError("上传内容不完整")
+            job.digest = digest.hexdigest()
+        else:
+            os.makedirs(job.work_dir)
+
+        self.log(f"[排队] {job.id} {job.name}（客户端 {client}）")
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+        try:
+            self.queue.put(job)
+        except QueueFull:
+            with self.jobs_lock:
+                del self.jobs[job.id]
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            raise
+        self._trim_jobs()
+        return job
+
+    def get(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job):
+        if not self.queue.remove(job):
+            return False
+        job.status = STATUS_CANCELLED
+        job.finished = time.time()
+        job.done.set()
+        return True
+
+    def status(self, job):
+        position = self.queue.position(job) if job.status == STATUS_QUEUED else None
+        return job.to_dict(position)
+
+    def health(self):
+        with self.jobs_lock:
+            running = sum(1 for job in self.jobs.values() if job.status == STATUS_RUNNING)
+        return {
+            "workers": self.num_workers,
+            "threads": self.num_threads,
+            "queued": self.queue.size,
+            "running": running,
+        }
+
+    def _trim_jobs(self):
+        """只保留最近 keep_jobs 个已结束的任务，连同临时文件一起删除"""
+        with self.jobs_lock:
+            finished = [job for job in self.jobs.values() if job.done.is_set()]
+            for job in finished[: max(0, len(finished) - self.keep_jobs)]:
+                del self.jobs[job.id]
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def _dispatch(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job):
+        job.status = STATUS_RUNNING
+        job.started = time.time()
+        self.log(f"[运行] {job.id} {job.name}")
+
+        def on_progress(msg):
+            job.processed = msg.get("processed", 0.0)
+            job.duration = msg.get("duration") or job.duration
+            job.segments = msg.get("segments", job.segments)
+            rtf = msg.get("rtf")
+            job.eta = max(0.0, job.duration - job.processed) * rtf if rtf and job.duration else None
+
+        try:
+            if not os.path.isfile(job.input):
+                raise WorkerError(f"文件不存在: {job.input}")
+            segments, rtf = self.runner.transcribe(
+                job.input, job.raw_path, self.num_threads, on_progress=on_progress, media_digest=job.digest
+            )
+            # 原始字幕保留给 /live，识别结果直接在内存中后处理，一次写出所有格式
+            write_outputs(postprocess_cues(CueStore.from_segments(segments)), job.result_base, job.formats)
+            job.segments = len(segments)
+            job.rtf = rtf
+            job.status = STATUS_DONE
+            self.log(f"[完成] {job.id} {job.name}，共 {len(segments)} 段")
+        except Exception as exc:
+            # 任何异常都要结束任务，否则等待结果的客户端会一直阻塞
+            job.error = str(exc)
+            job.status = STATUS_FAILED
+            self.log(f"[失败] {job.id} {job.name}: {exc}")
+        finally:
+            job.finished = time.time()
+            if job.upload:
+                try:
+                    os.remove(job.input)
+                except OSError:
+                    pass
+            job.done.set()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "SRTService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        self.service.log("[HTTP] " + format % args)
+
+    def _client(self):
+        return self.headers.get("X-Client") or self.client_address[0]
+
+    def _is_local(self):
+        return self.client_address[0] in ("127.0.0.1", "::1")
+
+    def _send_json(self, obj, status=HTTPStatus.OK, close=False):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, close=False):
+        """close 为 True 时回复后关闭连接：请求体可能没有读完，不能再按 keep-alive 解析下一个请求"""
+        self._send_json({"error": message}, status, close)
+
+    def _route(self):
+        """解析 /jobs/<id>[/<action>]，返回 (job, action)；找不到时已发送 404"""
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        job = self.service.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "任务不存在")
+        return job, (parts[2] if len(parts) > 2 else ""), parse_qs(url.query)
+
+    def do_POST(self):
+        # 出错时请求体可能只读了一部分（或完全没读），错误回复一律关闭连接
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send_error(HTTPStatus.NOT_FOUND, "未知接口", close=True)
+            return
+
+        content_type = self.headers.get("Content-Type", "")
+        query = parse_qs(url.query)
+        formats = query.get("formats", [""])[0]
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if content_type.startswith("application/json"):
+                data = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(data, dict):
+                    raise ValueError("请求体应为 JSON 对象")
+                if not self._is_local():
+                    self._send_error(HTTPStatus.FORBIDDEN, "仅本机请求可以提交服务器路径", close=True)
+                    return
+                path = data.get("path", "")
+                if not isinstance(path, str) or not os.path.isfile(path):
+                    self._send_error(HTTPStatus.BAD_REQUEST, f"文件不存在: {path}", close=True)
+                    return
+                job = self.service.submit(
+                    self._client(), input_media=path, formats=data.get("formats") or formats
+                )
+            else:
+                if length <= 0:
+                    self._send_error(HTTPStatus.LENGTH_REQUIRED, "缺少上传内容", close=True)
+                    return
+                name = query.get("name", ["upload"])[0]
+                job = self.service.submit(
+                    self._client(), name=name, stream=self.rfile, length=length, formats=formats
+                )
+        except QueueFull:
+            self._send_error(HTTPStatus.TOO_MANY_REQUESTS, "排队任务已满，请稍后再试", close=True)
+            return
+        except ValueError as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc), close=True)
+            return
+        self._send_json(self.service.status(job), HTTPStatus.ACCEPTED)
+
+    def do_GET(self):
+        if urlparse(self.path).path.rstrip("/") == "/health":
+            self._send_json(self.service.health())
+            return
+
+        job, action, query = self._route()
+        if job is None:
+            return
+        if not action:
+            self._send_json(self.service.status(job))
+        elif action in WRITERS:
+            self._send_result(job, action, query.get("wait", ["0"])[0] == "1")
+        elif action == "live":
+            self._send_live(job)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "未知接口")
+
+    def do_DELETE(self):
+        job, _, _ = self._route()
+        if job is None:
+            return
+        if self.service.cancel(job):
+            self._send_json(self.service.status(job))
+        else:
+            self._send_error(HTTPStatus.CONFLICT, "任务已开始或已结束，无法取消")
+
+    def _send_result(self, job, fmt, wait):
+        if fmt not in job.formats:
+            self._send_error(HTTPStatus.NOT_FOUND, f"任务未指定输出格式 {fmt}")
+            return
+        if wait:
+            job.done.wait()
+        if job.status == STATUS_FAILED:
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, job.error or "识别失败")
+            return
+        if job.status != STATUS_DONE:
+            self._send_error(HTTPStatus.CONFLICT, f"任务状态为 {job.status}")
+            return
+
+        path = output_path(job.result_base, fmt)
+        writer = WRITERS[fmt]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", writer.content_type)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f'attachment; filename="{job.id}{writer.extension}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, COPY_CHUNK)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_live(self, job):
+        """
+        识别进程边解码边写 raw.srt，这里跟随文件增长逐块推送
+        只推送以空行结尾的完整字幕块；任务结束后发送剩余内容并关闭
+        命中缓存时没有 raw.srt，结束后直接发送后处理的 SRT（如果生成了）
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-subrip; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        sent = 0
+        try:
+            while True:
+                finished = job.done.is_set()
+                try:
+                    with open(job.raw_path, "rb") as f:
+                        f.seek(sent)
+                        data = f.read()
+                except OSError:
+                    data = b""
+                if finished and not sent and not data:
+                    try:
+                        with open(output_path(job.result_base, "srt"), "rb") as f:
+                            data = f.read()
+                    except OSError:
+                        data = b""
+                if not finished:
+                    end = data.rfind(b"\n\n")
+                    data = data[: end + 2] if end >= 0 else b""
+                if data:
+                    self._write_chunk(data)
+                    sent += len(data)
+                if finished:
+                    break
+                job.done.wait(LIVE_POLL)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地字幕识别服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，局域网使用 0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", default="", help="配置文件，默认使用 launcher/config.json")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--workers", type=int, default=0, help="常驻识别进程数，0 为自动")
+    parser.add_argument("--threads", type=int, default=0, help="每个进程的推理线程数，0 为自动")
+    parser.add_argument("--max-jobs", type=int, default=64, help="排队任务总数上限")
+    parser.add_argument("--max-per-client", type=int, default=16, help="单个客户端排队任务上限")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+
+    def on_log(msg):
+        print(msg, file=sys.stderr, flush=True)
+
+    service = TranscriptionService(
+        load_config(args.config),
+        model_dir=args.model_dir,
+        num_workers=args.workers,
+        threads_per_worker=args.threads,
+        max_jobs=args.max_jobs,
+        max_per_client=args.max_per_client,
+        on_log=on_log,
+    )
+    missing = service.runner.check_requirements()
+    if missing:
+        on_log("缺少以下文件：\n" + "\n".join(missing))
+        return 2
+
+    try:
+        service.start()
+    except WorkerError as exc:
+        on_log(f"[失败] 识别进程启动失败: {exc}")
+        service.stop()
+        return 1
+
+    httpd = ThreadingHTTPServer((args.host, args.port), ServiceHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    on_log(f"[服务] 监听 http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
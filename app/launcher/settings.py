@@ -0,0 +1,190 @@
+import json
+import os
+import platform
+import sys
+
+
+if getattr(sys, "frozen", False):
+    APP_DIR = os.path.dirname(sys.executable)
+    CONFIG_PATH = os.path.join(APP_DIR, "launcher", "config.json")
+else:
+    APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+
+LOG_DIR = os.path.join(APP_DIR, "logs")
+CACHE_DIR = os.path.join(APP_DIR, "CACHE")
+SAMPLES_DIR = os.path.join(APP_DIR, "samples")
+
+DEFAULT_MODEL_FILE = "model.onnx"
+
+
+def resolve_path(value, default_value):
+    path = value or default_value
+    if not path:
+        return ""
+    if os.path.isabs(path):
+        return path
+    return os.path.abspath(os.path.join(APP_DIR, path))
+
+
+def load_config(path="", apply_tuning=True):
+    """
+    读取配置；apply_tuning 为 True 时套用本机的调优结果（tune.py 写入的 host_tuning）
+    """
+    cfg = _read_config(path or CONFIG_PATH)
+    if apply_tuning:
+        apply_host_tuning(cfg)
+    return cfg
+
+
+def _read_config(path):
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {
+        "default_model_dir": "./models",
+        "default_output_dir": "./SRT_OUT",
+        "default_input_dir": "",
+        "media_extensions": [".mp4", ".mov", ".m4a", ".mp3", ".wav"],
+        "required_model_files": ["tokens.txt", "{model_file}", "silero_vad.onnx"],
+        "model_file": DEFAULT_MODEL_FILE,
+        "required_ffmpeg_files": ["ffmpeg.exe", "ffprobe.exe"],
+        "script_rel_path": "./vendor/sherpa-onnx/python-api-examples/generate-subtitles.py",
+        "script_args_template": [
+            "--tokens",
+            "{model_dir}/tokens.txt",
+            "--paraformer",
+            "{model_dir}/{model_file}",
+            "--silero-vad-model",
+            "{model_dir}/silero_vad.onnx",
+            "--num-threads",
+            "{num_threads}",
+            "--decoding-method",
+            "greedy_search",
+            "{input_media}",
+        ],
+        "download_sources": {"github": {}, "hf_mirror": {}},
+        "max_workers": 0,
+        "threads_per_worker": 0,
+        "cache_enabled": True,
+        "cache_max_mb": 512,
+        "pcm_cache_enabled": False,
+        "pcm_cache_max_mb": 4096,
+        "log_max_mb": 10,
+        "log_backups": 3,
+        "prewarm_worker": True,
+        "trace_enabled": False,
+        "trace_format": "chrome",
+        "profile_mode": "",
+        "shard_long_files": True,
+        "shard_min_seconds": 1200,
+    }
+
+
+def host_name():
+    return platform.node() or "default"
+
+
+def apply_host_tuning(cfg):
+    """
+    本机有调优结果时，用它覆盖模型文件；线程数只作为规划进程数的参考（tuned_threads），
+    不固定 threads_per_worker，单个文件时仍可用上全部核心
+    """
+    entry = cfg.get("host_tuning", {}).get(host_name())
+    if entry:
+        cfg["model_file"] = entry["model_file"]
+        cfg["tuned_threads"] = entry["threads"]
+    return cfg
+
+
+def save_host_tuning(entry, path=""):
+    """把本机调优结果写入配置文件的 host_tuning（保留其他主机的结果与其余配置）"""
+    path = path or CONFIG_PATH
+    cfg = _read_config(path)
+    cfg.setdefault("host_tuning", {})[host_name()] = entry
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def ensure_dirs():
+    for name in ("SRT_OUT", "CACHE", "logs"):
+        os.makedirs(os.path.join(APP_DIR, name), exist_ok=True)
+
+
+def is_media_file(path, exts):
+    _, ext = os.path.splitext(path)
+    return ext.lower() in exts
+
+
+def list_media_files(folder, exts):
+    files = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            full = os.path.join(root, name)
+            if is_media_file(full, exts):
+                files.append(full)
+    return files
+
+
+def model_file(cfg):
+    """ASR 模型文件名，如 model.onnx / model.int8.onnx"""
+    return cfg.get("model_file") or DEFAULT_MODEL_FILE
+
+
+def model_paths(cfg, model_dir_value=""):
+    """返回 (模型目录, 模型文件列表)"""
+    model_dir = resolve_path(model_dir_value, cfg.get("default_model_dir"))
+    name_of = model_file(cfg)
+    files = [
+        os.path.join(model_dir, name.replace("{model_file}", name_of))
+        for name in cfg.get("required_model_files", [])
+    ]
+    return model_dir, files
+
+
+def script_path(cfg):
+    return os.path.join(APP_DIR, cfg.get("script_rel_path", ""))
+
+
+def build_script_command(cfg, model_dir, num_threads, extra_args=()):
+    """构建识别脚本命令（不含输入文件，模板中的 {input_media} 被跳过）"""
+    # [修复] 尝试将路径转换为相对路径，以避免 sherpa-onnx 在中文绝对路径下加载失败
+    try:
+        cwd = os.getcwd()
+        model_dir = os.path.relpath(model_dir, cwd)
+        # 统一使用正斜杠，避免转义问题
+        model_dir = model_dir.replace(os.sep, "/")
+    except Exception:
+        pass
+
+    args = []
+    for item in cfg.get("script_args_template", []):
+        if "{input_media}" in item:
+            continue
+        args.append(item.format(model_dir=model_dir, num_threads=num_threads, model_file=model_file(cfg)))
+
+    return [sys.executable, script_path(cfg)] + args + list(extra_args)
+
+
+def build_worker_command(cfg, model_dir, num_threads, extra_args=()):
+    """构建常驻识别进程命令（输入文件改为通过任务提交）"""
+    args = list(extra_args)
+    if cfg.get("pcm_cache_enabled", False):
+        # 解码后的 16kHz PCM 缓存：换模型/VAD 参数重跑同一文件时不再调用 ffmpeg
+        args += [
+            "--pcm-cache-dir", os.path.join(CACHE_DIR, "pcm"),
+            "--pcm-cache-max-mb", str(cfg.get("pcm_cache_max_mb", 4096)),
+        ]
+    return build_script_command(cfg, model_dir, num_threads, args) + ["--worker"]
+
+
+def build_env():
+    """识别进程环境：优先使用随包附带的 ffmpeg"""
+    env = os.environ.copy()
+    ffmpeg_dir = os.path.join(APP_DIR, "tools", "ffmpeg")
+    env["PATH"] = ffmpeg_dir + os.pathsep + env.get("PATH", "")
+    env.setdefault("PYTHONIOENCODING", "utf-8")
+    return env
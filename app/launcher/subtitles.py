@@ -0,0 +1,808 @@
+import os
+import re
+from array import array
+
+from instrument import NULL_RECORDER
+from settings import APP_DIR
+
+
+# ========== 字幕处理常量 ==========
+# 字符限制
+MAX_CN_CHARS = 20         # 中文单行最大字符
+MAX_EN_CHARS = 42         # 英文单行最大字符
+
+# 时长限制
+MIN_DURATION = 0.8        # 最小时长(秒)
+MAX_DURATION = 4.2        # 最大时长(秒)
+
+# 阅读速度限制（字符/秒）
+MAX_CPS_CN = 7.5          # 中文最大阅读速度
+MAX_CPS_EN = 17.0         # 英文最大阅读速度
+
+# 时间轴间隙
+MIN_GAP = 0.05            # 最小间隙(秒)
+MAX_GAP = 0.12            # 最大间隙(秒)
+
+
+# ========== 预编译的文本处理表 ==========
+# 去除的标点（与断句、合并等各处规则一致）
+PUNCTUATION = "，,。.!！?？；;：:、\"'()（）[]{}<>《》"
+PUNCTUATION_TABLE = str.maketrans("", "", PUNCTUATION)
+CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+SENTENCE_END_PATTERN = re.compile(r"([。.!！?？；;]+)")
+COMMA_PATTERN = re.compile(r"[，,、]+")
+TOKEN_MAX_SKIP = 4        # 对齐 token 时间戳时最多跳过的字符数
+BLANK_LINE_PATTERN = re.compile(r"\n[ \t]*\n")
+
+
+def strip_punctuation(text):
+    """移除所有标点符号（保留空格）"""
+    return text.translate(PUNCTUATION_TABLE)
+
+
+def split_by_punctuation(text):
+    """按标点符号分割文本（保留标点用于断句）"""
+    # 按句末标点分割
+    parts = SENTENCE_END_PATTERN.split(text)
+    result = []
+    current = ""
+    for i, part in enumerate(parts):
+        if i % 2 == 0:  # 文本部分
+            current += part
+        else:  # 标点部分
+            current += part
+            if current.strip():
+                result.append(current.strip())
+            current = ""
+    if current.strip():
+        result.append(current.strip())
+    return result
+
+
+class CueText:
+    """
+    一条字幕文本的分析结果，只计算一次，供合并、断句、阅读速度检查等各轮复用
+    text 为去除标点后的文本
+    """
+
+    __slots__ = ("text", "cjk_count", "is_chinese", "char_count", "max_chars", "max_cps")
+
+    def __init__(self, text):
+        self.text = text
+        self.cjk_count = len(CJK_PATTERN.findall(text))
+        self.is_chinese = self.cjk_count > len(text) / 3
+        if self.is_chinese:
+            # 中文：计算汉字数量
+            self.char_count = self.cjk_count
+            self.max_chars = MAX_CN_CHARS
+            self.max_cps = MAX_CPS_CN
+        else:
+            # 英文：计算字符数（不含空格）
+            self.char_count = len(text) - text.count(" ")
+            self.max_chars = MAX_EN_CHARS
+            self.max_cps = MAX_CPS_EN
+
+    def __len__(self):
+        return len(self.text)
+
+    def reading_speed(self, duration):
+        """阅读速度（字符/秒）"""
+        if duration <= 0:
+            return float('inf')
+        return self.char_count / duration
+
+
+def analyze_text(text):
+    """去标点后分析文本"""
+    return CueText(strip_punctuation(text))
+
+
+def is_chinese_text(text):
+    """判断文本是否主要是中文"""
+    return len(CJK_PATTERN.findall(text)) > len(text) / 3
+
+
+def calculate_char_count(text):
+    """计算字符数（中文按字数，英文按字符数）"""
+    return analyze_text(text).char_count
+
+
+def calculate_reading_speed(text, duration):
+    """计算阅读速度（字符/秒）"""
+    return analyze_text(text).reading_speed(duration)
+
+
+def get_max_cps(text):
+    """获取文本的最大阅读速度限制"""
+    return MAX_CPS_CN if is_chinese_text(text) else MAX_CPS_EN
+
+
+def get_max_chars(text):
+    """获取文本的最大字符限制"""
+    return MAX_CN_CHARS if is_chinese_text(text) else MAX_EN_CHARS
+
+
+# ========== 中文断句辅助 ==========
+# 用户词典目录，每行一个词，内容会并入下面的内置词表
+DICT_DIR = os.path.join(APP_DIR, "dicts")
+
+# 常见的句子边界词（在这些词后面断开是安全的）
+BREAK_AFTER_WORDS = {
+    # 语气词/助词
+    "的", "了", "吧", "呢", "啊", "哦", "嘛", "呀", "哈", "吗", "啦", "喽",
+    # 标点替代
+    "就是", "但是", "所以", "因为", "然后", "而且", "或者", "如果", "那么",
+    "不过", "可是", "虽然", "既然", "无论", "不管", "只要", "除非", "即使",
+    # 动词/连接
+    "可以", "需要", "应该", "必须", "能够", "不能", "不要", "一定", 
+    "建议", "推荐", "记住", "注意", "首先", "其次", "最后", "第一", "第二", "第三",
+}
+
+# 禁止在这些词中间断开
+PROTECTED_WORDS = {
+    "网络", "账号", "密码", "邮箱", "手机", "电脑", "浏览器", "服务器",
+    "平台", "软件", "工具", "视频", "音频", "文件", "目录", "路径",
+    "安全", "隐私", "环境", "设备", "系统", "功能", "内容", "信息",
+    "规则", "意识", "言论", "敏感", "高价值", "账户", "登录", "注册",
+    "下载", "安装", "配置", "设置", "运行", "使用", "操作", "处理",
+    "指纹", "身份", "证明", "验证", "授权", "权限", "风险", "问题",
+}
+
+
+class WordMatcher:
+    """
+    Aho-Corasick 多模式匹配：一次扫描找出文本中所有词典词的出现位置
+    词典再大，每个字符也只走一次状态转移
+    """
+
+    def __init__(self, words=()):
+        # 每个状态：转移表、失败指针、在此结束的词
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for word in words:
+            self.add(word)
+        self.build()
+
+    def add(self, word):
+        if not word:
+            return
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        if word not in self.output[state]:
+            self.output[state].append(word)
+
+    def build(self):
+        """按广度优先计算失败指针，并把后缀状态的输出合并进来"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def finditer(self, text):
+        """逐个返回 (起始位置, 词)"""
+        state = 0
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for word in output[state]:
+                    yield i + 1 - len(word), word
+
+
+def read_word_file(path):
+    """读取词典文件：每行一个词，# 开头为注释"""
+    words = set()
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                word = line.split("#", 1)[0].strip()
+                if word:
+                    words.add(word)
+    except OSError:
+        pass
+    return words
+
+
+PROTECTED_MATCHER = WordMatcher()
+BREAK_AFTER_MATCHER = WordMatcher()
+
+
+def load_user_dictionaries(dict_dir=None):
+    """
+    合并内置词表与 dicts/ 下的用户词典（protected_words.txt / break_after_words.txt），
+    重建匹配器；模块导入时调用一次，修改词典后可再次调用
+    """
+    global PROTECTED_MATCHER, BREAK_AFTER_MATCHER
+    if dict_dir is None:
+        dict_dir = DICT_DIR
+    PROTECTED_MATCHER = WordMatcher(
+        PROTECTED_WORDS | read_word_file(os.path.join(dict_dir, "protected_words.txt"))
+    )
+    BREAK_AFTER_MATCHER = WordMatcher(
+        BREAK_AFTER_WORDS | read_word_file(os.path.join(dict_dir, "break_after_words.txt"))
+    )
+
+
+class BreakPointIndex:
+    """
+    对一段文本扫描一次，记录每个位置被哪些保护词跨越、是否紧跟在停顿词之后
+    smart_split_chinese 对同一文本多次找断点时共用这个索引
+    """
+
+    def __init__(self, text):
+        self.text = text
+        # 位置 -> [(保护词起点, 词)]：断在该位置会拆开这些词
+        self.crossing = {}
+        # 位置 -> [停顿词起点]：该位置前面是停顿词
+        self.after_break_word = {}
+
+        for start, word in PROTECTED_MATCHER.finditer(text):
+            for pos in range(start + 1, start + len(word)):
+                self.crossing.setdefault(pos, []).append((start, word))
+        for start, word in BREAK_AFTER_MATCHER.finditer(text):
+            self.after_break_word.setdefault(start + len(word), []).append(start)
+
+    def score(self, pos, offset=0):
+        """
+        在 text[offset:] 中于 pos（相对 offset）断开的得分
+        只计算完整落在 text[offset:] 内的词
+        """
+        pos += offset
+        score = 0
+        # 同一个保护词只扣一次分
+        words = {word for start, word in self.crossing.get(pos, ()) if start >= offset}
+        score -= 50 * len(words)
+        if any(start >= offset for start in self.after_break_word.get(pos, ())):
+            score += 20
+        return score
+
+
+def find_best_break_point(text, target_pos, window=5, index=None, offset=0):
+    """
+    在目标位置附近寻找最佳断点
+    优先在停顿词后断开，避免拆分常见词组
+    index 为 text 所在整段文本的 BreakPointIndex，text 从其 offset 处开始
+    """
+    if target_pos >= len(text):
+        return len(text)
+    if index is None:
+        index = BreakPointIndex(text)
+        offset = 0
+
+    # 搜索范围：target_pos 前后 window 个字符
+    start = max(0, target_pos - window)
+    end = min(len(text), target_pos + window)
+    
+    best_pos = target_pos
+    best_score = -100
+    
+    for pos in range(start, end + 1):
+        if pos == 0 or pos >= len(text):
+            continue
+
+        # 保护词扣分、停顿词加分，并偏好接近目标位置
+        score = index.score(pos, offset) - abs(pos - target_pos) * 2
+        
+        if score > best_score:
+            best_score = score
+            best_pos = pos
+    
+    return best_pos
+
+
+def smart_split_chinese(text, max_len):
+    """智能分割中文文本，避免拆分词语"""
+    if not text or len(text) <= max_len:
+        return [text] if text else []
+    
+    lines = []
+    index = BreakPointIndex(text)
+    offset = 0
+    
+    while len(text) - offset > max_len:
+        # 寻找最佳断点
+        break_pos = find_best_break_point(text[offset:], max_len, index=index, offset=offset)
+        
+        # 确保至少切出一些内容，避免死循环
+        if break_pos <= 0:
+            break_pos = max_len
+        
+        lines.append(text[offset:offset + break_pos])
+        offset += break_pos
+    
+    if offset < len(text):
+        lines.append(text[offset:])
+    
+    return lines
+
+
+def wrap_text_by_punctuation(text, max_len):
+    """按标点和长度换行，优先在逗号等处断开"""
+    if not text:
+        return []
+    
+    clean = strip_punctuation(text)
+    if len(clean) <= max_len:
+        return [clean]
+    
+    # 先按逗号分割
+    segments = COMMA_PATTERN.split(text)
+    lines = []
+    current = ""
+    
+    for seg in segments:
+        seg_clean = strip_punctuation(seg)
+        if not seg_clean:
+            continue
+        
+        if not current:
+            current = seg_clean
+        elif len(strip_punctuation(current)) + len(seg_clean) <= max_len:
+            current = current + seg_clean
+        else:
+            if current:
+                lines.append(strip_punctuation(current))
+            current = seg_clean
+    
+    if current:
+        lines.append(strip_punctuation(current))
+    
+    # 检查是否有超长行，如果有则强制截断
+    final_lines = []
+    for line in lines:
+        if len(line) <= max_len:
+            final_lines.append(line)
+        else:
+            # 强制按长度截断（尽量避免）
+            if is_chinese_text(line):
+                # 中文使用智能断句，避免拆分词语
+                final_lines.extend(smart_split_chinese(line, max_len))
+            else:
+                # 英文按单词截
+                words = line.split()
+                curr = []
+                curr_len = 0
+                for w in words:
+                    if curr_len + len(w) + (1 if curr else 0) > max_len:
+                        if curr:
+                            final_lines.append(" ".join(curr))
+                        curr = [w]
+                        curr_len = len(w)
+                    else:
+                        curr.append(w)
+                        curr_len += len(w) + (1 if len(curr) > 1 else 0)
+                if curr:
+                    final_lines.append(" ".join(curr))
+    
+    return final_lines
+
+
+def split_subtitle_text(text, max_cn=None, max_en=None):
+    """分割字幕文本，按标点断句"""
+    if max_cn is None:
+        max_cn = MAX_CN_CHARS
+    if max_en is None:
+        max_en = MAX_EN_CHARS
+    
+    # 按句末标点分割
+    sentences = split_by_punctuation(text)
+    lines = []
+    
+    for sentence in sentences:
+        clean = strip_punctuation(sentence)
+        if not clean:
+            continue
+        
+        max_len = max_cn if is_chinese_text(clean) else max_en
+        
+        if len(clean) <= max_len:
+            lines.append(clean)
+        else:
+            # 超长句子按逗号等处断开
+            lines.extend(wrap_text_by_punctuation(sentence, max_len))
+    
+    return [line for line in lines if line]
+
+
+def clamp_duration(start, end, min_s, max_s):
+    duration = max(0.0, end - start)
+    if duration < min_s:
+        end = start + min_s
+    elif duration > max_s:
+        end = start + max_s
+    return start, end
+
+
+def parse_timecode(tc):
+    # Format: HH:MM:SS,mmm（也接受 . 分隔毫秒或缺少毫秒）
+    hms, _, ms = tc.strip().replace(".", ",").partition(",")
+    h, m, s = hms.split(":")
+    seconds = int(h) * 3600 + int(m) * 60 + int(s)
+    if ms:
+        seconds += int(ms.ljust(3, "0")) / 1000.0
+    return seconds
+
+
+def format_timecode(seconds, sep=","):
+    # 先取整到毫秒再拆分，避免出现 ",1000"；WebVTT 使用 sep="."
+    ms = max(0, int(round(seconds * 1000)))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+class CueStore:
+    """
+    字幕的紧凑存储：开始/结束时间是两个并行的 float 数组，文本单独一个列表
+    识别结果直接装入这里做后处理，最后只序列化一次 SRT
+    tokens 与文本对应：[[token, 相对开始的秒数], ...]，模型不输出时间戳时为 None
+    """
+
+    __slots__ = ("starts", "ends", "texts", "tokens")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.texts = []
+        self.tokens = []
+
+    def append(self, start, end, text, tokens=None):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text)
+        self.tokens.append(tokens)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.texts)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """识别进程返回的 [[start, duration, text(, tokens)], ...]"""
+        cues = cls()
+        for item in segments:
+            start, duration, text = item[:3]
+            cues.append(start, start + duration, text, item[3] if len(item) > 3 else None)
+        return cues
+
+    @classmethod
+    def parse_srt(cls, content):
+        """解析 SRT 文本，兼容 CRLF / CR 换行和空白行中的空格"""
+        cues = cls()
+        content = content.replace("\r\n", "\n").replace("\r", "\n").strip()
+        if not content:
+            return cues
+        for block in BLANK_LINE_PATTERN.split(content):
+            lines = block.strip().split("\n")
+            if len(lines) < 3 or " --> " not in lines[1]:
+                continue
+            start_tc, end_tc = lines[1].split(" --> ")
+            try:
+                start = parse_timecode(start_tc)
+                end = parse_timecode(end_tc)
+            except ValueError:
+                continue
+            cues.append(start, end, " ".join(lines[2:]).strip())
+        return cues
+
+    @classmethod
+    def read_srt(cls, path):
+        with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+            return cls.parse_srt(f.read())
+
+    def to_srt(self):
+        blocks = []
+        for idx, (start, end, text) in enumerate(self, 1):
+            blocks.append(f"{idx}\n{format_timecode(start)} --> {format_timecode(end)}\n{text}")
+        return "\n\n".join(blocks)
+
+    def write_srt(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_srt())
+
+
+def save_segments_srt(segments, path):
+    """把原始分段 [[start, duration, text], ...] 写成 SRT（未后处理）"""
+    CueStore.from_segments(segments).write_srt(path)
+
+
+def token_char_times(text, start, tokens):
+    """
+    把 token 时间戳对齐到 text（已去标点）的每个字符，返回各字符的绝对开始时间
+    没有时间戳或大部分 token 对不上时返回 None（退回按时长平均分配）
+    """
+    if not tokens or not text:
+        return None
+    lower = text.lower()
+    times = [None] * len(text)
+    pos = 0
+    matched = 0
+    for token, offset in tokens:
+        # BPE 续接符 @@ 与 SentencePiece 词首符 ▁ 不在文本中
+        piece = token.replace("@@", "").replace("\u2581", " ").strip().lower()
+        if not piece:
+            continue
+        idx = lower.find(piece, pos)
+        # 标点等被清理掉的 token 找不到；只允许跳过少量字符，避免对到后面的重复字
+        if idx < 0 or idx - pos > TOKEN_MAX_SKIP:
+            continue
+        t = start + offset
+        for i in range(idx, idx + len(piece)):
+            times[i] = t
+        pos = idx + len(piece)
+        matched += len(piece)
+
+    if matched * 2 < len(text) - text.count(" "):
+        return None
+
+    # 没对上的字符（空格、跳过的 token）取后一个字符的时间，结尾处取前一个
+    known = None
+    for i in range(len(times) - 1, -1, -1):
+        if times[i] is None:
+            times[i] = known
+        else:
+            known = times[i]
+    for i in range(1, len(times)):
+        if times[i] is None:
+            times[i] = times[i - 1]
+    return times
+
+
+def split_times_by_tokens(start, end, pieces, char_times, min_s, max_s):
+    """
+    按 token 时间切分：第 i 段从它第一个字的时间开始，到下一段开始为止
+    char_times 为 None 或时间不单调时退回 split_times
+    """
+    if char_times is None:
+        return split_times(start, end, len(pieces), min_s, max_s)
+    bounds = [start]
+    offset = 0
+    for piece in pieces[:-1]:
+        offset += len(piece)
+        bounds.append(char_times[offset])
+    bounds.append(end)
+    if any(b < a for a, b in zip(bounds, bounds[1:])):
+        return split_times(start, end, len(pieces), min_s, max_s)
+    return list(zip(bounds, bounds[1:]))
+
+
+def split_times(start, end, count, min_s, max_s):
+    if count <= 0:
+        return []
+    total = max(0.0, end - start)
+    min_total = min_s * count
+    max_total = max_s * count
+    if total < min_total:
+        total = min_total
+    elif total > max_total:
+        total = max_total
+    duration = total / count
+    duration = max(min_s, min(max_s, duration))
+
+    times = []
+    current = start
+    for _ in range(count):
+        seg_start = current
+        seg_end = seg_start + duration
+        times.append((seg_start, seg_end))
+        current = seg_end
+    return times
+
+
+def postprocess_srt(path, max_cn=None, max_en=None, min_s=None, max_s=None, recorder=NULL_RECORDER):
+    """后处理 SRT 文件：文本分割、时长控制、阅读速度检查、时间轴校验"""
+    if not os.path.isfile(path):
+        return
+    with recorder.span("postprocess.parse"):
+        cues = CueStore.read_srt(path)
+    if not cues:
+        return
+    cues = postprocess_cues(cues, min_s, max_s, recorder)
+    with recorder.span("postprocess.write"):
+        cues.write_srt(path)
+
+
+def postprocess_cues(cues, min_s=None, max_s=None, recorder=NULL_RECORDER):
+    """
+    在内存中后处理字幕（CueStore -> CueStore），不经过 SRT 文件往返
+    识别结果可直接 CueStore.from_segments(segments) 传入
+    recorder：instrument.Recorder，记录每一轮的耗时
+    """
+    recorder.count("postprocess.cues_in", len(cues))
+    if min_s is None:
+        min_s = MIN_DURATION
+    if max_s is None:
+        max_s = MAX_DURATION
+
+    # 第一轮：清理文本（去标点），有 token 时间戳时对齐到每个字符
+    with recorder.span("postprocess.clean"):
+        raw_subtitles = []  # [(start, end, CueText, char_times), ...]
+        for start, end, text, tokens in zip(cues.starts, cues.ends, cues.texts, cues.tokens):
+            clean_text = strip_punctuation(text)
+            if clean_text:
+                raw_subtitles.append([start, end, CueText(clean_text), token_char_times(clean_text, start, tokens)])
+    
+    # 第二轮：合并相邻短句（关键步骤！）
+    with recorder.span("postprocess.merge"):
+        # 如果两条字幕间隔很小（<200ms）且合并后不超过字符限制，就合并它们
+        MERGE_GAP_THRESHOLD = 0.2  # 200ms
+        merged_subtitles = []
+    
+        for start, end, info, char_times in raw_subtitles:
+            if not merged_subtitles:
+                merged_subtitles.append([start, end, info, char_times])
+                continue
+        
+            prev_start, prev_end, prev_info, prev_times = merged_subtitles[-1]
+            gap = start - prev_end
+        
+            # 合并条件：间隔小、合并后不超限
+            if gap < MERGE_GAP_THRESHOLD:
+                combined = CueText(prev_info.text + info.text)
+                if len(combined) <= combined.max_chars:
+                    # 合并
+                    combined_times = prev_times + char_times if prev_times and char_times else None
+                    merged_subtitles[-1] = [prev_start, end, combined, combined_times]
+                    continue
+            merged_subtitles.append([start, end, info, char_times])
+    
+    # 第三轮：智能断句（对合并后仍超长的进行分割）
+    with recorder.span("postprocess.split"):
+        subtitles = []
+        for start, end, info, char_times in merged_subtitles:
+            if len(info) <= info.max_chars:
+                subtitles.append([start, end, info])
+            else:
+                # 需要分割
+                new_texts = smart_split_chinese(info.text, info.max_chars) if info.is_chinese else [info.text]
+                if not new_texts:
+                    new_texts = [info.text]
+            
+                # 分配时间：有 token 时间戳时切在真实的字边界上，否则按时长平均
+                for (seg_start, seg_end), seg_text in zip(
+                    split_times_by_tokens(start, end, new_texts, char_times, min_s, max_s),
+                    new_texts,
+                ):
+                    subtitles.append([seg_start, seg_end, CueText(seg_text)])
+    
+    # 第二轮：检查阅读速度，必要时延长时间或拆分
+    with recorder.span("postprocess.cps"):
+        adjusted_subtitles = []
+        for i, (start, end, info) in enumerate(subtitles):
+            duration = end - start
+            max_cps = info.max_cps
+            cps = info.reading_speed(duration)
+        
+            if cps > max_cps:
+                # 阅读速度超限，计算需要的最小时长
+                needed_duration = info.char_count / max_cps
+            
+                # 尝试延长 end（检查与下一条字幕的空隙）
+                next_start = subtitles[i + 1][0] if i + 1 < len(subtitles) else float('inf')
+                available_end = next_start - MIN_GAP
+            
+                if start + needed_duration <= available_end:
+                    # 可以延长
+                    end = start + needed_duration
+                elif start + needed_duration <= next_start:
+                    # 可以延长但会压缩间隙
+                    end = min(start + needed_duration, next_start - MIN_GAP)
+            
+                # 如果仍然超限，保持原样（已尽力）
+        
+            # 应用时长限制
+            start, end = clamp_duration(start, end, min_s, max_s)
+            adjusted_subtitles.append([start, end, info.text])
+    
+    # 第三轮：修复重叠和间隙
+    with recorder.span("postprocess.fix_overlaps"):
+        result = CueStore()
+        for start, end, text in fix_overlaps_and_gaps(adjusted_subtitles):
+            result.append(start, end, text)
+    recorder.count("postprocess.cues_out", len(result))
+    return result
+
+
+def fix_overlaps_and_gaps(subtitles):
+    """修复字幕时间轴的重叠和间隙问题"""
+    if not subtitles:
+        return subtitles
+    
+    result = []
+    for i, (start, end, text) in enumerate(subtitles):
+        if i == 0:
+            result.append([start, end, text])
+            continue
+        
+        prev_end = result[-1][1]
+        
+        # 检查重叠
+        if start < prev_end:
+            # 有重叠，调整当前字幕的开始时间或前一条的结束时间
+            # 策略：缩短前一条的结束时间，确保有最小间隙
+            new_prev_end = start - MIN_GAP
+            if new_prev_end > result[-1][0] + MIN_DURATION:
+                result[-1][1] = new_prev_end
+            else:
+                # 无法调整前一条，调整当前开始
+                start = prev_end + MIN_GAP
+        
+        # 检查间隙
+        gap = start - result[-1][1]
+        if gap < MIN_GAP and gap >= 0:
+            # 间隙太小，微调
+            start = result[-1][1] + MIN_GAP
+        elif gap > MAX_GAP:
+            # 间隙太大，可以接受（不强制调整）
+            pass
+        
+        result.append([start, end, text])
+    
+    return result
+
+
+class LiveCueFilter:
+    """
+    postprocess_srt 的低延迟版本，用于实时字幕
+    每条字幕到达后立即处理并输出，不等待后续字幕：
+    去标点、超长断句、阅读速度与时长限制照常执行；
+    不做相邻短句合并，重叠只通过推后当前字幕的开始时间解决（已输出的字幕不再修改）
+    """
+
+    def __init__(self, min_s=None, max_s=None):
+        self.min_s = MIN_DURATION if min_s is None else min_s
+        self.max_s = MAX_DURATION if max_s is None else max_s
+        self.prev_end = None
+
+    def process(self, start, end, text):
+        """返回可立即输出的 [[start, end, text], ...]"""
+        info = CueText(strip_punctuation(text).strip())
+        if not info.text:
+            return []
+
+        texts = [info.text]
+        if len(info) > info.max_chars and info.is_chinese:
+            texts = smart_split_chinese(info.text, info.max_chars) or [info.text]
+        times = [(start, end)] if len(texts) == 1 else split_times(start, end, len(texts), self.min_s, self.max_s)
+
+        result = []
+        for (seg_start, seg_end), seg_text in zip(times, texts):
+            seg_info = info if len(texts) == 1 else CueText(seg_text)
+            needed = seg_info.char_count / seg_info.max_cps
+            if seg_end - seg_start < needed:
+                seg_end = seg_start + needed
+            if self.prev_end is not None and seg_start < self.prev_end + MIN_GAP:
+                seg_start = self.prev_end + MIN_GAP
+            seg_start, seg_end = clamp_duration(seg_start, seg_end, self.min_s, self.max_s)
+            self.prev_end = seg_end
+            result.append([seg_start, seg_end, seg_text])
+        return result
+
+
+load_user_dictionaries()
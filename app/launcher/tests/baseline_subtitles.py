@@ -0,0 +1,528 @@
+"""
+优化前的字幕后处理（git 25c3dd8 之前的 subtitles.py，除一处无效转义改成等价写法外原样保留），只作为等价性测试的对照：
+断点逐词逐位置比较、每轮重新分析文本、经 SRT 文件往返。不要修改，也不要在程序中导入
+"""
+import os
+import re
+
+
+# ========== 字幕处理常量 ==========
+# 字符限制
+MAX_CN_CHARS = 20         # 中文单行最大字符
+MAX_EN_CHARS = 42         # 英文单行最大字符
+
+# 时长限制
+MIN_DURATION = 0.8        # 最小时长(秒)
+MAX_DURATION = 4.2        # 最大时长(秒)
+
+# 阅读速度限制（字符/秒）
+MAX_CPS_CN = 7.5          # 中文最大阅读速度
+MAX_CPS_EN = 17.0         # 英文最大阅读速度
+
+# 时间轴间隙
+MIN_GAP = 0.05            # 最小间隙(秒)
+MAX_GAP = 0.12            # 最大间隙(秒)
+
+def strip_punctuation(text):
+    """移除所有标点符号（保留空格）"""
+    return re.sub(r"[，,。.!！?？；;：:、\"""'''()（）\\[\\]{}<>《》]+", "", text)
+
+
+def split_by_punctuation(text):
+    """按标点符号分割文本（保留标点用于断句）"""
+    # 按句末标点分割
+    parts = re.split(r"([。.!！?？；;]+)", text)
+    result = []
+    current = ""
+    for i, part in enumerate(parts):
+        if i % 2 == 0:  # 文本部分
+            current += part
+        else:  # 标点部分
+            current += part
+            if current.strip():
+                result.append(current.strip())
+            current = ""
+    if current.strip():
+        result.append(current.strip())
+    return result
+
+
+def is_chinese_text(text):
+    """判断文本是否主要是中文"""
+    cjk_count = len(re.findall(r"[\u4e00-\u9fff]", text))
+    return cjk_count > len(text) / 3
+
+
+def calculate_char_count(text):
+    """计算字符数（中文按字数，英文按字符数）"""
+    clean = strip_punctuation(text)
+    if is_chinese_text(clean):
+        # 中文：计算汉字数量
+        return len(re.findall(r"[\u4e00-\u9fff]", clean))
+    else:
+        # 英文：计算字符数（不含空格）
+        return len(clean.replace(" ", ""))
+
+
+def calculate_reading_speed(text, duration):
+    """计算阅读速度（字符/秒）"""
+    if duration <= 0:
+        return float('inf')
+    char_count = calculate_char_count(text)
+    return char_count / duration
+
+
+def get_max_cps(text):
+    """获取文本的最大阅读速度限制"""
+    return MAX_CPS_CN if is_chinese_text(text) else MAX_CPS_EN
+
+
+def get_max_chars(text):
+    """获取文本的最大字符限制"""
+    return MAX_CN_CHARS if is_chinese_text(text) else MAX_EN_CHARS
+
+
+# ========== 中文断句辅助 ==========
+# 常见的句子边界词（在这些词后面断开是安全的）
+BREAK_AFTER_WORDS = {
+    # 语气词/助词
+    "的", "了", "吧", "呢", "啊", "哦", "嘛", "呀", "哈", "吗", "啦", "喽",
+    # 标点替代
+    "就是", "但是", "所以", "因为", "然后", "而且", "或者", "如果", "那么",
+    "不过", "可是", "虽然", "既然", "无论", "不管", "只要", "除非", "即使",
+    # 动词/连接
+    "可以", "需要", "应该", "必须", "能够", "不能", "不要", "一定", 
+    "建议", "推荐", "记住", "注意", "首先", "其次", "最后", "第一", "第二", "第三",
+}
+
+# 禁止在这些词中间断开
+PROTECTED_WORDS = {
+    "网络", "账号", "密码", "邮箱", "手机", "电脑", "浏览器", "服务器",
+    "平台", "软件", "工具", "视频", "音频", "文件", "目录", "路径",
+    "安全", "隐私", "环境", "设备", "系统", "功能", "内容", "信息",
+    "规则", "意识", "言论", "敏感", "高价值", "账户", "登录", "注册",
+    "下载", "安装", "配置", "设置", "运行", "使用", "操作", "处理",
+    "指纹", "身份", "证明", "验证", "授权", "权限", "风险", "问题",
+}
+
+
+def find_best_break_point(text, target_pos, window=5):
+    """
+    在目标位置附近寻找最佳断点
+    优先在停顿词后断开，避免拆分常见词组
+    """
+    if target_pos >= len(text):
+        return len(text)
+    
+    # 搜索范围：target_pos 前后 window 个字符
+    start = max(0, target_pos - window)
+    end = min(len(text), target_pos + window)
+    
+    best_pos = target_pos
+    best_score = -100
+    
+    for pos in range(start, end + 1):
+        if pos == 0 or pos >= len(text):
+            continue
+        
+        score = 0
+        
+        # 检查是否在保护词中间
+        for word in PROTECTED_WORDS:
+            word_len = len(word)
+            for i in range(max(0, pos - word_len + 1), min(pos + 1, len(text) - word_len + 1)):
+                if text[i:i + word_len] == word:
+                    # 如果断点在这个词中间，扣分
+                    if i < pos < i + word_len:
+                        score -= 50
+                    break
+        
+        # 检查前面是否是停顿词（在停顿词后断开加分）
+        for word in BREAK_AFTER_WORDS:
+            word_len = len(word)
+            if pos >= word_len and text[pos - word_len:pos] == word:
+                score += 20
+                break
+        
+        # 偏好接近目标位置
+        distance = abs(pos - target_pos)
+        score -= distance * 2
+        
+        if score > best_score:
+            best_score = score
+            best_pos = pos
+    
+    return best_pos
+
+
+def smart_split_chinese(text, max_len):
+    """智能分割中文文本，避免拆分词语"""
+    if not text or len(text) <= max_len:
+        return [text] if text else []
+    
+    lines = []
+    remaining = text
+    
+    while len(remaining) > max_len:
+        # 寻找最佳断点
+        break_pos = find_best_break_point(remaining, max_len)
+        
+        # 确保至少切出一些内容，避免死循环
+        if break_pos <= 0:
+            break_pos = max_len
+        
+        lines.append(remaining[:break_pos])
+        remaining = remaining[break_pos:]
+    
+    if remaining:
+        lines.append(remaining)
+    
+    return lines
+
+
+def wrap_text_by_punctuation(text, max_len):
+    """按标点和长度换行，优先在逗号等处断开"""
+    if not text:
+        return []
+    
+    clean = strip_punctuation(text)
+    if len(clean) <= max_len:
+        return [clean]
+    
+    # 先按逗号分割
+    segments = re.split(r"[，,、]+", text)
+    lines = []
+    current = ""
+    
+    for seg in segments:
+        seg_clean = strip_punctuation(seg)
+        if not seg_clean:
+            continue
+        
+        if not current:
+            current = seg_clean
+        elif len(strip_punctuation(current)) + len(seg_clean) <= max_len:
+            current = current + seg_clean
+        else:
+            if current:
+                lines.append(strip_punctuation(current))
+            current = seg_clean
+    
+    if current:
+        lines.append(strip_punctuation(current))
+    
+    # 检查是否有超长行，如果有则强制截断
+    final_lines = []
+    for line in lines:
+        if len(line) <= max_len:
+            final_lines.append(line)
+        else:
+            # 强制按长度截断（尽量避免）
+            if is_chinese_text(line):
+                # 中文使用智能断句，避免拆分词语
+                final_lines.extend(smart_split_chinese(line, max_len))
+            else:
+                # 英文按单词截
+                words = line.split()
+                curr = []
+                curr_len = 0
+                for w in words:
+                    if curr_len + len(w) + (1 if curr else 0) > max_len:
+                        if curr:
+                            final_lines.append(" ".join(curr))
+                        curr = [w]
+                        curr_len = len(w)
+                    else:
+                        curr.append(w)
+                        curr_len += len(w) + (1 if len(curr) > 1 else 0)
+                if curr:
+                    final_lines.append(" ".join(curr))
+    
+    return final_lines
+
+
+def split_subtitle_text(text, max_cn=None, max_en=None):
+    """分割字幕文本，按标点断句"""
+    if max_cn is None:
+        max_cn = MAX_CN_CHARS
+    if max_en is None:
+        max_en = MAX_EN_CHARS
+    
+    # 按句末标点分割
+    sentences = split_by_punctuation(text)
+    lines = []
+    
+    for sentence in sentences:
+        clean = strip_punctuation(sentence)
+        if not clean:
+            continue
+        
+        max_len = max_cn if is_chinese_text(clean) else max_en
+        
+        if len(clean) <= max_len:
+            lines.append(clean)
+        else:
+            # 超长句子按逗号等处断开
+            lines.extend(wrap_text_by_punctuation(sentence, max_len))
+    
+    return [line for line in lines if line]
+
+
+def clamp_duration(start, end, min_s, max_s):
+    duration = max(0.0, end - start)
+    if duration < min_s:
+        end = start + min_s
+    elif duration > max_s:
+        end = start + max_s
+    return start, end
+
+
+def parse_timecode(tc):
+    # Format: HH:MM:SS,mmm
+    hms, ms = tc.split(",")
+    h, m, s = hms.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
+
+
+def format_timecode(seconds):
+    if seconds < 0:
+        seconds = 0
+    h = int(seconds // 3600)
+    m = int((seconds % 3600) // 60)
+    s = int(seconds % 60)
+    ms = int(round((seconds - int(seconds)) * 1000))
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def save_segments_srt(segments, path):
+    """把原始分段 [[start, duration, text], ...] 写成 SRT（未后处理）"""
+    blocks = []
+    for idx, (start, duration, text) in enumerate(segments, 1):
+        time_line = f"{format_timecode(start)} --> {format_timecode(start + duration)}"
+        blocks.append("\n".join([str(idx), time_line, text]))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(blocks))
+
+
+def split_times(start, end, count, min_s, max_s):
+    if count <= 0:
+        return []
+    total = max(0.0, end - start)
+    min_total = min_s * count
+    max_total = max_s * count
+    if total < min_total:
+        total = min_total
+    elif total > max_total:
+        total = max_total
+    duration = total / count
+    duration = max(min_s, min(max_s, duration))
+
+    times = []
+    current = start
+    for _ in range(count):
+        seg_start = current
+        seg_end = seg_start + duration
+        times.append((seg_start, seg_end))
+        current = seg_end
+    return times
+
+
+def postprocess_srt(path, max_cn=None, max_en=None, min_s=None, max_s=None):
+    """后处理 SRT 文件：文本分割、时长控制、阅读速度检查、时间轴校验"""
+    if max_cn is None:
+        max_cn = MAX_CN_CHARS
+    if max_en is None:
+        max_en = MAX_EN_CHARS
+    if min_s is None:
+        min_s = MIN_DURATION
+    if max_s is None:
+        max_s = MAX_DURATION
+    
+    if not os.path.isfile(path):
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        raw = f.read().strip()
+    if not raw:
+        return
+
+    blocks = raw.split("\n\n")
+    raw_subtitles = []  # [(start, end, text), ...]
+    
+    # 第一轮：解析原始字幕
+    for block in blocks:
+        lines = block.splitlines()
+        if len(lines) < 3:
+            continue
+        time_line = lines[1]
+        text = " ".join(lines[2:]).strip()
+        
+        if " --> " not in time_line:
+            continue
+        
+        start_tc, end_tc = time_line.split(" --> ")
+        start = parse_timecode(start_tc)
+        end = parse_timecode(end_tc)
+        
+        # 清理文本（去标点）
+        clean_text = strip_punctuation(text)
+        if clean_text:
+            raw_subtitles.append([start, end, clean_text])
+    
+    # 第二轮：合并相邻短句（关键步骤！）
+    # 如果两条字幕间隔很小（<200ms）且合并后不超过字符限制，就合并它们
+    MERGE_GAP_THRESHOLD = 0.2  # 200ms
+    merged_subtitles = []
+    
+    for start, end, text in raw_subtitles:
+        if not merged_subtitles:
+            merged_subtitles.append([start, end, text])
+            continue
+        
+        prev_start, prev_end, prev_text = merged_subtitles[-1]
+        gap = start - prev_end
+        combined_text = prev_text + text
+        max_chars = get_max_chars(combined_text)
+        
+        # 合并条件：间隔小、合并后不超限
+        if gap < MERGE_GAP_THRESHOLD and len(combined_text) <= max_chars:
+            # 合并
+            merged_subtitles[-1] = [prev_start, end, combined_text]
+        else:
+            merged_subtitles.append([start, end, text])
+    
+    # 第三轮：智能断句（对合并后仍超长的进行分割）
+    subtitles = []
+    for start, end, text in merged_subtitles:
+        max_chars = get_max_chars(text)
+        
+        if len(text) <= max_chars:
+            subtitles.append([start, end, text])
+        else:
+            # 需要分割
+            new_texts = smart_split_chinese(text, max_chars) if is_chinese_text(text) else [text]
+            if not new_texts:
+                new_texts = [text]
+            
+            # 分配时间
+            for (seg_start, seg_end), seg_text in zip(
+                split_times(start, end, len(new_texts), min_s, max_s),
+                new_texts,
+            ):
+                subtitles.append([seg_start, seg_end, seg_text])
+    
+    # 第二轮：检查阅读速度，必要时延长时间或拆分
+    adjusted_subtitles = []
+    for i, (start, end, text) in enumerate(subtitles):
+        duration = end - start
+        max_cps = get_max_cps(text)
+        cps = calculate_reading_speed(text, duration)
+        
+        if cps > max_cps:
+            # 阅读速度超限，计算需要的最小时长
+            char_count = calculate_char_count(text)
+            needed_duration = char_count / max_cps
+            
+            # 尝试延长 end（检查与下一条字幕的空隙）
+            next_start = subtitles[i + 1][0] if i + 1 < len(subtitles) else float('inf')
+            available_end = next_start - MIN_GAP
+            
+            if start + needed_duration <= available_end:
+                # 可以延长
+                end = start + needed_duration
+            elif start + needed_duration <= next_start:
+                # 可以延长但会压缩间隙
+                end = min(start + needed_duration, next_start - MIN_GAP)
+            
+            # 如果仍然超限，保持原样（已尽力）
+        
+        # 应用时长限制
+        start, end = clamp_duration(start, end, min_s, max_s)
+        adjusted_subtitles.append([start, end, text])
+    
+    # 第三轮：修复重叠和间隙
+    final_subtitles = fix_overlaps_and_gaps(adjusted_subtitles)
+    
+    # 输出
+    out_blocks = []
+    for idx, (start, end, text) in enumerate(final_subtitles, 1):
+        time_line = f"{format_timecode(start)} --> {format_timecode(end)}"
+        out_blocks.append("\n".join([str(idx), time_line, text]))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(out_blocks))
+
+
+def fix_overlaps_and_gaps(subtitles):
+    """修复字幕时间轴的重叠和间隙问题"""
+    if not subtitles:
+        return subtitles
+    
+    result = []
+    for i, (start, end, text) in enumerate(subtitles):
+        if i == 0:
+            result.append([start, end, text])
+            continue
+        
+        prev_end = result[-1][1]
+        
+        # 检查重叠
+        if start < prev_end:
+            # 有重叠，调整当前字幕的开始时间或前一条的结束时间
+            # 策略：缩短前一条的结束时间，确保有最小间隙
+            new_prev_end = start - MIN_GAP
+            if new_prev_end > result[-1][0] + MIN_DURATION:
+                result[-1][1] = new_prev_end
+            else:
+                # 无法调整前一条，调整当前开始
+                start = prev_end + MIN_GAP
+        
+        # 检查间隙
+        gap = start - result[-1][1]
+        if gap < MIN_GAP and gap >= 0:
+            # 间隙太小，微调
+            start = result[-1][1] + MIN_GAP
+        elif gap > MAX_GAP:
+            # 间隙太大，可以接受（不强制调整）
+            pass
+        
+        result.append([start, end, text])
+    
+    return result
+
+
+class LiveCueFilter:
+    """
+    postprocess_srt 的低延迟版本，用于实时字幕
+    每条字幕到达后立即处理并输出，不等待后续字幕：
+    去标点、超长断句、阅读速度与时长限制照常执行；
+    不做相邻短句合并，重叠只通过推后当前字幕的开始时间解决（已输出的字幕不再修改）
+    """
+
+    def __init__(self, min_s=None, max_s=None):
+        self.min_s = MIN_DURATION if min_s is None else min_s
+        self.max_s = MAX_DURATION if max_s is None else max_s
+        self.prev_end = None
+
+    def process(self, start, end, text):
+        """返回可立即输出的 [[start, end, text], ...]"""
+        clean = strip_punctuation(text).strip()
+        if not clean:
+            return []
+
+        max_chars = get_max_chars(clean)
+        texts = [clean]
+        if len(clean) > max_chars and is_chinese_text(clean):
+            texts = smart_split_chinese(clean, max_chars) or [clean]
+        times = [(start, end)] if len(texts) == 1 else split_times(start, end, len(texts), self.min_s, self.max_s)
+
+        result = []
+        for (seg_start, seg_end), seg_text in zip(times, texts):
+            needed = calculate_char_count(seg_text) / get_max_cps(seg_text)
+            if seg_end - seg_start < needed:
+                seg_end = seg_start + needed
+            if self.prev_end is not None and seg_start < self.prev_end + MIN_GAP:
+                seg_start = self.prev_end + MIN_GAP
+            seg_start, seg_end = clamp_duration(seg_start, seg_end, self.min_s, self.max_s)
+            self.prev_end = seg_end
+            result.append([seg_start, seg_end, seg_text])
+        return result
@@ -0,0 +1,124 @@
+"""
+cache.TranscriptCache 的测试：存取、按最近使用时间淘汰、模型/脚本/参数变化后键随之变化
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TranscriptCache, sha256_file  # noqa: E402
+
+SEGMENTS = [[0.0, 1.5, "第一句"], [2.0, 1.0, "second", [["sec", 0.0], ["ond", 0.4]]]]
+
+
+class TranscriptCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="srt-cache-")
+        self.root = os.path.join(self.tmp, "cache")
+        self.media = self.write("a.wav", b"media" * 1000)
+        self.model = self.write("model.onnx", b"model-v1")
+        self.script = self.write("generate-subtitles.py", b"print('v1')")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, name, data, mtime=None):
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def key(self, cache, params=("--num-threads={num_threads}",)):
+        return cache.make_key(self.media, [self.model, self.script], list(params))
+
+    def test_put_get(self):
+        cache = TranscriptCache(self.root, 1 << 20)
+        key = self.key(cache)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, SEGMENTS)
+        self.assertEqual(cache.get(key), SEGMENTS)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # 新实例（下次启动）读到同样的结果
+        self.assertEqual(TranscriptCache(self.root, 1 << 20).get(key), SEGMENTS)
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = TranscriptCache(self.root, 1 << 20)
+        key = self.key(cache)
+        cache.put(key, SEGMENTS)
+        with open(cache._entry_path(key), "w", encoding="utf-8") as f:
+            f.write("[[0.0, 1.5, ")
+        self.assertIsNone(cache.get(key))
+
+    def test_key_changes_with_inputs(self):
+        cache = TranscriptCache(self.root, 1 << 20)
+        key = self.key(cache)
+        self.assertEqual(self.key(cache), key)
+        self.assertNotEqual(self.key(cache, ["--decoding-method=modified_beam_search"]), key)
+
+        # 模型或识别脚本内容变化后（大小、修改时间随之变化），旧结果不再命中
+        cache.put(key, SEGMENTS)
+        self.write("model.onnx", b"model-v2", mtime=time.time() + 10)
+        model_key = self.key(cache)
+        self.assertNotEqual(model_key, key)
+        self.assertIsNone(cache.get(model_key))
+
+        self.write("generate-subtitles.py", b"print('v2')", mtime=time.time() + 20)
+        script_key = self.key(cache)
+        self.assertNotIn(script_key, (key, model_key))
+
+        # 改回原内容，键也回到原来的值
+        self.write("model.onnx", b"model-v1", mtime=time.time() + 30)
+        self.write("generate-subtitles.py", b"print('v1')", mtime=time.time() + 40)
+        self.assertEqual(self.key(cache), key)
+        self.assertEqual(cache.get(key), SEGMENTS)
+
+    def test_digest_memo(self):
+        cache = TranscriptCache(self.root, 1 << 20)
+        digest = cache.file_digest(self.media)
+        self.assertEqual(digest, sha256_file(self.media))
+        # 记忆按 (大小, 修改时间) 生效，重启后仍然有效
+        self.assertEqual(TranscriptCache(self.root, 1 << 20)._digests[os.path.abspath(self.media)][2], digest)
+
+    def test_known_media_digest(self):
+        cache = TranscriptCache(self.root, 1 << 20)
+        digest = sha256_file(self.media)
+        missing = os.path.join(self.tmp, "uploaded.wav")
+        key = cache.make_key(missing, [self.model, self.script], [], media_digest=digest)
+        # 已知哈希的路径不会记入 digests.json
+        self.assertNotIn(os.path.abspath(missing), TranscriptCache(self.root, 1 << 20)._digests)
+        self.assertEqual(key, cache.make_key(self.media, [self.model, self.script], []))
+
+    def test_lru_eviction(self):
+        probe = TranscriptCache(os.path.join(self.tmp, "probe"), 1 << 20)
+        probe.put("00" * 32, SEGMENTS)
+        entry_size = os.path.getsize(probe._entry_path("00" * 32))
+
+        # 容量刚好放下 3 条
+        cache = TranscriptCache(self.root, entry_size * 3)
+        keys = [f"{i:02x}" * 32 for i in range(1, 5)]
+        now = time.time()
+        for i, key in enumerate(keys[:3]):
+            cache.put(key, SEGMENTS)
+            os.utime(cache._entry_path(key), (now - 100 + i, now - 100 + i))
+        # 访问最旧的一条，它变成最近使用
+        self.assertEqual(cache.get(keys[0]), SEGMENTS)
+        cache.put(keys[3], SEGMENTS)
+
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(keys[1]))
+        for key in (keys[0], keys[2], keys[3]):
+            self.assertEqual(cache.get(key), SEGMENTS)
+        self.assertIn("淘汰 1", cache.stats_line())
+        self.assertIn("3 条", cache.stats_line())
+
+
+if __name__ == "__main__":
+    unittest.main()
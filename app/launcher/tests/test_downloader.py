@@ -0,0 +1,196 @@
+"""
+downloader 的本地测试：在 127.0.0.1 上启动支持 Range 的 http.server，
+覆盖分段下载与合并、中断后续传、SHA-256 校验、不支持 Range 时的回退和压缩包流式解压
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader import DownloadError, Downloader  # noqa: E402
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """按路径返回 server.files 中的内容；路径带 ?norange 时忽略 Range 请求头"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        data = self.server.files.get(path)
+        if data is None:
+            self.send_error(404)
+            return
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match and query != "norange":
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            start, end = 0, len(data) - 1
+            self.send_response(200)
+        body = data[start:end + 1]
+        with self.server.lock:
+            self.server.sent += len(body)
+            self.server.requests.append((path, self.headers.get("Range")))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+
+def make_tar(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:bz2") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class DownloaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = os.urandom(3 * 1024 * 1024 + 123)
+        cls.model = os.urandom(256 * 1024)
+        cls.tokens = "你\n好\n".encode("utf-8") * 100
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        cls.server.files = {
+            "/model.onnx": cls.data,
+            "/model.tar.bz2": make_tar({"m/tokens.txt": cls.tokens, "m/model.onnx": cls.model, "m/README": b"x"}),
+        }
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="srt-dl-")
+        self.server.sent = 0
+        self.server.requests = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def dest(self, name="model.onnx"):
+        return os.path.join(self.tmp, name)
+
+    def test_segments_are_merged(self):
+        dest = self.dest()
+        Downloader(segments=4, chunk_size=64 * 1024).download_file(self.base + "/model.onnx", dest)
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        ranges = [r for path, r in self.server.requests if r != "bytes=0-0"]
+        self.assertEqual(len(ranges), 4)
+        self.assertFalse(os.path.exists(dest + ".part"))
+        self.assertFalse(os.path.exists(dest + ".part.json"))
+
+    def test_resume_after_stop(self):
+        dest = self.dest()
+        stop = threading.Event()
+
+        def on_progress(name, done, total):
+            if done >= total // 3:
+                stop.set()
+
+        first = Downloader(segments=4, chunk_size=32 * 1024, on_progress=on_progress, stop_event=stop)
+        with self.assertRaises(DownloadError):
+            first.download_file(self.base + "/model.onnx", dest)
+        self.assertFalse(os.path.exists(dest))
+        with open(dest + ".part.json", "r", encoding="utf-8") as f:
+            saved = sum(seg[2] for seg in json.load(f)["segments"])
+        self.assertGreater(saved, 0)
+        sent_before = self.server.sent
+
+        Downloader(segments=4, chunk_size=32 * 1024).download_file(self.base + "/model.onnx", dest)
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        # 续传只请求各段剩余的部分（另有 1 字节的探测请求）
+        self.assertEqual(self.server.sent - sent_before - 1, len(self.data) - saved)
+
+    def test_corrupt_resume_state(self):
+        # 损坏或结构不对的 .part.json 当作没有，从头下载
+        url = self.base + "/model.onnx"
+        size = len(self.data)
+        bad_states = [
+            b"{not json",
+            b"[1, 2, 3]",
+            json.dumps({"url": url, "size": size, "etag": None, "segments": "x"}).encode(),
+            json.dumps({"url": url, "size": size, "etag": None, "segments": [[0, size - 1]]}).encode(),
+            json.dumps({"url": url, "size": size, "etag": None, "segments": [[0, size * 2, 0]]}).encode(),
+        ]
+        for raw in bad_states:
+            with self.subTest(raw=raw[:40]):
+                dest = self.dest()
+                with open(dest + ".part", "wb") as f:
+                    f.write(b"\0" * size)
+                with open(dest + ".part.json", "wb") as f:
+                    f.write(raw)
+                Downloader(segments=4).download_file(url, dest)
+                with open(dest, "rb") as f:
+                    self.assertEqual(f.read(), self.data)
+                os.remove(dest)
+
+    def test_sha256(self):
+        dest = self.dest()
+        good = hashlib.sha256(self.data).hexdigest()
+        Downloader().download_file(self.base + "/model.onnx", dest, sha256=good.upper())
+        self.assertTrue(os.path.isfile(dest))
+
+        other = self.dest("other.onnx")
+        with self.assertRaises(DownloadError):
+            Downloader().download_file(self.base + "/model.onnx", other, sha256="0" * 64)
+        self.assertFalse(os.path.exists(other))
+        self.assertFalse(os.path.exists(other + ".part"))
+        self.assertFalse(os.path.exists(other + ".part.json"))
+
+    def test_without_range_support(self):
+        dest = self.dest()
+        Downloader(segments=4).download_file(self.base + "/model.onnx?norange", dest)
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(os.path.exists(dest + ".part.json"))
+
+    def test_archive_members(self):
+        members = {"tokens.txt": self.dest("tokens.txt"), "model.onnx": self.dest("model.int8.onnx")}
+        url = self.base + "/model.tar.bz2"
+        digest = hashlib.sha256(self.server.files["/model.tar.bz2"]).hexdigest()
+        done = Downloader().download_archive(url, members, sha256=digest)
+        self.assertEqual(sorted(done), sorted(members.values()))
+        with open(members["tokens.txt"], "rb") as f:
+            self.assertEqual(f.read(), self.tokens)
+        with open(members["model.onnx"], "rb") as f:
+            self.assertEqual(f.read(), self.model)
+        self.assertEqual(os.listdir(self.tmp).count("README"), 0)
+
+    def test_archive_sha256_mismatch(self):
+        members = {"tokens.txt": self.dest("tokens.txt")}
+        with self.assertRaises(DownloadError):
+            Downloader().download_archive(self.base + "/model.tar.bz2", members, sha256="0" * 64)
+        self.assertEqual(os.listdir(self.tmp), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+manifest.JobManifest 的测试：中断后重新打开清单继续处理，文件变化、配置变化与文件消失时的判断
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manifest import STATUS_DONE, STATUS_FAILED, STATUS_RUNNING, JobManifest  # noqa: E402
+
+CONFIG = '["model", "--num-threads={num_threads}"]'
+
+
+class JobManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="srt-manifest-")
+        self.db = os.path.join(self.tmp, "manifest.sqlite")
+        self.files = [self.write(f"{name}.wav") for name in ("a", "b", "c", "d")]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, name, data=b"audio"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def open(self):
+        manifest = JobManifest(self.db)
+        self.addCleanup(manifest.close)
+        return manifest
+
+    def status(self, manifest, path):
+        row = manifest.conn.execute("SELECT status FROM jobs WHERE path = ?", (path,)).fetchone()
+        return row and row[0]
+
+    def finish(self, manifest, path):
+        output = self.write(os.path.basename(path) + ".srt", b"1\n00:00:00,000 --> 00:00:01,000\nx")
+        manifest.mark_running(path, CONFIG)
+        manifest.mark_done(path, CONFIG, output, rtf=0.1)
+        return output
+
+    def test_resume_after_interrupted_run(self):
+        a, b, c, d = self.files
+        first = JobManifest(self.db)
+        todo, stats = first.plan(self.files, CONFIG)
+        self.assertEqual(todo, self.files)
+        self.assertEqual(stats["new"], 4)
+
+        # a 完成，b 失败，c 正在处理时进程被杀（不再有任何更新），d 还没开始
+        self.finish(first, a)
+        first.mark_running(b, CONFIG)
+        first.mark_failed(b, CONFIG, "识别进程退出")
+        first.mark_running(c, CONFIG)
+        first.close()
+
+        second = self.open()
+        self.assertEqual(self.status(second, c), STATUS_RUNNING)
+        todo, stats = second.plan(self.files, CONFIG)
+        self.assertEqual(todo, [b, c, d])
+        self.assertEqual(stats, {"done": 1, "new": 1, "changed": 0, "retry": 2, "missing": 0})
+
+        for path in todo:
+            self.finish(second, path)
+        todo, stats = second.plan(self.files, CONFIG)
+        self.assertEqual(todo, [])
+        self.assertEqual(stats["done"], 4)
+
+    def test_cancelled_file_is_retried(self):
+        a = self.files[0]
+        manifest = self.open()
+        manifest.mark_running(a, CONFIG)
+        manifest.mark_pending(a, CONFIG)
+        todo, stats = manifest.plan([a], CONFIG)
+        self.assertEqual(todo, [a])
+        self.assertEqual(stats["retry"], 1)
+
+    def test_changes_are_redone(self):
+        a, b, c, _ = self.files
+        manifest = self.open()
+        outputs = [self.finish(manifest, path) for path in (a, b, c)]
+
+        # a 内容变了，b 的字幕被删除，c 不变
+        self.write("a.wav", b"longer audio")
+        os.utime(a, (time.time() + 10, time.time() + 10))
+        os.remove(outputs[1])
+        todo, stats = manifest.plan([a, b, c], CONFIG)
+        self.assertEqual(todo, [a, b])
+        self.assertEqual((stats["changed"], stats["retry"], stats["done"]), (1, 1, 1))
+
+        # 识别配置变了，全部重新处理
+        todo, stats = manifest.plan([a, b, c], CONFIG + "x")
+        self.assertEqual(todo, [a, b, c])
+        self.assertEqual(stats["changed"], 3)
+
+    def test_missing_files(self):
+        a, b, _, _ = self.files
+        manifest = self.open()
+        self.finish(manifest, a)
+        os.remove(a)
+        gone = os.path.join(self.tmp, "never-existed.wav")
+        todo, stats = manifest.plan([a, b, gone], CONFIG)
+        self.assertEqual(todo, [b])
+        self.assertEqual(stats["missing"], 2)
+        self.assertEqual(self.status(manifest, a), STATUS_FAILED)
+        self.assertEqual(self.status(manifest, gone), STATUS_FAILED)
+
+    def test_file_removed_while_processing(self):
+        a = self.files[0]
+        manifest = self.open()
+        manifest.mark_running(a, CONFIG)
+        os.remove(a)
+        output = self.write("a.srt")
+        # 没有大小和修改时间也能记录结果
+        manifest.mark_done(a, CONFIG, output)
+        self.assertEqual(self.status(manifest, a), STATUS_DONE)
+        # 文件放回原处后视为已变化，重新处理
+        self.write("a.wav")
+        todo, stats = manifest.plan([a], CONFIG)
+        self.assertEqual(todo, [a])
+        self.assertEqual(stats["changed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+progress 的测试：文件与整批的进度、预计剩余时间（用可控的时钟），以及 format_eta / render_bar
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress import ProgressTracker, format_eta, render_bar  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProgressTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracker = ProgressTracker([("a.wav", 100.0), ("b.wav", 50.0)], clock=self.clock)
+
+    def test_file_snapshot(self):
+        snap = self.tracker.update("a.wav", {"processed": 25.0, "duration": 100.0, "rtf": 0.2, "segments": 7})
+        self.assertEqual(snap["file"], "a.wav")
+        self.assertEqual(snap["fraction"], 0.25)
+        self.assertAlmostEqual(snap["eta"], 75.0 * 0.2)
+        self.assertEqual(snap["segments"], 7)
+        # 没有 RTF 时不估计
+        self.assertIsNone(self.tracker.update("a.wav", {"processed": 30.0})["eta"])
+
+    def test_unknown_duration_from_worker(self):
+        tracker = ProgressTracker([("c.wav", 0)], clock=self.clock)
+        self.assertEqual(tracker.update("c.wav", {"processed": 5.0})["fraction"], 0.0)
+        snap = tracker.update("c.wav", {"processed": 10.0, "duration": 40.0})
+        self.assertEqual(snap["fraction"], 0.25)
+        self.assertEqual(snap["batch_duration"], 40.0)
+
+    def test_batch_eta_uses_measured_speed(self):
+        tracker = self.tracker
+        snap = tracker.update("a.wav", {"processed": 0.0})
+        self.assertIsNone(snap["batch_eta"])
+        # 10 秒墙钟识别了 20 秒音频：速度 2x，剩余 130 秒音频需要 65 秒
+        self.clock.now += 10
+        snap = tracker.update("a.wav", {"processed": 20.0})
+        self.assertEqual(snap["batch_processed"], 20.0)
+        self.assertEqual(snap["batch_duration"], 150.0)
+        self.assertAlmostEqual(snap["batch_fraction"], 20.0 / 150.0)
+        self.assertAlmostEqual(snap["batch_eta"], 65.0)
+        self.assertEqual(snap["batch_elapsed"], 10.0)
+
+    def test_resumed_position_is_not_speed(self):
+        # 续跑的文件第一次报告就在 40 秒处：这 40 秒不是本次识别的，不计入速度
+        self.tracker.update("b.wav", {"processed": 40.0})
+        self.clock.now += 10
+        snap = self.tracker.update("b.wav", {"processed": 45.0})
+        self.assertEqual(self.tracker.transcribed, 5.0)
+        self.assertEqual(snap["batch_processed"], 45.0)
+        self.assertAlmostEqual(snap["batch_eta"], (150.0 - 45.0) / 0.5)
+
+    def test_finish(self):
+        self.tracker.update("a.wav", {"processed": 10.0})
+        snap = self.tracker.finish("a.wav")
+        self.assertEqual(snap["files_done"], 1)
+        self.assertEqual(snap["files_total"], 2)
+        self.assertEqual(snap["batch_processed"], 100.0)
+        # 处理位置超过已知时长时按时长计
+        self.tracker.update("b.wav", {"processed": 80.0})
+        snap = self.tracker.finish("b.wav")
+        self.assertEqual(snap["batch_processed"], 150.0)
+        self.assertEqual(snap["batch_fraction"], 1.0)
+        self.assertEqual(self.tracker.finish("unknown.wav")["files_done"], 2)
+
+    def test_parallel_updates(self):
+        paths = [f"{i}.wav" for i in range(8)]
+        tracker = ProgressTracker([(path, 100.0) for path in paths], clock=self.clock)
+
+        def run(path):
+            for step in range(101):
+                tracker.update(path, {"processed": float(step)})
+
+        threads = [threading.Thread(target=run, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tracker.transcribed, 800.0)
+        self.assertEqual(tracker.update(paths[0], {"processed": 100.0})["batch_fraction"], 1.0)
+
+
+class FormatTest(unittest.TestCase):
+    def test_format_eta(self):
+        self.assertEqual(format_eta(None), "--:--")
+        self.assertEqual(format_eta(-5), "00:00")
+        self.assertEqual(format_eta(59.6), "01:00")
+        self.assertEqual(format_eta(3725), "1:02:05")
+
+    def test_render_bar(self):
+        self.assertEqual(render_bar(0.5, width=4), "██░░")
+        self.assertEqual(render_bar(None, width=2), "░░")
+        self.assertEqual(render_bar(3, width=2), "██")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+server.FairQueue 的测试：客户端之间轮流出队、容量上限、取消与排队位置
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import FairQueue, Job, QueueFull  # noqa: E402
+
+
+def make_job(client, name):
+    return Job(client, name, tempfile.gettempdir())
+
+
+def drain(queue):
+    jobs = []
+    while queue.size:
+        jobs.append(queue.get())
+    return jobs
+
+
+class FairQueueTest(unittest.TestCase):
+    def test_round_robin(self):
+        queue = FairQueue(max_jobs=100, max_per_client=100)
+        # A 一次提交 10 个，B、C 随后各提交几个
+        for i in range(10):
+            queue.put(make_job("A", f"a{i}"))
+        for i in range(3):
+            queue.put(make_job("B", f"b{i}"))
+        for i in range(2):
+            queue.put(make_job("C", f"c{i}"))
+        names = [job.name for job in drain(queue)]
+        self.assertEqual(
+            names,
+            ["a0", "b0", "c0", "a1", "b1", "c1", "a2", "b2", "a3", "a4", "a5", "a6", "a7", "a8", "a9"],
+        )
+
+    def test_late_client_is_served_next_round(self):
+        queue = FairQueue(max_jobs=100, max_per_client=100)
+        for i in range(5):
+            queue.put(make_job("A", f"a{i}"))
+        self.assertEqual(queue.get().name, "a0")
+        queue.put(make_job("B", "b0"))
+        self.assertEqual([job.name for job in drain(queue)], ["a1", "b0", "a2", "a3", "a4"])
+
+    def test_fair_share_under_load(self):
+        # 每个客户端的任务在任意前缀中数量最多相差 1
+        queue = FairQueue(max_jobs=1000, max_per_client=1000)
+        for client, count in (("A", 50), ("B", 20), ("C", 20)):
+            for i in range(count):
+                queue.put(make_job(client, f"{client}{i}"))
+        served = {"A": 0, "B": 0, "C": 0}
+        for job in drain(queue)[:60]:
+            served[job.client] += 1
+            active = [n for c, n in served.items() if c == "A" or n < 20]
+            self.assertLessEqual(max(active) - min(active), 1)
+        self.assertEqual(served, {"A": 20, "B": 20, "C": 20})
+
+    def test_limits(self):
+        queue = FairQueue(max_jobs=3, max_per_client=2)
+        queue.put(make_job("A", "a0"))
+        queue.put(make_job("A", "a1"))
+        with self.assertRaises(QueueFull):
+            queue.put(make_job("A", "a2"))
+        queue.put(make_job("B", "b0"))
+        with self.assertRaises(QueueFull):
+            queue.put(make_job("C", "c0"))
+        # 被拒绝的客户端不会留下空队列
+        self.assertNotIn("C", queue.queues)
+        self.assertEqual(queue.size, 3)
+
+    def test_remove_and_position(self):
+        queue = FairQueue(max_jobs=100, max_per_client=100)
+        jobs = [make_job("A", f"a{i}") for i in range(4)] + [make_job("B", f"b{i}") for i in range(2)]
+        for job in jobs:
+            queue.put(job)
+        b1 = jobs[5]
+        self.assertEqual(queue.position(b1), 4)
+        self.assertTrue(queue.remove(jobs[0]))
+        self.assertFalse(queue.remove(jobs[0]))
+        self.assertEqual(queue.position(b1), 4)
+        self.assertTrue(queue.remove(jobs[4]))
+        self.assertEqual(queue.position(b1), 2)
+        self.assertTrue(queue.remove(b1))
+        self.assertNotIn("B", queue.queues)
+        self.assertIsNone(queue.position(b1))
+        self.assertEqual([job.name for job in drain(queue)], ["a1", "a2", "a3"])
+
+    def test_position_matches_dequeue_order(self):
+        queue = FairQueue(max_jobs=100, max_per_client=100)
+        jobs = []
+        for client, count in (("A", 6), ("B", 2), ("C", 4)):
+            for i in range(count):
+                job = make_job(client, f"{client}{i}")
+                queue.put(job)
+                jobs.append(job)
+        # 先出队一个，让客户端顺序轮转起来
+        queue.get()
+        positions = {job.name: queue.position(job) for job in jobs[1:]}
+        order = [job.name for job in drain(queue)]
+        self.assertEqual(positions, {name: i + 1 for i, name in enumerate(order)})
+
+    def test_close_wakes_waiting_worker(self):
+        queue = FairQueue(max_jobs=10, max_per_client=10)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(queue.get()))
+        thread.start()
+        queue.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(result, [None])
+
+    def test_get_blocks_until_put(self):
+        queue = FairQueue(max_jobs=10, max_per_client=10)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(queue.get()))
+        thread.start()
+        job = make_job("A", "a0")
+        queue.put(job)
+        thread.join(5)
+        self.assertEqual(result, [job])
+
+
+if __name__ == "__main__":
+    unittest.main()
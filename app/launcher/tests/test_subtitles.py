@@ -0,0 +1,354 @@
+"""
+subtitles 的等价性测试：优化后的实现与 baseline_subtitles.py（优化前的原样代码）或
+逐位置暴力比较的结果必须完全一致，固定用例之外再跑一批随机用例
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+import baseline_subtitles as baseline  # noqa: E402
+import subtitles  # noqa: E402
+from subtitles import (  # noqa: E402
+    BreakPointIndex,
+    CueStore,
+    WordMatcher,
+    find_best_break_point,
+    postprocess_cues,
+    save_segments_srt,
+    smart_split_chinese,
+    split_times,
+    split_times_by_tokens,
+    token_char_times,
+)
+
+# 随机文本的素材：词表里的词、它们的片段和普通汉字混在一起，保证经常出现重叠和跨越
+PIECES = sorted(subtitles.PROTECTED_WORDS | subtitles.BREAK_AFTER_WORDS) + [
+    "浏览", "览器", "价值", "高价", "服务", "务器", "就", "是", "所", "以",
+    "我们", "今天", "讲", "一下", "怎么", "这个", "其实", "很", "简单", "。", "，", " ", "ab",
+]
+# 随机 SRT 的句子：中英混合，带各种标点
+PHRASES = [
+    "首先我们需要打开浏览器", "然后登录你的账号", "注意保护隐私和密码安全！",
+    "这个功能可以帮助你处理视频文件", "所以建议定期检查系统设置，", "（可选）",
+    "如果下载失败的话请重新安装软件。", "今天的内容就是这些了", "《使用说明》：",
+    "Open the settings page", "and check the network configuration.",
+    "This step is optional,", "but we recommend it!", "\"quoted\" [x] {y} <z>", "...",
+]
+RANDOM_CASES = 300
+
+
+def random_text(rng, min_pieces=1, max_pieces=20):
+    return "".join(rng.choice(PIECES) for _ in range(rng.randint(min_pieces, max_pieces)))
+
+
+def random_srt(rng, count):
+    """count 条随机字幕：时长 0.05~7 秒，间隔 0~0.4 秒（覆盖合并、拆分、延长等各个分支）"""
+    blocks = []
+    t = rng.uniform(0, 3)
+    for idx in range(1, count + 1):
+        text = "".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 5)))
+        duration = rng.uniform(0.05, 7.0)
+        start = subtitles.format_timecode(t)
+        end = subtitles.format_timecode(t + duration)
+        blocks.append(f"{idx}\n{start} --> {end}\n{text}")
+        t += duration + rng.uniform(0.0, 0.4)
+    return "\n\n".join(blocks)
+
+
+def setUpModule():
+    # 只用内置词表，避免 app/dicts 下的用户词典让两边的词表不一致
+    global EMPTY_DICT_DIR
+    EMPTY_DICT_DIR = tempfile.mkdtemp(prefix="srt-dict-")
+    subtitles.load_user_dictionaries(EMPTY_DICT_DIR)
+
+
+def tearDownModule():
+    shutil.rmtree(EMPTY_DICT_DIR, ignore_errors=True)
+    subtitles.load_user_dictionaries()
+
+
+def brute_force_matches(words, text):
+    return sorted(
+        (i, word)
+        for word in set(words) if word
+        for i in range(len(text) - len(word) + 1)
+        if text.startswith(word, i)
+    )
+
+
+class WordMatcherTest(unittest.TestCase):
+    def check(self, words, text):
+        self.assertEqual(sorted(WordMatcher(words).finditer(text)), brute_force_matches(words, text), (words, text))
+
+    def test_fixed(self):
+        self.check(["he", "she", "his", "hers"], "ahishers")
+        self.check(["a", "aa", "aaa"], "aaaa")
+        self.check(["浏览器", "浏览", "览器", "器"], "用浏览器浏览")
+        self.check(["服务器"], "服务服务器务器")
+        self.check([], "任何文本")
+        self.check(["", "词"], "一个词")
+        self.check(["词"], "")
+
+    def test_random(self):
+        rng = random.Random(14)
+        alphabet = "abc服务器"
+        for _ in range(RANDOM_CASES):
+            words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            self.check(words, text)
+
+
+class BreakPointTest(unittest.TestCase):
+    def test_fixed(self):
+        cases = [
+            ("我们使用浏览器登录账号然后修改密码就是这样", 8),
+            ("高价值账户的安全问题所以需要注意", 5),
+            ("服务器服务器服务器服务器", 4),
+            ("的了吧呢啊哦", 3),
+            ("短", 0),
+            ("短文本", 10),
+        ]
+        for text, target in cases:
+            for window in (0, 2, 5):
+                with self.subTest(text=text, target=target, window=window):
+                    self.assertEqual(
+                        find_best_break_point(text, target, window),
+                        baseline.find_best_break_point(text, target, window),
+                    )
+
+    def test_random(self):
+        rng = random.Random(1014)
+        for _ in range(RANDOM_CASES):
+            text = random_text(rng)
+            target = rng.randint(0, len(text) + 2)
+            window = rng.randint(0, 6)
+            self.assertEqual(
+                find_best_break_point(text, target, window),
+                baseline.find_best_break_point(text, target, window),
+                (text, target, window),
+            )
+
+    def test_shared_index_matches_slice(self):
+        # smart_split_chinese 对整段文本只建一次索引，按 offset 查后面的部分；
+        # 结果必须和对切片单独计算相同（跨越切片起点的词不算）
+        rng = random.Random(2014)
+        for _ in range(RANDOM_CASES):
+            text = random_text(rng, 2, 30)
+            index = BreakPointIndex(text)
+            offset = rng.randint(0, len(text) - 1)
+            target = rng.randint(1, 20)
+            self.assertEqual(
+                find_best_break_point(text[offset:], target, index=index, offset=offset),
+                baseline.find_best_break_point(text[offset:], target),
+                (text, offset, target),
+            )
+
+    def test_smart_split(self):
+        rng = random.Random(3014)
+        for _ in range(RANDOM_CASES):
+            text = random_text(rng, 1, 40)
+            max_len = rng.randint(1, 20)
+            self.assertEqual(
+                smart_split_chinese(text, max_len),
+                baseline.smart_split_chinese(text, max_len),
+                (text, max_len),
+            )
+
+    def test_user_dictionary(self):
+        tmp = tempfile.mkdtemp(prefix="srt-dict-")
+        try:
+            with open(os.path.join(tmp, "protected_words.txt"), "w", encoding="utf-8") as f:
+                f.write("# 注释\n字幕生成\n\n语音识别  # 行尾注释\n")
+            self.assertEqual(smart_split_chinese("这是字幕生成工具", 4), ["这是字幕", "生成工具"])
+            subtitles.load_user_dictionaries(tmp)
+            self.assertEqual(smart_split_chinese("这是字幕生成工具", 4), ["这是", "字幕生成", "工具"])
+        finally:
+            subtitles.load_user_dictionaries(EMPTY_DICT_DIR)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TextAnalysisTest(unittest.TestCase):
+    def test_helpers_match_baseline(self):
+        rng = random.Random(15)
+        texts = ["", " ", "，。", "abc def", "中文 English 混合", "a。b，c！"]
+        texts += ["".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 4))) for _ in range(RANDOM_CASES)]
+        for text in texts:
+            for name in ("strip_punctuation", "is_chinese_text", "calculate_char_count", "get_max_cps", "get_max_chars"):
+                self.assertEqual(getattr(subtitles, name)(text), getattr(baseline, name)(text), (name, text))
+            for duration in (0, -1, 0.5, 3.0):
+                self.assertEqual(
+                    subtitles.calculate_reading_speed(text, duration),
+                    baseline.calculate_reading_speed(text, duration),
+                    (text, duration),
+                )
+
+    def test_postprocess_srt_matches_baseline(self):
+        tmp = tempfile.mkdtemp(prefix="srt-pp-")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        old_path = os.path.join(tmp, "old.srt")
+        new_path = os.path.join(tmp, "new.srt")
+        rng = random.Random(115)
+        # 旧版 format_timecode 在毫秒进位时会写出 ",1000"（已修正），比较时两边统一用新版
+        with mock.patch.object(baseline, "format_timecode", subtitles.format_timecode):
+            for case in range(100):
+                content = random_srt(rng, rng.randint(1, 40))
+                for path in (old_path, new_path):
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(content)
+                baseline.postprocess_srt(old_path)
+                subtitles.postprocess_srt(new_path)
+                with open(old_path, encoding="utf-8") as f_old, open(new_path, encoding="utf-8") as f_new:
+                    self.assertEqual(f_new.read(), f_old.read(), f"case {case}")
+
+
+class CueStoreTest(unittest.TestCase):
+    SRT = (
+        "1\n00:00:01,000 --> 00:00:02,500\n第一行\n第二行\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nsecond\n \t\n"
+        "3\nnot a timecode\nskipped\n\n"
+        "4\n00:00:xx,000 --> 00:00:05,000\nbad time\n\n"
+        "5\n01:02:03.4 --> 01:02:04\nthird"
+    )
+    EXPECTED = [(1.0, 2.5, "第一行 第二行"), (3.0, 4.0, "second"), (3723.4, 3724.0, "third")]
+
+    def test_parse_line_endings(self):
+        for newline in ("\n", "\r\n", "\r"):
+            with self.subTest(newline=repr(newline)):
+                cues = CueStore.parse_srt(self.SRT.replace("\n", newline))
+                self.assertEqual(list(cues), self.EXPECTED)
+
+    def test_read_srt_bom_crlf(self):
+        tmp = tempfile.mkdtemp(prefix="srt-cue-")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, "a.srt")
+        with open(path, "wb") as f:
+            f.write("\ufeff".encode("utf-8") + self.SRT.replace("\n", "\r\n").encode("utf-8"))
+        self.assertEqual(list(CueStore.read_srt(path)), self.EXPECTED)
+
+    def test_crlf_postprocess_matches_lf(self):
+        rng = random.Random(16)
+        for _ in range(20):
+            content = random_srt(rng, rng.randint(1, 30))
+            lf = postprocess_cues(CueStore.parse_srt(content)).to_srt()
+            crlf = postprocess_cues(CueStore.parse_srt(content.replace("\n", "\r\n"))).to_srt()
+            self.assertEqual(crlf, lf)
+
+    def test_round_trip(self):
+        rng = random.Random(116)
+        cues = CueStore()
+        t = 0.0
+        for _ in range(200):
+            start = round(t, 3)
+            end = round(t + rng.uniform(0.001, 5), 3)
+            cues.append(start, end, rng.choice(PHRASES))
+            t = end + rng.uniform(0, 1)
+        parsed = CueStore.parse_srt(cues.to_srt())
+        self.assertEqual(len(parsed), len(cues))
+        for (start, end, text), (p_start, p_end, p_text) in zip(cues, parsed):
+            self.assertAlmostEqual(p_start, start, places=6)
+            self.assertAlmostEqual(p_end, end, places=6)
+            self.assertEqual(p_text, text)
+
+    def test_timecode_carry(self):
+        self.assertEqual(subtitles.format_timecode(59.9996), "00:01:00,000")
+        self.assertEqual(subtitles.format_timecode(3599.9999, "."), "01:00:00.000")
+        self.assertEqual(subtitles.format_timecode(-1), "00:00:00,000")
+
+    def test_in_memory_matches_file(self):
+        # 识别结果直接进 CueStore 后处理，与写成 SRT 再 postprocess_srt 的结果一致
+        tmp = tempfile.mkdtemp(prefix="srt-cue-")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, "a.srt")
+        rng = random.Random(216)
+        for case in range(50):
+            segments = []
+            t = 0.0
+            for _ in range(rng.randint(1, 40)):
+                # SRT 只保存到毫秒，分段时间也取到毫秒
+                duration = round(rng.uniform(0.05, 7.0), 3)
+                segments.append([round(t, 3), duration, "".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 4)))])
+                t += duration + rng.uniform(0, 0.4)
+            save_segments_srt(segments, path)
+            subtitles.postprocess_srt(path)
+            from_file = CueStore.read_srt(path)
+            in_memory = CueStore.parse_srt(postprocess_cues(CueStore.from_segments(segments)).to_srt())
+            self.assertEqual(len(in_memory), len(from_file), f"case {case}")
+            for (start, end, text), (f_start, f_end, f_text) in zip(in_memory, from_file):
+                self.assertEqual(text, f_text, f"case {case}")
+                # start + duration 与读回的毫秒时间只差浮点舍入，写出后最多相差 1 毫秒
+                self.assertAlmostEqual(start, f_start, delta=0.0015)
+                self.assertAlmostEqual(end, f_end, delta=0.0015)
+
+
+class TokenTimesTest(unittest.TestCase):
+    def test_char_tokens(self):
+        rng = random.Random(18)
+        for _ in range(50):
+            text = "".join(rng.choice("我们今天讲一下怎么使用浏览器") for _ in range(rng.randint(1, 30)))
+            offsets = sorted(rng.uniform(0, 10) for _ in text)
+            tokens = [[ch, offset] for ch, offset in zip(text, offsets)]
+            self.assertEqual(token_char_times(text, 5.0, tokens), [5.0 + offset for offset in offsets])
+
+    def test_bpe_and_sentencepiece(self):
+        tokens = [["\u2581hel", 0.0], ["lo", 0.2], ["wor@@", 0.5], ["ld", 0.7]]
+        # 空格取后一个字符的时间
+        self.assertEqual(
+            token_char_times("hello world", 1.0, tokens),
+            [1.0, 1.0, 1.0, 1.2, 1.2, 1.5, 1.5, 1.5, 1.5, 1.7, 1.7],
+        )
+        self.assertEqual(token_char_times("Hello", 0.0, [["HEL", 0.0], ["LO", 0.3]]), [0.0, 0.0, 0.0, 0.3, 0.3])
+
+    def test_unmatched_tokens(self):
+        # 已去掉的标点 token 直接跳过
+        self.assertEqual(
+            token_char_times("你好世界", 0.0, [["你", 0.0], ["好", 0.1], ["，", 0.2], ["世", 0.3], ["界", 0.4]]),
+            [0.0, 0.1, 0.3, 0.4],
+        )
+        # 对上的字符不到一半时放弃
+        self.assertIsNone(token_char_times("abcdefgh", 0.0, [["x", 0.0], ["y", 0.1], ["gh", 0.2]]))
+        self.assertIsNone(token_char_times("好" * 10, 0.0, [["好", 0.0]]))
+        # 不会越过太多字符对到后面的重复字上
+        self.assertIsNone(token_char_times("一二三四五六七八九十", 0.0, [["十", 0.0]]))
+        self.assertIsNone(token_char_times("abc", 0.0, None))
+        self.assertIsNone(token_char_times("", 0.0, [["a", 0.0]]))
+
+    def test_split_times_by_tokens(self):
+        pieces = ["一二三", "四五", "六"]
+        char_times = [0.0, 0.1, 0.2, 1.0, 1.1, 3.0]
+        self.assertEqual(split_times_by_tokens(0.0, 4.0, pieces, char_times, 0.8, 4.2), [(0.0, 1.0), (1.0, 3.0), (3.0, 4.0)])
+        # 没有时间戳或时间不单调时退回按时长平均分配
+        self.assertEqual(split_times_by_tokens(0.0, 4.0, pieces, None, 0.8, 4.2), split_times(0.0, 4.0, 3, 0.8, 4.2))
+        backwards = [0.0, 0.1, 0.2, 5.0, 5.1, 0.3]
+        self.assertEqual(
+            split_times_by_tokens(0.0, 4.0, pieces, backwards, 0.8, 4.2),
+            split_times(0.0, 4.0, 3, 0.8, 4.2),
+        )
+
+    def test_postprocess_splits_on_token_times(self):
+        text = "我们今天讲一下怎么使用浏览器登录账号然后修改密码就是这样简单"
+        # 前 20 个字在 2 秒内说完，停顿 4 秒后才说后面的字
+        tokens = [[ch, i * 0.1 if i < 20 else 4.0 + i * 0.1] for i, ch in enumerate(text)]
+        cues = CueStore()
+        cues.append(10.0, 16.0, text, tokens)
+        result = list(postprocess_cues(cues))
+        self.assertEqual([cue[2] for cue in result], [text[:20], text[20:]])
+        self.assertAlmostEqual(result[1][0], 16.0)
+
+        # 同样的字幕没有时间戳：按时长平均分配
+        cues = CueStore()
+        cues.append(10.0, 16.0, text)
+        self.assertEqual([cue[:2] for cue in postprocess_cues(cues)], [(10.0, 13.0), (13.05, 16.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+writers 的测试：各格式的渲染结果、SRT 与 CueStore.to_srt 一致、parse_formats 与写文件
+
+    python -m unittest discover -s app/launcher/tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitles import CueStore  # noqa: E402
+from writers import WRITERS, format_ass_time, output_path, parse_formats, render, write_outputs  # noqa: E402
+
+
+def sample_cues():
+    cues = CueStore()
+    cues.append(0.0, 1.5, "第一句")
+    cues.append(61.2344, 3599.9996, "a < b & c > {d}")
+    cues.append(3725.5, 3727.25, "最后一句")
+    return cues
+
+
+class WritersTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="srt-writers-")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_srt_matches_cue_store(self):
+        cues = sample_cues()
+        self.assertEqual(render(cues, ["srt"])["srt"], cues.to_srt())
+
+    def test_vtt(self):
+        self.assertEqual(
+            render(sample_cues(), ["vtt"])["vtt"],
+            "WEBVTT\n\n"
+            "1\n00:00:00.000 --> 00:00:01.500\n第一句\n\n"
+            "2\n00:01:01.234 --> 01:00:00.000\na &lt; b &amp; c &gt; {d}\n\n"
+            "3\n01:02:05.500 --> 01:02:07.250\n最后一句\n",
+        )
+
+    def test_ass(self):
+        content = render(sample_cues(), ["ass"])["ass"]
+        self.assertTrue(content.startswith("[Script Info]\n"))
+        events = content.split("[Events]\n", 1)[1].splitlines()
+        self.assertEqual(
+            events[1:],
+            [
+                "Dialogue: 0,0:00:00.00,0:00:01.50,Default,,0,0,0,,第一句",
+                "Dialogue: 0,0:01:01.23,1:00:00.00,Default,,0,0,0,,a < b & c > ｛d｝",
+                "Dialogue: 0,1:02:05.50,1:02:07.25,Default,,0,0,0,,最后一句",
+            ],
+        )
+        self.assertEqual(format_ass_time(59.996), "0:01:00.00")
+        self.assertEqual(format_ass_time(-1), "0:00:00.00")
+
+    def test_json(self):
+        data = json.loads(render(sample_cues(), ["json"])["json"])
+        self.assertEqual(
+            data["cues"][1],
+            {"index": 2, "start": 61.234, "end": 3600.0, "duration": 3538.765, "text": "a < b & c > {d}"},
+        )
+        self.assertEqual([cue["index"] for cue in data["cues"]], [1, 2, 3])
+        self.assertEqual(json.loads(render(CueStore(), ["json"])["json"]), {"cues": []})
+
+    def test_render_all_at_once(self):
+        cues = sample_cues()
+        together = render(cues, list(WRITERS))
+        for name in WRITERS:
+            self.assertEqual(together[name], render(cues, [name])[name])
+
+    def test_parse_formats(self):
+        self.assertEqual(parse_formats("srt, .VTT,srt,json"), ["srt", "vtt", "json"])
+        self.assertEqual(parse_formats(["ass"]), ["ass"])
+        self.assertEqual(parse_formats(""), ["srt"])
+        self.assertEqual(parse_formats(None), ["srt"])
+        with self.assertRaises(ValueError):
+            parse_formats("srt,docx")
+
+    def test_write_outputs(self):
+        base = os.path.join(self.tmp, "video")
+        paths = write_outputs(sample_cues(), base, ["srt", "vtt"])
+        self.assertEqual(paths, [output_path(base, "srt"), output_path(base, "vtt")])
+        self.assertEqual(paths, [base + ".srt", base + ".vtt"])
+        self.assertEqual(CueStore.read_srt(paths[0]).texts, sample_cues().texts)
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["video.srt", "video.vtt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
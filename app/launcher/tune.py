@@ -0,0 +1,136 @@
+"""
+本机自动调优：用一段校准音频测试模型目录中的每个模型变体（如 model.onnx /
+model.int8.onnx）与不同的推理线程数，记录 RTF 与峰值内存，
+把最快的组合写入 config.json 的 host_tuning（按主机名区分），之后的批量任务自动使用
+
+    python tune.py
+    python tune.py --threads 1,2,4 --dry-run
+    python tune.py --clip samples/sample.wav --repeat 3
+
+批量处理会同时运行 核心数/线程数 个识别进程，因此按整机吞吐比较：
+有效 RTF = 单进程 RTF / 可并行的进程数；相差不超过 --tolerance 时选内存更小的组合
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bench import run_case
+from settings import (
+    CONFIG_PATH,
+    SAMPLES_DIR,
+    host_name,
+    load_config,
+    model_paths,
+    save_host_tuning,
+)
+from worker_client import WorkerError
+
+
+def find_model_variants(model_dir):
+    """模型目录中的 ASR 模型文件（排除 VAD 模型）"""
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(model_dir)
+        if name.endswith(".onnx") and "vad" not in name.lower()
+    )
+
+
+def default_threads(cores):
+    """1, 2, 4, ... 直到核心数（含核心数本身）"""
+    threads = []
+    t = 1
+    while t < cores:
+        threads.append(t)
+        t *= 2
+    threads.append(cores)
+    return threads
+
+
+def pick_best(results, tolerance):
+    """有效 RTF 最小者；与之相差不超过 tolerance 的组合里取峰值内存最小的"""
+    fastest = min(item["effective_rtf"] for item in results)
+    close = [item for item in results if item["effective_rtf"] <= fastest * (1 + tolerance)]
+    return min(close, key=lambda item: (item["peak_rss_mb"], item["effective_rtf"]))
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="按本机自动选择模型变体与推理线程数")
+    parser.add_argument("--config", default="", help="配置文件，默认使用 launcher/config.json")
+    parser.add_argument("--model-dir", default="", help="模型目录，默认取 config.json")
+    parser.add_argument("--clip", default=os.path.join(SAMPLES_DIR, "sample.wav"), help="校准音频")
+    parser.add_argument("--models", default="", help="只测试这些模型文件，逗号分隔，默认测试目录中全部")
+    parser.add_argument("--threads", default="", help="线程数，逗号分隔，默认 1,2,4...核心数")
+    parser.add_argument("--repeat", type=int, default=2, help="每个组合重复次数，取最快一次")
+    parser.add_argument("--tolerance", type=float, default=0.03, help="视为同样快的有效 RTF 差距")
+    parser.add_argument("--dry-run", action="store_true", help="只输出结果，不写入配置")
+    parser.add_argument("--verbose", action="store_true", help="输出识别进程日志")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_args(argv)
+    config_path = args.config or CONFIG_PATH
+    # 调优时不套用已有的调优结果，从配置的原始值出发
+    cfg = load_config(config_path, apply_tuning=False)
+    model_dir, _ = model_paths(cfg, args.model_dir)
+    on_log = (lambda line: print(line, file=sys.stderr)) if args.verbose else None
+
+    if not os.path.isfile(args.clip):
+        print(f"校准音频不存在: {args.clip}", file=sys.stderr)
+        return 2
+    variants = [name for name in args.models.split(",") if name] or find_model_variants(model_dir)
+    if not variants:
+        print(f"模型目录中没有 .onnx 模型: {model_dir}", file=sys.stderr)
+        return 2
+
+    cores = os.cpu_count() or 1
+    threads_list = [int(t) for t in args.threads.split(",") if t.strip()] or default_threads(cores)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="srt-tune-") as work_dir:
+        for variant in variants:
+            variant_cfg = dict(cfg, model_file=variant)
+            for threads in threads_list:
+                case = {"threads": threads, "batch_size": 8, "vad_threshold": 0.2, "vad_min_silence": 0.25}
+                try:
+                    run = run_case(variant_cfg, model_dir, [args.clip], case, work_dir, max(1, args.repeat), on_log)
+                except WorkerError as exc:
+                    print(f"  {variant} × {threads} 线程：失败 ({exc})", file=sys.stderr)
+                    continue
+                workers = max(1, cores // threads)
+                item = {
+                    "model_file": variant,
+                    "threads": threads,
+                    "rtf": run["rtf"],
+                    "effective_rtf": run["rtf"] / workers,
+                    "peak_rss_mb": run["peak_rss_mb"],
+                    "startup": run["startup"],
+                }
+                results.append(item)
+                print(
+                    f"  {variant} × {threads} 线程：RTF {item['rtf']:.4f}，"
+                    f"{workers} 个进程并行时有效 RTF {item['effective_rtf']:.4f}，"
+                    f"峰值内存 {item['peak_rss_mb']:.0f} MB",
+                    flush=True,
+                )
+
+    if not results:
+        print("所有组合均运行失败，请检查模型文件", file=sys.stderr)
+        return 2
+
+    best = pick_best(results, args.tolerance)
+    entry = dict(best, cpu_count=cores, clip=os.path.basename(args.clip), tuned=time.strftime("%Y-%m-%d %H:%M:%S"))
+    print(f"[{host_name()}] 最佳：{best['model_file']} × {best['threads']} 线程")
+    if args.dry_run:
+        return 0
+    save_host_tuning(entry, config_path)
+    print(f"已写入 {config_path} 的 host_tuning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
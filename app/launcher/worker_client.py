@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import threading
+
+
+class WorkerError(RuntimeError):
+    """识别进程返回错误或意外退出"""
+
+
+def read_segments(path):
+    """读取识别进程留下的分段日志（每行一个 [start, duration, text(, tokens)]），读完删除"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            segments = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError) as exc:
+        raise WorkerError(f"无法读取识别结果: {exc}")
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return segments
+
+
+class RecognizerWorker:
+    """
+    常驻识别进程（generate-subtitles.py --worker）的客户端
+    模型和 VAD 配置只在启动时加载一次，之后逐个提交任务
+    协议：stdin/stdout 上每行一个 JSON 对象，stderr 为普通日志
+    """
+
+    def __init__(self, cmd, env=None, on_log=None):
+        self.cmd = list(cmd)
+        self.env = env
+        self.on_log = on_log
+        self.proc = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def is_alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """启动进程并等待模型加载完成"""
+        self.proc = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        threading.Thread(target=self._pump_stderr, daemon=True).start()
+        msg = self._read_message()
+        if msg.get("type") != "ready":
+            raise WorkerError(f"识别进程启动失败: {msg}")
+
+    def _pump_stderr(self):
+        for line in self.proc.stderr:
+            if self.on_log:
+                self.on_log(line.rstrip())
+
+    def _read_message(self):
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                self.proc.wait()
+                raise WorkerError(f"识别进程已退出 (code={self.proc.returncode})")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line)
+            except ValueError:
+                # 非协议输出（例如底层库直接写 stdout），按日志处理
+                if self.on_log:
+                    self.on_log(line)
+
+    def transcribe(
+        self,
+        input_media,
+        output_srt,
+        on_progress=None,
+        resume=True,
+        num_shards=1,
+        duration=0.0,
+        trace=False,
+        profile="",
+        profile_output="",
+    ):
+        """
+        提交一个任务并阻塞等待结果
+        resume 为 True 时，若上次被中断会从 srt 旁的断点文件继续
+        num_shards > 1 时长文件按静音切成多段并行识别
+        duration 为已知时长（秒），识别进程据此报告进度，不必再调用 ffprobe
+        on_progress(msg)：进度 dict，含 processed, duration, segments, elapsed, rtf, peak_rss_mb
+        trace 为 True 时结果中附带各阶段的耗时区间与调用次数（trace: {spans, counts}）
+        profile 为 "cprofile" 或 "sample" 时对本任务采样，结果写到 profile_output
+        返回 dict：output, segments([start, duration, text(, tokens)]), duration, elapsed, rtf
+        分段不经管道传输：识别进程写在 srt 旁的 .segments.jsonl，这里读回后删除
+        """
+        with self._lock:
+            if not self.is_alive():
+                raise WorkerError("识别进程未运行")
+            self._next_id += 1
+            job_id = self._next_id
+            job = {
+                "id": job_id,
+                "input": input_media,
+                "output": output_srt,
+                "resume": resume,
+                "num_shards": num_shards,
+                "duration": duration,
+            }
+            if trace:
+                job["trace"] = True
+            if profile:
+                job["profile"] = profile
+                job["profile_output"] = profile_output
+            try:
+                self.proc.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+                self.proc.stdin.flush()
+            except OSError as exc:
+                raise WorkerError(f"无法向识别进程提交任务: {exc}")
+
+            while True:
+                msg = self._read_message()
+                if msg.get("id") != job_id:
+                    continue
+                kind = msg.get("type")
+                if kind == "progress":
+                    if on_progress:
+                        on_progress(msg)
+                elif kind == "result":
+                    msg["segments"] = read_segments(msg.pop("segments_file"))
+                    return msg
+                elif kind == "error":
+                    raise WorkerError(msg.get("message", "未知错误"))
+
+    def terminate(self):
+        """强制结束（用于取消正在进行的任务）"""
+        if self.is_alive():
+            try:
+                self.proc.terminate()
+            except Exception:
+                pass
+
+    def close(self, timeout=5):
+        """关闭 stdin 让进程自然退出，超时则强制结束"""
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
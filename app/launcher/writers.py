@@ -0,0 +1,187 @@
+"""
+字幕输出格式：SRT / WebVTT / ASS / JSON 分段
+对后处理后的字幕只遍历一次，同时渲染所有需要的格式，每个文件整块写出
+
+新增格式：继承 Writer，实现 cue()，再用 @register 登记即可
+"""
+import json
+import os
+
+from subtitles import format_timecode
+
+
+DEFAULT_FORMATS = ["srt"]
+
+WRITERS = {}
+
+
+def register(cls):
+    WRITERS[cls.name] = cls
+    return cls
+
+
+class Writer:
+    """一种输出格式：header + separator.join(每条字幕) + footer"""
+
+    name = ""
+    extension = ""
+    content_type = "text/plain; charset=utf-8"
+    separator = "\n"
+
+    def header(self):
+        return ""
+
+    def cue(self, index, start, end, text):
+        raise NotImplementedError
+
+    def footer(self):
+        return ""
+
+
+@register
+class SrtWriter(Writer):
+    name = "srt"
+    extension = ".srt"
+    content_type = "application/x-subrip; charset=utf-8"
+    separator = "\n\n"
+
+    def cue(self, index, start, end, text):
+        return f"{index}\n{format_timecode(start)} --> {format_timecode(end)}\n{text}"
+
+
+@register
+class VttWriter(Writer):
+    name = "vtt"
+    extension = ".vtt"
+    content_type = "text/vtt; charset=utf-8"
+    separator = "\n\n"
+
+    def header(self):
+        return "WEBVTT\n\n"
+
+    def cue(self, index, start, end, text):
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        return f"{index}\n{format_timecode(start, '.')} --> {format_timecode(end, '.')}\n{text}"
+
+    def footer(self):
+        return "\n"
+
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1920
+PlayResY: 1080
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Microsoft YaHei,64,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,3,1,2,60,60,50,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def format_ass_time(seconds):
+    """ASS 时间格式 H:MM:SS.cc（百分之一秒）"""
+    cs = max(0, int(round(seconds * 100)))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+@register
+class AssWriter(Writer):
+    name = "ass"
+    extension = ".ass"
+    content_type = "text/x-ssa; charset=utf-8"
+
+    def header(self):
+        return ASS_HEADER
+
+    def cue(self, index, start, end, text):
+        # 花括号在 ASS 中是样式标签，换成全角避免被吞掉
+        text = text.replace("{", "｛").replace("}", "｝").replace("\n", "\\N")
+        return f"Dialogue: 0,{format_ass_time(start)},{format_ass_time(end)},Default,,0,0,0,,{text}"
+
+    def footer(self):
+        return "\n"
+
+
+@register
+class JsonWriter(Writer):
+    """分段 JSON，供检索/索引使用：{"cues": [{index, start, end, duration, text}, ...]}"""
+
+    name = "json"
+    extension = ".json"
+    content_type = "application/json; charset=utf-8"
+    separator = ",\n"
+
+    def header(self):
+        return '{"cues": [\n'
+
+    def cue(self, index, start, end, text):
+        return json.dumps(
+            {
+                "index": index,
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "duration": round(end - start, 3),
+                "text": text,
+            },
+            ensure_ascii=False,
+        )
+
+    def footer(self):
+        return "\n]}\n"
+
+
+def parse_formats(value):
+    """
+    "srt,vtt" 或 ["srt", "vtt"] -> ["srt", "vtt"]（去重、保持顺序）
+    为空时返回默认格式；包含未知格式时抛出 ValueError
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    formats = []
+    for name in value or []:
+        name = name.strip().lower().lstrip(".")
+        if not name or name in formats:
+            continue
+        if name not in WRITERS:
+            raise ValueError(f"不支持的字幕格式: {name}（可选 {', '.join(WRITERS)}）")
+        formats.append(name)
+    return formats or list(DEFAULT_FORMATS)
+
+
+def render(cues, formats):
+    """一次遍历 cues，返回 {格式: 文本}"""
+    writers = [WRITERS[name]() for name in formats]
+    parts = [[] for _ in writers]
+    renderers = [(writer.cue, out.append) for writer, out in zip(writers, parts)]
+    for index, (start, end, text) in enumerate(cues, 1):
+        for render_cue, append in renderers:
+            append(render_cue(index, start, end, text))
+    return {
+        writer.name: writer.header() + writer.separator.join(out) + writer.footer()
+        for writer, out in zip(writers, parts)
+    }
+
+
+def output_path(base, fmt):
+    return base + WRITERS[fmt].extension
+
+
+def write_outputs(cues, base, formats):
+    """把 cues 按 formats 写成 base.srt / base.vtt ...，返回写出的文件路径列表"""
+    paths = []
+    for fmt, content in render(cues, formats).items():
+        path = output_path(base, fmt)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
@@ -44,20 +44,18 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
+# 目录模式（onedir）：单文件模式每次启动都要先把依赖解压到临时目录，启动明显变慢
+# UPX 压缩同样会增加每次启动时的解压耗时，因此关闭
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='字幕生成工具',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,  # 无控制台窗口
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -66,3 +64,14 @@ exe = EXE(
     entitlements_file=None,
     icon=None,  # 如果有图标文件，可以在这里指定路径
 )
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='字幕生成工具',
+)
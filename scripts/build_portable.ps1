@@ -7,7 +7,6 @@ $ErrorActionPreference = "Stop"
 
 $launcher = Join-Path $AppRoot "launcher"
 $exeName = "字幕生成工具.exe"
-$exePath = Join-Path $AppRoot $exeName
 
 Push-Location $launcher
 try {
@@ -17,12 +16,14 @@ try {
     Pop-Location
 }
 
-$distExe = Join-Path $launcher "dist\\字幕生成工具.exe"
+# 目录模式：exe 与依赖目录（_internal）一起复制到 app 根目录
+$distDir = Join-Path $launcher "dist\\字幕生成工具"
+$distExe = Join-Path $distDir $exeName
 if (-not (Test-Path $distExe)) {
     throw "PyInstaller output not found: $distExe"
 }
 
-Copy-Item -Force $distExe $exePath
+Copy-Item -Recurse -Force (Join-Path $distDir "*") $AppRoot
 
 if (Test-Path $OutZip) {
     Remove-Item -Force $OutZip